@@ -18,7 +18,15 @@ from .core.FzfPrompt.previewer.actions import (
     SetAsCurrentPreview,
     ShowAndStorePreviewOutput,
 )
-from .core.FzfPrompt.server import CommandOutput, FzfPlaceholder, PromptEndingAction, ServerCall, VarOutput
+from .core.FzfPrompt.server import (
+    CachedCommandOutput,
+    CommandOutput,
+    FzfPlaceholder,
+    Memoize,
+    PromptEndingAction,
+    ServerCall,
+    VarOutput,
+)
 from .core.mods.on_trigger.presets import ReloadEntries, ShowInPreview
 
 __all__ = [
@@ -43,6 +51,8 @@ __all__ = [
     "PromptEndingAction",
     "ServerCall",
     "CommandOutput",
+    "CachedCommandOutput",
+    "Memoize",
     "VarOutput",
     "FzfPlaceholder",
 ]
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import os
+import socket
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .core.FzfPrompt.options.triggers import Hotkey
+    from .core.FzfPrompt.server import RequestClient, ServerTransport
 
 ENV_VAR_FOR_LOGGING = "FZF_PRIMITIVES_ENABLE_INTERNAL_LOGGING"
 ENV_VAR_FOR_AUTOMATOR_DELAY = "FZF_PRIMITIVES_AUTOMATOR_DELAY"
+ENV_VAR_FOR_METRICS_DIR = "FZF_PRIMITIVES_METRICS_DIR"
+ENV_VAR_FOR_RECORDINGS_DIR = "FZF_PRIMITIVES_RECORDINGS_DIR"
 
 
 class Config:
@@ -15,5 +20,31 @@ class Config:
     use_basic_hotkeys: bool = True
     default_accept_hotkey: Hotkey = "enter"
     default_abort_hotkey: Hotkey = "esc"
+    request_client: RequestClient = "python"
+    server_transport: ServerTransport = "unix" if hasattr(socket, "AF_UNIX") else "tcp"
+    # prompts register their endpoints with a process-wide server instead of starting their own
+    shared_server: bool = False
+    # consecutive execute-silent server calls of a binding are made in one request (one request client spawn)
+    fuse_server_calls: bool = True
+    # selections are kept in Python (synced on 'multi' event) instead of being sent by fzf with every server call
+    mirror_selections: bool = False
+    # prompts that only end (no other server calls) run without server, reading how they ended from fzf output (their
+    # stage doesn't reach 'running' as there's no startup server call, and ending actions are run by fzf via 'become')
+    serverless_prompts: bool = False
+    server_max_workers: int = 1  # more than 1 resolves server calls not marked as serial concurrently
+    # worker processes of server calls with process_pool=True (None means number of CPUs)
+    process_pool_max_workers: int | None = None
+    # seconds fzf waits for a server call without its own deadline before getting its fallback response
+    server_call_deadline: float | None = None
+    # threads running server calls that have a deadline (ones left running past it keep theirs)
+    server_deadline_workers: int = 32
+    # number of endpoints of a prompt above which a leak is suspected (and warned about once)
+    endpoint_leak_threshold: int = 10_000
+    # server metrics of every prompt are dumped there as JSON on prompt exit
+    metrics_dir: Path | None = Path(os.environ[ENV_VAR_FOR_METRICS_DIR]) if os.getenv(ENV_VAR_FOR_METRICS_DIR) else None
+    # requests made during every prompt are recorded there (for replaying them with Prompt.replay)
+    recordings_dir: Path | None = (
+        Path(os.environ[ENV_VAR_FOR_RECORDINGS_DIR]) if os.getenv(ENV_VAR_FOR_RECORDINGS_DIR) else None
+    )
 
     automator_delay: float = float(os.getenv(ENV_VAR_FOR_AUTOMATOR_DELAY, "0.25"))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from threading import Lock
 from typing import Literal
 
 from ...monitoring import LoggedComponent
@@ -18,11 +19,18 @@ class ActionMenu[T, S](LoggedComponent):
     def __init__(self) -> None:
         super().__init__()
         self.bindings: dict[Hotkey | Event, Binding[T, S]] = {}
+        self._lock = Lock()  # bindings are also added while the prompt runs (e.g. by Transforms)
 
     @property
     def actions(self) -> list[Action[T, S]]:
         return [action for binding in self.bindings.values() for action in binding.actions]
 
+    @property
+    def action_count(self) -> int:
+        """Number of actions of all bindings (bindings extended while the prompt runs make it grow)"""
+        with self._lock:
+            return sum(len(binding.actions) for binding in self.bindings.values())
+
     def add(self, trigger: Hotkey | Event, binding: Binding[T, S], *, on_conflict: ConflictResolution = "raise error"):
         self.logger.debug(
             f"🔗 Adding binding for '{trigger}': {binding} ({on_conflict} on conflict)",
@@ -30,9 +38,10 @@ class ActionMenu[T, S](LoggedComponent):
             trigger=trigger,
             binding=binding.description,
         )
-        if trigger not in self.bindings:
-            self.bindings[trigger] = binding
-        else:
+        with self._lock:
+            if trigger not in self.bindings:
+                self.bindings[trigger] = binding
+                return
             match on_conflict:
                 case "raise error":
                     raise BindingConflict(f"Trigger {trigger} already has a binding: {self.bindings[trigger]}")
@@ -47,6 +56,21 @@ class ActionMenu[T, S](LoggedComponent):
                 case _:
                     raise ValueError(f"Invalid conflict resolution: {on_conflict}")
 
+    @single_use_method
+    def fuse_server_calls(self) -> int:
+        """Returns how many fewer request clients fzf spawns when performing all bindings once"""
+        saved_spawns = 0
+        for trigger, binding in self.bindings.items():
+            if saved := binding.fuse_server_calls():
+                self.logger.debug(
+                    f"Fused server calls of '{trigger}' binding ({saved} fewer request client spawns)",
+                    trace_point="fused_server_calls",
+                    trigger=trigger,
+                    saved_spawns=saved,
+                )
+            saved_spawns += saved
+        return saved_spawns
+
     def get_bindings_help(self) -> str:
         return get_bindings_help(self)
 
@@ -4,7 +4,7 @@ import itertools
 from typing import Iterable, overload
 
 from ...monitoring import LoggedComponent
-from ..server import PromptEndingAction
+from ..server import FusedServerCall, PromptEndingAction, ServerCall
 from . import transform as t
 from .parametrized_actions import Action, CompositeAction, ParametrizedAction
 
@@ -31,6 +31,7 @@ class Binding[T, S](LoggedComponent):
             for action_group in action_groups:
                 self._action_groups[action_group.id] = action_group
         self.actions: list[Action[T, S]]
+        self._fused_actions: list[Action[T, S]] | None = None
         if len(self._action_groups) > 1:
             if any(ag.final_action for ag in self._action_groups.values()):
                 raise NotImplementedError("Binding with multiple action groups can't have final action")
@@ -41,8 +42,41 @@ class Binding[T, S](LoggedComponent):
             self.actions = (lone_action_group := list(self._action_groups.values())[0]).actions
             self.final_action = lone_action_group.final_action
 
+    @property
+    def resolved_actions(self) -> list[Action[T, S]]:
+        """Actions fzf performs (with server calls fused if they were)"""
+        return self._fused_actions if self._fused_actions is not None else self.actions
+
+    def fuse_server_calls(self) -> int:
+        """Merges consecutive execute-silent server calls into FusedServerCalls (see resolved_actions)
+
+        .actions stay as they were (e.g. for Transforms returning them). Returns how many fewer request clients fzf
+        spawns when performing the actions.
+        """
+        fused_actions: list[Action[T, S]] = []
+        server_calls: list[ServerCall[T, S]] = []
+
+        def flush_server_calls():
+            if len(server_calls) > 1:
+                fused_actions.append(FusedServerCall(*server_calls))
+            else:
+                fused_actions.extend(server_calls)
+            server_calls.clear()
+
+        for action in self.actions:
+            if not FusedServerCall.can_fuse(action):
+                flush_server_calls()
+                fused_actions.append(action)
+                continue
+            if not FusedServerCall.can_fuse_with(server_calls, action):  # type: ignore
+                flush_server_calls()
+            server_calls.append(action)  # type: ignore
+        flush_server_calls()
+        self._fused_actions = fused_actions
+        return len(self.actions) - len(fused_actions)
+
     def action_string(self) -> str:
-        actions = self.actions.copy()
+        actions = self.resolved_actions.copy()
         action_strings = [
             action.action_string() if isinstance(action, (ParametrizedAction, CompositeAction)) else action
             for action in actions
@@ -1,60 +1,145 @@
 from __future__ import annotations
 
 import functools
-from typing import TYPE_CHECKING, Callable, Concatenate, Iterable
+import inspect
+import weakref
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Awaitable, Callable, Concatenate, Iterable
 
 if TYPE_CHECKING:
+    from ..options import Trigger
     from ..prompt_data import PromptData
     from . import Action
 from ...monitoring import LoggedComponent
-from ..server import PromptEndingAction, ServerCall, ServerCallFunction
+from ..server import EndpointScope, Memoize, Priority, Server, ServerCall, ServerCallFunction
+from ..server.memoization import memoized
 from . import binding as b
 
+type BuiltActions[T, S] = Iterable[Action[T, S] | ServerCallFunction[T, S]]
 type ActionsBuilder[T, S] = Callable[
-    Concatenate[PromptData[T, S], ...], Iterable[Action[T, S] | ServerCallFunction[T, S]]
+    Concatenate[PromptData[T, S], ...], BuiltActions[T, S] | Awaitable[BuiltActions[T, S]]
+]
+ENDPOINT_CACHE_SIZE = 128  # endpoints of least recently returned server calls are removed beyond that (per server)
+type EndpointCache[T, S] = OrderedDict[
+    tuple[int, Trigger], tuple[ServerCall[T, S] | ServerCallFunction[T, S], ServerCall[T, S]]
 ]
 
 
 class Transform[T, S](ServerCall[T, S], LoggedComponent):
-    def __init__(self, get_actions: ActionsBuilder[T, S], description: str | None = None, *, bg: bool = False) -> None:
-        """Hint: In get_actions, use 'bell' action as backup to errors so you can hear when an error happened"""
+    def __init__(
+        self,
+        get_actions: ActionsBuilder[T, S],
+        description: str | None = None,
+        *,
+        bg: bool = False,
+        deadline: float | None = None,
+        fallback_response: str = "bell",
+        priority: Priority | None = None,
+        memoize: Memoize | None = None,
+    ) -> None:
+        """Hint: In get_actions, use 'bell' action as backup to errors so you can hear when an error happened
+
+        get_actions can be an async function (awaited on the event loop of Server)
+
+        fallback_response: Actions fzf performs when get_actions misses the deadline (see ServerCall)
+        priority: Defaults to 'interactive' ('background' for bg-transform)
+        memoize: Reuse actions get_actions built for the same values of the state fields and the same arguments
+            (see Memoize)
+        """
         LoggedComponent.__init__(self)
+        if memoize:
+            # actions are memoized instead of the transform string so that their endpoints can be registered again
+            get_actions = memoized(get_actions, memoize)
 
         self.get_actions = get_actions
-        self._created_endpoints: list[str] = []
+        # endpoints of returned server calls (or functions) keyed by their identity (the originals are kept
+        # referenced so that their ids can't be reused) for each server they're registered on (the same Transform
+        # can run in more prompts, e.g. when it's of a Preview reused by prompts run in a loop)
+        self._endpoint_caches: weakref.WeakKeyDictionary[Server, EndpointCache[T, S]] = weakref.WeakKeyDictionary()
+        self._endpoint_cache_lock = Lock()  # the same Transform can be bound in prompts resolving calls in parallel
+        self._checked_retirement = ServerCall.last_retirement  # cache has no retired server calls up to it
         super().__init__(
             self.getting_transform_string(get_actions),
             description or self._get_function_name(get_actions),
             "transform" if not bg else "bg-transform",
+            serial=True,  # created endpoints are tracked per instance
+            deadline=deadline,
+            fallback_response=fallback_response,
+            priority=priority or ("interactive" if not bg else "background"),
         )
+        if memoize:
+            self._check_memoized_fields(memoize)
+            self.memoize = memoize
 
     def getting_transform_string(self, actions_builder: ActionsBuilder[T, S]):
+        if inspect.iscoroutinefunction(actions_builder):
+
+            @functools.wraps(actions_builder)
+            async def get_transform_string_async(prompt_data: PromptData[T, S], *args, **kwargs) -> str:
+                return self._create_action_string(prompt_data, await actions_builder(prompt_data, *args, **kwargs))
+
+            return get_transform_string_async
+
         @functools.wraps(actions_builder)
         def get_transform_string(prompt_data: PromptData[T, S], *args, **kwargs) -> str:
-            actions: list[Action[T, S]] = [
-                a.copy()
-                if isinstance(a, ServerCall)
-                else ServerCall(a, command_type="execute-silent")
-                if callable(a)
-                else a
-                for a in actions_builder(prompt_data, *args, **kwargs)
-            ]
-            binding = b.Binding(None, *actions)
-            self.logger.debug(f"{self}: Created {binding}", trace_point="transform_created", binding=binding.name)
-
-            for server_call_id in self._created_endpoints:
-                prompt_data.server.endpoints.pop(server_call_id, None)
-            self._created_endpoints.clear()
-            for action in binding.actions:
-                if isinstance(action, ServerCall):
-                    prompt_data.server.add_endpoint(action, prompt_data.trigger)
-                    self._created_endpoints.append(action.id)
-                    if isinstance(action, PromptEndingAction):
-                        prompt_data.action_menu.add(prompt_data.trigger, b.Binding("", action), on_conflict="append")
-
-            return binding.action_string()
+            return self._create_action_string(prompt_data, actions_builder(prompt_data, *args, **kwargs))  # type: ignore
 
         return get_transform_string
 
+    def _create_action_string(self, prompt_data: PromptData[T, S], built_actions: BuiltActions[T, S]) -> str:
+        actions: list[Action[T, S]] = [
+            self._get_endpoint_server_call(prompt_data, a) if isinstance(a, ServerCall) or callable(a) else a
+            for a in built_actions
+        ]
+        binding = b.Binding(None, *actions)
+        self.logger.debug(f"{self}: Created {binding}", trace_point="transform_created", binding=binding.name)
+        return binding.action_string()
+
+    def _get_endpoint_server_call(
+        self, prompt_data: PromptData[T, S], action: ServerCall[T, S] | ServerCallFunction[T, S]
+    ) -> ServerCall[T, S]:
+        """Endpoint is registered only the first time a server call (or function) is returned in the prompt"""
+        key = (id(action), prompt_data.trigger)
+        server = prompt_data.server
+        with self._endpoint_cache_lock:
+            if self._checked_retirement != ServerCall.last_retirement:
+                self._remove_retired_endpoints()
+            if (endpoint_cache := self._endpoint_caches.get(server)) is None:
+                endpoint_cache = self._endpoint_caches[server] = OrderedDict()
+            if cached := endpoint_cache.get(key):
+                endpoint_cache.move_to_end(key)
+                return cached[1]
+            server_call = (
+                action.copy() if isinstance(action, ServerCall) else ServerCall(action, command_type="execute-silent")
+            )
+            server.add_endpoint(server_call, prompt_data.trigger, owner=self, scope=self._get_scope(action))
+            endpoint_cache[key] = (action, server_call)
+            if len(endpoint_cache) > ENDPOINT_CACHE_SIZE:
+                _, (_, evicted_server_call) = endpoint_cache.popitem(last=False)
+                server.remove_endpoint(evicted_server_call.id)
+        return server_call
+
+    def _remove_retired_endpoints(self) -> None:
+        """Endpoints of returned server calls that were retired since (e.g. of an updated Preview) are out of scope"""
+        self._checked_retirement = ServerCall.last_retirement
+        removed = 0
+        for server, endpoint_cache in list(self._endpoint_caches.items()):
+            retired = [key for key, (action, _) in endpoint_cache.items() if getattr(action, "retired", False)]
+            for key in retired:
+                _, server_call = endpoint_cache.pop(key)
+                server.remove_endpoint(server_call.id)
+            removed += len(retired)
+        if removed:
+            self.logger.debug(
+                f"{self}: Removed {removed} endpoints of retired server calls",
+                trace_point="retired_endpoints_removed",
+            )
+
+    @staticmethod
+    def _get_scope(action: ServerCall[T, S] | ServerCallFunction[T, S]) -> EndpointScope:
+        """Endpoints live until evicted from the endpoint cache unless the server call is scoped more narrowly"""
+        return action.scope if isinstance(action, ServerCall) and action.scope != "prompt" else "transform"
+
     def __str__(self) -> str:
         return f"[T]({self.id})"
@@ -52,7 +52,8 @@ class Automator[T, S](Thread, LoggedComponent):
         self.logger.debug(f">>>>> Automating {binding}", trace_point="automating_binding", binding=binding.name)
         if not binding.final_action:
             binding += Binding(
-                "move to next automated binding", ServerCall(self._move_to_next_binding, command_type="execute-silent")
+                "move to next automated binding",
+                ServerCall(self._move_to_next_binding, command_type="execute-silent", state_fields=()),
             )
         self._current_actions_to_automate = binding.actions
         self._binding_executed.clear()
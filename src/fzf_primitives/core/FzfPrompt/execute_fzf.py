@@ -4,15 +4,16 @@ from typing import TYPE_CHECKING, Iterable
 
 if TYPE_CHECKING:
     from .prompt_data import PromptData
+from ...config import Config
 from ..monitoring import Logger
 from .prompt_data import PromptData, Result
+from .server import RequestRecorder
 from .shell import VerboseCalledProcessError
 
 FZF_URL = "https://github.com/junegunn/fzf"
 EXPECTED_FZF_ERR_CODES = (130, 1)  # 130 means aborted, 1 means accepted with no selection
 
 
-# TODO: Allow propagation of exceptions through nested prompts (relevant for quit_app)
 # ❗❗ FzfPrompt makes use of FZF_DEFAULT_OPTS variable
 # Inspired by https://github.com/nk412/pyfzf
 def execute_fzf[T, S](
@@ -20,8 +21,13 @@ def execute_fzf[T, S](
 ) -> Result[T, S]:
     logger = Logger.get_logger()
     server = prompt_data.server
-    server.start()
-    server.setup_finished.wait()
+    serverless_endings = prompt_data.serverless_endings  # the prompt runs without server when set
+    if serverless_endings is None:
+        if Config.recordings_dir and server.recorder is None:
+            server.recorder = RequestRecorder(
+                Config.recordings_dir.joinpath(f"{prompt_data.id.replace(':', '-')}.jsonl.gz")
+            )
+        server.open()
     executable_path = executable_path or "fzf"
     prompt_data.run_vars["executable_path"] = executable_path
 
@@ -37,18 +43,26 @@ def execute_fzf[T, S](
         )
         # TODO: what happens if the output is too large?
         if entries_stream is None:
-            exit_code = subprocess.run(
+            # kept as Popen so that the prompt can be ended (see PromptData.propagate_exception)
+            with subprocess.Popen(
                 [executable_path, *options],  # TODO: don't make options iterable; use method
                 shell=False,
-                input=prompt_data.fzf_input(),
-                check=True,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 env=prompt_data.fzf_env,
-                capture_output=True,
                 text=True,
                 encoding="utf-8",
-            ).returncode
+            ) as fzf_process:
+                prompt_data.fzf_process = fzf_process
+                stdout, stderr = fzf_process.communicate(prompt_data.fzf_input())
+            exit_code = fzf_process.returncode
+            if exit_code != 0:
+                raise subprocess.CalledProcessError(
+                    returncode=exit_code, cmd=fzf_process.args, output=stdout, stderr=stderr
+                )
         else:
-            fzf_process = subprocess.Popen(
+            fzf_process = prompt_data.fzf_process = subprocess.Popen(
                 [executable_path, *options],
                 shell=False,
                 stdin=subprocess.PIPE,  # ❗ this prevents reload actions from working
@@ -64,17 +78,20 @@ def execute_fzf[T, S](
             fzf_stdin.flush()
 
             def keep_piping():
+                piped_entries = prompt_data.entries
                 for entry in entries_stream:
                     # TODO: better name than line
                     item = prompt_data.converter(entry)
-                    prompt_data.entries.append(entry)
+                    # appended before fzf can refer to it by index
+                    if not prompt_data.append_piped_entry(entry, piped_entries):
+                        logger.debug("Entries replaced, stopped piping", trace_point="entries_replaced_while_piping")
+                        break
                     try:
                         fzf_stdin.write(f"{item}{prompt_data.entries_delimiter}")
                         fzf_stdin.flush()
                     except Exception as e:
                         logger.exception(str(e), trace_point="error_writing_item_to_fzf_process")
-                        prompt_data.entries.pop()
-                        pass
+                        prompt_data.remove_piped_entry(entry, piped_entries)
 
             piping_thread = threading.Thread(target=keep_piping, daemon=True)
             piping_thread.start()
@@ -94,7 +111,7 @@ def execute_fzf[T, S](
             f"Error running 'fzf' command. Are you sure it's installed and on PATH? ({FZF_URL})"
         ) from err
     except subprocess.CalledProcessError as err:
-        if err.returncode not in EXPECTED_FZF_ERR_CODES:
+        if err.returncode not in EXPECTED_FZF_ERR_CODES and prompt_data.propagated_exception is None:
             logger.exception(
                 stderr := err.stderr.strip(),
                 **{
@@ -105,10 +122,26 @@ def execute_fzf[T, S](
                 },
             )
             raise VerboseCalledProcessError(err)
-        exit_code = err.returncode
+        exit_code, stdout = err.returncode, err.stdout or ""
     finally:
-        server.should_close.set()
-    server.join()
+        if serverless_endings is None:
+            server.close()
+            if server.recorder is not None:
+                server.recorder.close()
+    if (propagated_exception := prompt_data.propagated_exception) is not None:
+        raise propagated_exception
+    if serverless_endings is not None:
+        serverless_endings.apply_output(prompt_data, stdout)
+    else:
+        logger.debug(
+            f"Server had {len(server.endpoints)} endpoints left ({server.endpoints_removed} removed)",
+            trace_point="endpoint_counts",
+            endpoint_counts=server.endpoint_counts(),
+            endpoints_added=server.endpoints_added,
+            action_count=prompt_data.action_menu.action_count,
+        )
+        if Config.metrics_dir:
+            server.metrics.dump(Config.metrics_dir.joinpath(f"{prompt_data.id.replace(':', '-')}.json"))
     if prompt_data.stage != "finished":
         logger.warning(
             "Prompt did not finish properly probably due to using base 'accept' or 'abort' actions and not PromptEndingAction. Result may be inaccurate.",
@@ -118,8 +151,8 @@ def execute_fzf[T, S](
         end_status = "accept" if exit_code == 0 else "abort" if exit_code == 130 else None
         trigger = None
     else:
-        if not (final_action := prompt_data.action_menu.bindings[prompt_data.trigger].final_action):
-            err_message = "Prompt ended on trigger that doesn't have final action. How did we get here?"
+        if not (final_action := prompt_data.final_action):
+            err_message = "Prompt finished without final action. How did we get here?"
             logger.error(
                 err_message,
                 **{"trace_point": "prompt_ended_on_trigger_without_final_action"},
@@ -139,6 +172,7 @@ def execute_fzf[T, S](
         selections=prompt_data.selections,
         target_indices=prompt_data.target_indices,
         obj=prompt_data.obj,
+        metrics=prompt_data.metrics,
     )
 
 
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Callable, TypedDict, Unpack
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable, TypedDict, Unpack
 
 if TYPE_CHECKING:
     from ..prompt_data import PromptData
 from ..action_menu import Binding, ShellCommand, Transform
 from ..options import RelativeWindowSize, WindowPosition
-from ..server import ServerCallFunctionGeneric
+from ..server import Memoize, ServerCall, ServerCallFunctionGeneric
 from .actions import (
     ChangePreviewLabel,
     ChangePreviewWindow,
@@ -15,7 +15,8 @@ from .actions import (
     ShowAndStorePreviewOutput,
 )
 
-type PreviewFunction[T, S] = ServerCallFunctionGeneric[T, S, str]
+type PreviewOutput = str | Iterable[str]  # iterators are streamed
+type PreviewFunction[T, S] = ServerCallFunctionGeneric[T, S, PreviewOutput | Awaitable[PreviewOutput]]
 type PreviewChangePreProcessor[T, S] = Callable[[PromptData[T, S], Preview[T, S]], Any]
 type PreviewMutator[T, S] = Callable[[PromptData[T, S]], PreviewMutationArgs[T, S]]
 
@@ -32,6 +33,10 @@ class PreviewMutationArgs[T, S](PreviewStyleMutationArgs, total=False):
     label: str
     before_change_do: PreviewChangePreProcessor[T, S]
     store_output: bool
+    deadline: float | None  # seconds after which output generator function is replaced with 'Loading…' output
+    process_pool: bool  # output generator function runs in a worker process (see ServerCall)
+    memoize: Memoize | None  # outputs of output generator function are reused (see Memoize)
+    supersedable: bool  # queued requests of output generator function are skipped once a newer one arrives
 
 
 DEFAULT_OUTPUT_GENERATOR = ""
@@ -41,6 +46,10 @@ DEFAULT_LABEL = ""
 DEFAULT_LINE_WRAP = True
 DEFAULT_BEFORE_CHANGE_DO = lambda pd, preview: None
 DEFAULT_STORE_OUTPUT = True
+DEFAULT_DEADLINE = None
+DEFAULT_PROCESS_POOL = False
+DEFAULT_MEMOIZE = None
+DEFAULT_SUPERSEDABLE = True
 
 
 class Preview[T, S]:
@@ -55,6 +64,10 @@ class Preview[T, S]:
         self.line_wrap = kwargs.get("line_wrap", DEFAULT_LINE_WRAP)
         self.before_change_do = kwargs.get("before_change_do", DEFAULT_BEFORE_CHANGE_DO)
         self.store_output = kwargs.get("store_output", DEFAULT_STORE_OUTPUT)
+        self.deadline = kwargs.get("deadline", DEFAULT_DEADLINE)
+        self.process_pool = kwargs.get("process_pool", DEFAULT_PROCESS_POOL)
+        self.memoize = kwargs.get("memoize", DEFAULT_MEMOIZE)
+        self.supersedable = kwargs.get("supersedable", DEFAULT_SUPERSEDABLE)
         self._output: str | None = None
 
         # Using a Transform so that mutations of Preview are expressed when switching to it using just its basic binding
@@ -95,13 +108,23 @@ class Preview[T, S]:
         self._change_preview_output = (
             get_preview_shell_command(self.output_generator, self)
             if isinstance(self.output_generator, str)
-            else PreviewServerCall(self.output_generator, self)
+            else PreviewServerCall(
+                self.output_generator,
+                self,
+                deadline=self.deadline,
+                process_pool=self.process_pool,
+                memoize=self.memoize,
+                supersedable=self.supersedable,
+            )
         )
         self._change_preview_label = ChangePreviewLabel(self.label)
 
     def update(self, **kwargs: Unpack[PreviewMutationArgs[T, S]]):
         for key, value in kwargs.items():
             setattr(self, key, value)
+        for action in (self._set_as_current_preview, self._change_preview_output):
+            if isinstance(action, ServerCall):
+                action.retire()  # endpoints Transforms created from them are removed
         self._create_new_actions()
 
     @property
@@ -126,6 +149,10 @@ class Preview[T, S]:
             line_wrap=self.line_wrap,
             before_change_do=self.before_change_do,
             store_output=self.store_output,
+            deadline=self.deadline,
+            process_pool=self.process_pool,
+            memoize=self.memoize,
+            supersedable=self.supersedable,
         )
 
     def __str__(self) -> str:
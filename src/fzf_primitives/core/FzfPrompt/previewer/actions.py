@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Callable, override
+import inspect
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable, Iterator, override
 
 if TYPE_CHECKING:
     from ..prompt_data import PromptData
@@ -8,13 +9,16 @@ if TYPE_CHECKING:
 from ...monitoring import LoggedComponent
 from ..action_menu import ParametrizedAction
 from ..options import RelativeWindowSize, WindowPosition
-from ..server import CommandOutput, ServerCall, ServerCallFunctionGeneric
+from ..server import CommandOutput, Memoize, ServerCall, ServerCallFunctionGeneric
 
-type PreviewFunction[T, S] = ServerCallFunctionGeneric[T, S, str]
+type PreviewOutput = str | Iterable[str]  # iterators are streamed
+type PreviewFunction[T, S] = ServerCallFunctionGeneric[T, S, PreviewOutput | Awaitable[PreviewOutput]]
 type PreviewChangePreProcessor[T, S] = Callable[[PromptData[T, S], Preview[T, S]], Any]
 
 
 class SetAsCurrentPreview[T, S](ServerCall[T, S], LoggedComponent):
+    scope = "preview"
+
     def __init__(self, preview: Preview[T, S], before_change_do: PreviewChangePreProcessor[T, S] | None = None) -> None:
         LoggedComponent.__init__(self)
         self.preview = preview
@@ -28,7 +32,11 @@ class SetAsCurrentPreview[T, S](ServerCall[T, S], LoggedComponent):
             )
 
         super().__init__(
-            change_current_preview, f"SetAsCurrentPreview of {preview.name}", command_type="execute-silent"
+            change_current_preview,
+            f"SetAsCurrentPreview of {preview.name}",
+            command_type="execute-silent",
+            serial=True,
+            priority="interactive",
         )
 
     def __str__(self) -> str:
@@ -36,23 +44,69 @@ class SetAsCurrentPreview[T, S](ServerCall[T, S], LoggedComponent):
 
 
 class PreviewServerCall[T, S](ServerCall[T, S], LoggedComponent):
-    def __init__(self, preview_function: PreviewFunction[T, S], preview: Preview[T, S]) -> None:
+    scope = "preview"
+
+    def __init__(
+        self,
+        preview_function: PreviewFunction[T, S],
+        preview: Preview[T, S],
+        *,
+        deadline: float | None = None,
+        fallback_response: str = "Loading…",
+        cache_late_response: bool = True,
+        process_pool: bool = False,
+        memoize: Memoize | None = None,
+        supersedable: bool = True,
+    ) -> None:
+        """Late output is shown when the same entry is previewed again (e.g. after refresh-preview)
+
+        process_pool: Run preview function in a worker process (see ServerCall)
+        memoize: Reuse outputs of preview function (see Memoize), e.g. Memoize("current_index")
+        supersedable: Skip queued requests once a newer one arrives (fzf only shows the preview of the last focused
+            entry), turn it off for preview functions with side effects that must run for every request
+        """
         LoggedComponent.__init__(self)
         self.preview = preview
         self.preview_function = preview_function
-        super().__init__(preview_function, f"PreviewServerCall of {preview.name}", command_type="change-preview")
+        super().__init__(
+            preview_function,
+            f"PreviewServerCall of {preview.name}",
+            command_type="change-preview",
+            supersedable=supersedable,
+            deadline=deadline,
+            fallback_response=fallback_response,
+            cache_late_response=cache_late_response,
+            process_pool=process_pool,
+            memoize=memoize,
+        )
+        function = self.function  # awaits preview function running in a worker process if process_pool
 
         def preview_call(prompt_data: PromptData[T, S], **kwargs):
-            output = preview_function(prompt_data, **kwargs)
-            if self.preview.store_output:
-                self.preview.output = output
-            self.logger.trace(
-                f"Showing preview '{self.preview.name}'", trace_point="showing_preview", preview=self.preview.name
-            )
-            return output
+            return self._showing_output(function(prompt_data, **kwargs))
+
+        async def preview_call_async(prompt_data: PromptData[T, S], **kwargs):
+            return self._showing_output(await function(prompt_data, **kwargs))
 
         # HACK
-        self.function = preview_call
+        self.function = preview_call_async if inspect.iscoroutinefunction(function) else preview_call
+
+    def _showing_output(self, output: Any) -> Any:
+        if self.preview.store_output:
+            if isinstance(output, Iterator):
+                return self._storing_streamed_output(output)
+            self.preview.output = output
+        self.logger.trace(
+            f"Showing preview '{self.preview.name}'", trace_point="showing_preview", preview=self.preview.name
+        )
+        return output
+
+    def _storing_streamed_output(self, chunks: Iterator[str]) -> Iterator[str]:
+        """Output is stored once it's streamed whole"""
+        streamed = []
+        for chunk in chunks:
+            streamed.append(chunk)
+            yield chunk
+        self.preview.output = "".join(streamed)
 
     @property
     @override
@@ -64,6 +118,8 @@ class PreviewServerCall[T, S](ServerCall[T, S], LoggedComponent):
 
 
 class ShowAndStorePreviewOutput(ServerCall, LoggedComponent):
+    scope = "preview"
+
     def __init__(self, command: str, preview: Preview) -> None:
         LoggedComponent.__init__(self)
         name = f"Store preview output of {preview.name}"
@@ -2,19 +2,35 @@ from __future__ import annotations
 
 import json
 import os
+import subprocess
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from threading import Event, Lock
 from typing import TYPE_CHECKING, Any, Callable, Literal
 
 if TYPE_CHECKING:
     from .automator import Automator
+    from .server import PromptEndingAction
+    from .selection_mirror import SelectionMirror
+    from .serverless import ServerlessEndings
 from ..monitoring import LoggedComponent
 from .action_menu import ActionMenu
 from .controller import Controller
 from .options import Options, Trigger
 from .previewer import Previewer
-from .server import EndStatus, PostProcessor, PromptState, Server
+from .server import EndStatus, PostProcessor, PromptState, RequestClient, Server, ServerMetrics
 from .server.make_server_call import make_server_call
 
+type RequestState = tuple[PromptState, Trigger, Event | None]  # the event is set when the request gets superseded
+# state of requests being resolved in current thread (or asyncio task) keyed by their prompt (replaced, never mutated)
+_request_states: ContextVar[dict[PromptData, RequestState]] = ContextVar("request_states", default={})
+
+
+def get_resolving_prompt_data() -> PromptData | None:
+    """Prompt whose server call is being resolved in current thread (or asyncio task), the innermost one if nested"""
+    return next(reversed(_request_states.get()), None)
+
 
 class PromptData[T, S](LoggedComponent):
     """Accessed from fzf process through socket Server"""
@@ -31,6 +47,8 @@ class PromptData[T, S](LoggedComponent):
         super().__init__()
         self.logger.debug("PromptData created", trace_point="prompt_data_created")
         self.entries = entries or []
+        # entries are replaced by server calls (e.g. reload) while entries_stream is piped to fzf
+        self._entries_lock = Lock()
         self.converter = converter
         self.obj = obj
         self.action_menu = action_menu or ActionMenu()
@@ -40,8 +58,9 @@ class PromptData[T, S](LoggedComponent):
         self._controller: Controller | None = None
         self.options = options or Options()
         self.post_processors: list[PostProcessor] = []
-        self._state: PromptState | None = None
-        self._trigger: Trigger | None = None
+        # latest state and trigger swapped together (requests are resolved in parallel)
+        self._latest: tuple[PromptState, Trigger] | None = None
+        self._latest_lock = Lock()
         self._result: Result[T, S]
         self.id = datetime.now().isoformat()  # TODO: Use it?
         self.run_vars: dict[str, Any] = {}
@@ -49,18 +68,53 @@ class PromptData[T, S](LoggedComponent):
         self._stage: PromptStage = "created"
         self._control_port: int | None = None
         self.make_server_call = make_server_call
+        self.request_client: RequestClient = "python"
+        # when set, server calls don't send target indices and selections are read from it
+        self.selection_mirror: SelectionMirror | None = None
+        # that finished the prompt (it isn't necessarily bound, e.g. when returned by a Transform)
+        self.final_action: PromptEndingAction[T, S] | None = None
+        # when set, the prompt runs without Server and these print how it ended
+        self.serverless_endings: ServerlessEndings[T, S] | None = None
+        self.fzf_process: subprocess.Popen | None = None
+        # last one raised by a prompt nested in a server call (propagated unless the server call function handles it)
+        self.nested_prompt_error: BaseException | None = None
+        self.propagated_exception: BaseException | None = None  # raised when fzf ends
 
     @property
     def state(self) -> PromptState:
-        if not self._state:
+        """State of the request being resolved in current thread takes precedence over the latest state"""
+        if request_state := _request_states.get().get(self):
+            return request_state[0]
+        if not (latest := self._latest):
             raise RuntimeError(
                 "Current state not set (you're probably accessing current state before prompt has started)"
             )
-        return self._state
+        return latest[0]
 
     def set_state(self, prompt_state: PromptState, trigger: Trigger):
-        self._state = prompt_state
-        self._trigger = trigger
+        """Sets the latest state (fields of the last server call made by fzf, previous values of fields it didn't send)"""
+        with self._latest_lock:
+            latest_state = self._latest[0].updated_with(prompt_state) if self._latest else prompt_state
+            self._latest = (latest_state, trigger)
+
+    @contextmanager
+    def using_state(self, prompt_state: PromptState, trigger: Trigger, superseded: Event | None = None):
+        """State and trigger seen from current thread (or asyncio task) while resolving a request"""
+        token = _request_states.set(_request_states.get() | {self: (prompt_state, trigger, superseded)})
+        try:
+            yield
+        finally:
+            _request_states.reset(token)
+
+    @property
+    def request_superseded(self) -> bool:
+        """Whether a newer request was made to the endpoint being resolved (only for supersedable ServerCalls)
+
+        Long-running server call functions can check it and return early as their response won't be used.
+        """
+        if (request_state := _request_states.get().get(self)) and (superseded := request_state[2]):
+            return superseded.is_set()
+        return False
 
     @property
     def query(self) -> str:
@@ -69,11 +123,13 @@ class PromptData[T, S](LoggedComponent):
     @property
     def trigger(self) -> Trigger:
         """Trigger of the last ServerCall. For preview functions it's the trigger that made the switch to the preview."""
-        if not self._trigger:
+        if request_state := _request_states.get().get(self):
+            return request_state[1]
+        if not (latest := self._latest):
             raise RuntimeError(
                 "Current trigger not set (you're probably accessing current trigger before prompt has started)"
             )
-        return self._trigger
+        return latest[1]
 
     @property
     def current(self) -> T | None:
@@ -87,25 +143,32 @@ class PromptData[T, S](LoggedComponent):
 
     @property
     def selections(self) -> list[T]:
-        if self.state.selected_count == 0:
-            return []
-        return [self.entries[i] for i in self.state.target_indices]
+        return [self.entries[i] for i in self.selected_indices]
 
     @property
     def selected_indices(self) -> list[int]:
         if self.state.selected_count == 0:
             return []
-        return self.state.target_indices
+        if self.selection_mirror and "target_indices" not in self.state.fields:
+            return self.selection_mirror.selected_indices()
+        return list(self.state.target_indices)
 
     @property
     def targets(self) -> list[T]:
         """Like with '{+}' fzf placeholder these are selections or current if no selections"""
-        return [self.entries[i] for i in self.state.target_indices]
+        return [self.entries[i] for i in self.target_indices]
 
     @property
     def target_indices(self) -> list[int]:
         """Like with '{+n}' fzf placeholder these are indices of selections or current if no selections"""
-        return self.state.target_indices
+        if self.selection_mirror and "target_indices" not in self.state.fields:
+            return self.selection_mirror.target_indices(self.state.current_index, self.state.selected_count)
+        return list(self.state.target_indices)
+
+    @property
+    def metrics(self) -> ServerMetrics:
+        """Request statistics of server calls made so far"""
+        return self.server.metrics
 
     @property
     def stage(self) -> PromptStage:
@@ -114,6 +177,34 @@ class PromptData[T, S](LoggedComponent):
     def set_stage(self, stage: PromptStage):
         self._stage = stage
 
+    def propagate_exception(self, err: BaseException):
+        """Ends the prompt (fzf is terminated) so that running it raises the exception (the first one propagated)"""
+        if self.propagated_exception is not None:
+            return
+        self.propagated_exception = err
+        self.logger.warning(f"Ending prompt to propagate {err!r}", trace_point="propagating_exception")
+        if self.fzf_process is not None and self.fzf_process.poll() is None:
+            self.fzf_process.terminate()
+
+    def replace_entries(self, entries: list[T]) -> None:
+        """Entries still being piped to fzf (entries_stream) are no longer added to the new ones"""
+        with self._entries_lock:
+            self.entries = entries
+
+    def append_piped_entry(self, entry: T, piped_entries: list[T]) -> bool:
+        """Appends entry unless the piped entries were replaced meanwhile, returns whether it was appended"""
+        with self._entries_lock:
+            if self.entries is not piped_entries:
+                return False
+            piped_entries.append(entry)
+            return True
+
+    def remove_piped_entry(self, entry: T, piped_entries: list[T]) -> None:
+        """Removes the last appended entry (fzf didn't get it) unless the piped entries were replaced meanwhile"""
+        with self._entries_lock:
+            if self.entries is piped_entries and piped_entries and piped_entries[-1] is entry:
+                piped_entries.pop()
+
     @property
     def entries_delimiter(self) -> str:
         return "\0" if self.options.get_index_of_last("--read0") is not None else "\n"
@@ -167,6 +258,7 @@ class Result[T, S](list[T]):
         selections: list[T],
         target_indices: list[int],
         obj: S,
+        metrics: ServerMetrics | None = None,
     ):
         self.end_status: EndStatus | None = end_status
         self.trigger: Trigger | None = trigger
@@ -177,6 +269,7 @@ class Result[T, S](list[T]):
         self.selections = selections
         self.target_indices = target_indices  # of selections or current if no selections
         self.obj = obj
+        self.metrics = metrics or ServerMetrics()  # of server calls made during the prompt
         super().__init__([entries[i] for i in target_indices])
 
     def to_dict(self) -> dict:
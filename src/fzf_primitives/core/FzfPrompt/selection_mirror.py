@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, Iterable, Literal
+
+if TYPE_CHECKING:
+    from .action_menu import Action, ActionMenu
+    from .prompt_data import PromptData
+from ..monitoring import LoggedComponent
+from .action_menu.binding import Binding
+from .action_menu.transform import Transform
+from .server import FzfPlaceholder, ServerCall, requires_state
+
+type SelectionChange = Literal["toggle", "select", "deselect", "bulk"]
+# actions changing selection of the entry under the pointer (fzf sends its index before performing them)
+SINGLE_ENTRY_ACTIONS: dict[str, SelectionChange] = {
+    "toggle": "toggle",
+    "toggle+down": "toggle",
+    "toggle+up": "toggle",
+    "toggle-in": "toggle",
+    "toggle-out": "toggle",
+    "select": "select",
+    "deselect": "deselect",
+}
+BULK_ACTIONS = ("select-all", "deselect-all", "toggle-all", "clear-selection")
+
+
+class SelectionMirror(LoggedComponent):
+    """Indices of selected entries kept in Python so that server calls don't need fzf to send them ('{+n}')
+
+    Bound actions changing selection of the entry under the pointer (toggle, select, deselect) are applied as they
+    happen (fzf only sends the index of that entry). When fzf fires 'multi' event (selection changed) only the
+    selected count is sent, the selection is read whole ('{+nf}') only if it doesn't match the mirror (e.g. after
+    select-all, fzf's default tab binding or a mouse click) and once more before the prompt ends. fzf clearing
+    selections without firing 'multi' (e.g. on reload) is noticed through the selected count that's still sent with
+    server calls.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._indices: dict[int, None] = {}  # in order of selection like '{+n}'
+        self._lock = Lock()
+        self._stale = False  # bulk action was performed (count alone can't tell whether the mirror matches)
+        self.syncs = 0  # selection was read whole
+        self.changes = 0  # single entry changes applied
+        self.mismatches = 0  # found when resyncing at the end of the prompt ('multi' events were missed)
+
+    @property
+    def indices(self) -> list[int]:
+        with self._lock:
+            return list(self._indices)
+
+    def update(self, indices: Iterable[int]) -> None:
+        indices = dict.fromkeys(indices)
+        with self._lock:
+            self._indices = indices
+            self._stale = False
+            self.syncs += 1
+
+    def clear(self) -> None:
+        """fzf counted no selections (nothing to read)"""
+        with self._lock:
+            self._indices = {}
+            self._stale = False
+
+    def apply(self, change: SelectionChange, index: int | None) -> None:
+        """Change of the entry under the pointer about to be made by fzf (bulk one makes the mirror stale)"""
+        with self._lock:
+            if change == "bulk":
+                self._stale = True
+                return
+            if index is None:
+                return
+            if change == "select" or (change == "toggle" and index not in self._indices):
+                self._indices[index] = None
+            else:
+                self._indices.pop(index, None)
+            self.changes += 1
+
+    def matches(self, selected_count: int) -> bool:
+        """Whether the mirror can be trusted to hold selections fzf counted (without reading them)"""
+        with self._lock:
+            return not self._stale and len(self._indices) == selected_count
+
+    def resync(self, indices: Iterable[int]) -> bool:
+        """Replaces the indices counting a mismatch if they differed, returns whether they matched"""
+        indices = dict.fromkeys(indices)
+        with self._lock:
+            matched = list(indices) == list(self._indices)
+            self._indices = indices
+            self._stale = False
+            self.syncs += 1
+            self.mismatches += not matched
+        if not matched:
+            self.logger.warning("Selection mirror was out of sync with fzf", trace_point="selection_mirror_out_of_sync")
+        return matched
+
+    def selected_indices(self, selected_count: int | None = None) -> list[int]:
+        """selected_count: Count fzf sent with the server call (0 means selections were cleared)"""
+        return [] if selected_count == 0 else self.indices
+
+    def target_indices(self, current_index: int | None, selected_count: int | None = None) -> list[int]:
+        """Like '{+n}': indices of selections or current index if nothing is selected"""
+        if indices := self.selected_indices(selected_count):
+            return indices
+        return [] if current_index is None else [current_index]
+
+    def check(self, selected_indices: Iterable[int]) -> None:
+        """Raises SelectionMirrorOutOfSync if the mirror differs from selections made in fzf (e.g. in tests)"""
+        if (expected := list(selected_indices)) != (mirrored := self.indices):
+            raise SelectionMirrorOutOfSync(f"Mirrored selections {mirrored} differ from fzf selections {expected}")
+        if self.mismatches:
+            raise SelectionMirrorOutOfSync(f"Selection mirror was found out of sync {self.mismatches} time(s)")
+
+
+class SyncSelectionMirror[T, S](ServerCall[T, S]):
+    """Updates SelectionMirror of the prompt from the file fzf writes selected indices to ('{+nf}')
+
+    Reading and parsing the file is O(selection), so it's only done when the mirror can't be kept in sync otherwise.
+
+    resync: Count a mismatch if the mirror differed (used right before the prompt ends)
+    """
+
+    def __init__(self, *, resync: bool = False) -> None:
+        self.resync = resync
+
+        def sync_selection_mirror(
+            prompt_data: PromptData[T, S], target_indices_file: str = FzfPlaceholder.preset.TARGET_INDICES_FILE
+        ):
+            if (selection_mirror := prompt_data.selection_mirror) is None:
+                raise RuntimeError("Selection mirror isn't enabled for the prompt")
+            # with nothing selected fzf writes current index to the file
+            indices = [] if prompt_data.state.selected_count == 0 else _read_indices(target_indices_file)
+            if self.resync:
+                selection_mirror.resync(indices)
+            else:
+                selection_mirror.update(indices)
+
+        super().__init__(
+            sync_selection_mirror,
+            "resync selection mirror" if resync else "sync selection mirror",
+            command_type="execute-silent",
+            serial=True,
+            state_fields=("selected_count",),
+            priority="interactive",
+        )
+
+
+class ApplySelectionChange[T, S](ServerCall[T, S]):
+    """Applies a change fzf is about to make to SelectionMirror of the prompt (bound right before the action)"""
+
+    def __init__(self, change: SelectionChange) -> None:
+        self.change: SelectionChange = change
+
+        def apply_selection_change(prompt_data: PromptData[T, S]):
+            if (selection_mirror := prompt_data.selection_mirror) is None:
+                raise RuntimeError("Selection mirror isn't enabled for the prompt")
+            selection_mirror.apply(change, None if change == "bulk" else prompt_data.current_index)
+
+        super().__init__(
+            apply_selection_change,
+            f"apply {change} to selection mirror",
+            command_type="execute-silent",
+            serial=True,
+            state_fields=() if change == "bulk" else ("current_index",),
+            priority="interactive",
+        )
+
+
+def check_selection_mirror[T, S]() -> Transform[T, S]:
+    """Bound to 'multi' event, reads the selection whole only if the selected count doesn't match the mirror"""
+    sync = SyncSelectionMirror[T, S]()
+
+    @requires_state("selected_count")
+    def syncing_when_out_of_sync(prompt_data: PromptData[T, S]) -> list[ServerCall[T, S]]:
+        if (selection_mirror := prompt_data.selection_mirror) is None:
+            raise RuntimeError("Selection mirror isn't enabled for the prompt")
+        if (selected_count := prompt_data.state.selected_count) == 0:
+            selection_mirror.clear()
+        elif not selection_mirror.matches(selected_count):
+            return [sync]
+        return []
+
+    return Transform(syncing_when_out_of_sync, "check selection mirror")
+
+
+def bind_selection_mirror(action_menu: ActionMenu) -> None:
+    """Binds applying changes of selection before the actions making them, checking the selection mirror on 'multi'
+    event and syncing it before every prompt ending action
+    """
+    action_menu.add("multi", Binding("check selection mirror", check_selection_mirror()), on_conflict="prepend")
+    for binding in action_menu.bindings.values():
+        binding.actions[:] = _with_selection_changes_applied(binding.actions)
+        if binding.final_action:
+            # first so that other server calls of the binding see synced selections
+            binding.actions.insert(0, SyncSelectionMirror(resync=True))
+
+
+def _with_selection_changes_applied[T, S](actions: list[Action[T, S]]) -> list[Action[T, S]]:
+    applied: list[Action[T, S]] = []
+    for action in actions:
+        if isinstance(action, str) and (change := SINGLE_ENTRY_ACTIONS.get(action)):
+            applied.append(ApplySelectionChange(change))
+        elif isinstance(action, str) and action in BULK_ACTIONS:
+            applied.append(ApplySelectionChange("bulk"))
+        applied.append(action)
+    return applied
+
+
+def _read_indices(path: str) -> list[int]:
+    return [int(line) for line in Path(path).read_text().splitlines() if line]
+
+
+class SelectionMirrorOutOfSync(AssertionError):
+    pass
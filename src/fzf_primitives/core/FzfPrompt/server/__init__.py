@@ -3,8 +3,12 @@ from __future__ import annotations
 from ..options import EndStatus
 from .actions import (
     MAKE_SERVER_CALL_ENV_VAR_NAME,
+    SERVER_NAMESPACE_ENV_VAR,
+    SOCKET_ADDRESS_ENV_VAR,
     SOCKET_NUMBER_ENV_VAR,
+    CachedCommandOutput,
     CommandOutput,
+    FusedServerCall,
     FzfPlaceholder,
     PostProcessor,
     PromptEndingAction,
@@ -12,25 +16,71 @@ from .actions import (
     ServerCallFunction,
     ServerCallFunctionGeneric,
     VarOutput,
+    requires_state,
 )
-from .request import PromptState, Request, ServerEndpoint
-from .server import ReusedServerCall, Server
+from .executor import PriorityExecutor
+from .memoization import Memoize, ResponseCache
+from .metrics import EndpointMetrics, QueueWaitMetrics, ServerMetrics
+from .process_pool import ProcessPool, PromptSnapshot
+from .recording import RecordedRequest, ReplayReport, RequestRecorder, RequestReplayer, read_recording
+from .request import (
+    ENDPOINT_SCOPES,
+    PRIORITIES,
+    STATE_FIELDS,
+    EndpointScope,
+    Priority,
+    PromptState,
+    Request,
+    ServerEndpoint,
+    StateField,
+    StateFieldNotSent,
+)
+from .server import REQUEST_CLIENTS, RequestClient, ReusedServerCall, Server, ServerTransport, SharedServer
 
 __all__ = [
+    "CachedCommandOutput",
     "CommandOutput",
+    "ENDPOINT_SCOPES",
+    "EndpointMetrics",
+    "EndpointScope",
     "EndStatus",
+    "FusedServerCall",
     "FzfPlaceholder",
     "MAKE_SERVER_CALL_ENV_VAR_NAME",
+    "Memoize",
     "PostProcessor",
+    "PRIORITIES",
+    "ProcessPool",
+    "Priority",
+    "PriorityExecutor",
     "PromptEndingAction",
+    "PromptSnapshot",
     "PromptState",
+    "QueueWaitMetrics",
+    "read_recording",
+    "RecordedRequest",
+    "ReplayReport",
     "Request",
+    "REQUEST_CLIENTS",
+    "RequestRecorder",
+    "RequestReplayer",
+    "RequestClient",
+    "ResponseCache",
     "ReusedServerCall",
     "Server",
     "ServerCall",
     "ServerCallFunction",
     "ServerCallFunctionGeneric",
     "ServerEndpoint",
+    "ServerMetrics",
+    "ServerTransport",
+    "SERVER_NAMESPACE_ENV_VAR",
+    "SharedServer",
+    "SOCKET_ADDRESS_ENV_VAR",
     "SOCKET_NUMBER_ENV_VAR",
+    "STATE_FIELDS",
+    "StateField",
+    "StateFieldNotSent",
     "VarOutput",
+    "requires_state",
 ]
@@ -2,21 +2,57 @@ from __future__ import annotations
 
 import functools
 import inspect
+import itertools
+import math
 import shlex
-from typing import TYPE_CHECKING, Any, Callable, Concatenate, Self, Type, override
+from collections import OrderedDict
+from threading import Lock
+from types import FunctionType, MethodType
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Concatenate, Hashable, Iterable, Self, Type, override
 
 if TYPE_CHECKING:
     from ..prompt_data import PromptData
 from ...monitoring import LoggedComponent
 from ..action_menu.parametrized_actions import ShellCommand
 from ..options import EndStatus, ShellCommandActionType
-from .placeholders import CommandOutput, FzfPlaceholder, VarOutput
+from .memoization import Memoize, memoized
+from .placeholders import CachedCommandOutput, CommandOutput, FzfPlaceholder, VarOutput, with_cached_command_outputs
+from .process_pool import run_in_process_pool
+from .request import PRIORITIES, STATE_FIELDS, EndpointScope, Priority, StateField
 
 # means it requires first parameter to be of type PromptData but other parameters can be anything
 type ServerCallFunctionGeneric[T, S, R] = Callable[Concatenate[PromptData[T, S], ...], R]
 type ServerCallFunction[T, S] = ServerCallFunctionGeneric[T, S, Any]
-SOCKET_NUMBER_ENV_VAR = "FZF_PRIMITIVES_SOCKET_NUMBER"
+SOCKET_NUMBER_ENV_VAR = "FZF_PRIMITIVES_SOCKET_NUMBER"  # port number (only set with TCP transport)
+SOCKET_ADDRESS_ENV_VAR = "FZF_PRIMITIVES_SOCKET_ADDRESS"  # port number or Unix domain socket path
 MAKE_SERVER_CALL_ENV_VAR_NAME = "FZF_PRIMITIVES_REQUEST_CREATING_SCRIPT"
+SERVER_NAMESPACE_ENV_VAR = "FZF_PRIMITIVES_SERVER_NAMESPACE"  # routes requests to prompt's Server (shared server only)
+# code of state field for request client and what it's expanded from (fzf placeholders and env vars)
+STATE_FIELD_ARGUMENTS: dict[StateField, tuple[str, str]] = {
+    "query": ("q", "{q}"),
+    "current_index": ("n", "{n}"),
+    "selected_count": ("s", "$FZF_SELECT_COUNT"),
+    "target_indices": ("t", '"{+n}"'),  # with many selections it's the longest argument by far
+}
+COMMAND_TEMPLATE_CACHE_SIZE = 1024
+# command arguments following endpoint id (least recently used are dropped beyond the cache size)
+_command_templates: OrderedDict[tuple[Hashable, tuple[StateField, ...]], str] = OrderedDict()
+_command_templates_lock = Lock()
+
+
+def requires_state[F: Callable](*state_fields: StateField) -> Callable[[F], F]:
+    """Declares which fields of PromptState a server call function reads (all of them if not declared)
+
+    e.g. preview function that only looks at current entry:
+    @requires_state("current_index")
+    def preview(prompt_data): ...
+    """
+
+    def decorator(function: F) -> F:
+        setattr(function, "__state_fields__", state_fields)
+        return function
+
+    return decorator
 
 
 class RemembersHowItWasConstructed[T](type):
@@ -32,16 +68,80 @@ class ServerCall[T, S](ShellCommand[T, S], metaclass=RemembersHowItWasConstructe
     also themselves parametrized by trigger so they're unique and ServerCall.id needs to find them
     """
 
+    scope: ClassVar[EndpointScope] = "prompt"  # of its endpoints (unless registered by a Transform)
+    retired: bool = False
+    # number of the last retirement of any server call (lets Transforms skip looking for retired ones)
+    last_retirement: ClassVar[int] = 0
+    _retirements: ClassVar[Iterable[int]] = itertools.count(1)
+
     def __init__(
         self,
         function: ServerCallFunction[T, S],
         description: str | None = None,
         command_type: ShellCommandActionType = "execute",
+        *,
+        serial: bool = False,
+        supersedable: bool = False,
+        superseded_response: str = "",
+        state_fields: Iterable[StateField] | None = None,
+        deadline: float | None = None,
+        fallback_response: str = "",
+        cache_late_response: bool = False,
+        priority: Priority = "normal",
+        process_pool: bool = False,
+        memoize: Memoize | None = None,
     ) -> None:
+        """function: Async functions are awaited on the event loop of Server (many can be in flight together unless
+            serial) and cancelled when the prompt ends
+        serial: Don't run at the same time as other serial calls (of any priority) and keep order of arrival among
+            those of the same priority, even when Server resolves requests concurrently
+        supersedable: When a newer call arrives, a queued older one is answered with superseded_response right away
+            and a running one can notice it through PromptData.request_superseded
+        state_fields: Fields of PromptState fzf sends with the call (defaults to those declared with
+            @requires_state or all of them); accessing others in the function raises StateFieldNotSent
+        deadline: Seconds since fzf made the call after which it gets fallback_response (defaults to the prompt-wide
+            deadline, math.inf opts out of it); the function keeps running and its late response is dropped or
+            (cache_late_response) used for the next call made in the same prompt state (async function is cancelled
+            with asyncio.timeout unless its late response is cached); the next serial call waits until it finishes;
+            the deadline only applies until the function returns, chunks of a returned iterator are streamed
+            without one
+        priority: Queued calls of a higher priority class are resolved first ('interactive' for calls a user waits
+            on, 'background' for e.g. auto-repeated reloads); running call isn't preempted, so a serial one waits
+            for the serial call being resolved whatever its priority
+        process_pool: Run the (CPU-bound) function in a worker process of ProcessPool so that it doesn't hold the GIL
+            of the prompt; it gets PromptSnapshot instead of PromptData, has to be defined at module level and its
+            arguments and response have to be picklable
+        memoize: Reuse responses of the function for calls made with the same values of the declared state fields
+            (which have to be sent) and the same arguments (see Memoize)
+        """
+        self.process_pool = process_pool
+        if process_pool:
+            function = run_in_process_pool(function)
+        self.memoize = memoize
         self.name = description or f"f:{self._get_function_name(function)}"
         self.function = function
+        self.serial = serial
+        self.supersedable = supersedable
+        self.superseded_response = superseded_response
+        self.deadline = deadline
+        self.fallback_response = fallback_response
+        self.cache_late_response = cache_late_response
+        self.priority: Priority = priority
+        if state_fields is None:
+            state_fields = getattr(function, "__state_fields__", STATE_FIELDS)
+        if unknown_fields := set(state_fields).difference(STATE_FIELDS):
+            raise ValueError(f"Unknown state fields: {unknown_fields} (known: {STATE_FIELDS})")
+        self.state_fields: tuple[StateField, ...] = tuple(f for f in STATE_FIELDS if f in state_fields)
+        if memoize:
+            self._check_memoized_fields(memoize)
+            self.function = memoized(self.function, memoize)
+        # evaluated by Server (memoized responses are keyed on their outputs too)
+        cached_outputs = self._get_cached_command_outputs(self.function)
+        self.cached_command_outputs: tuple[CachedCommandOutput, ...] = tuple(cached_outputs.values())
+        if cached_outputs:
+            self.function = with_cached_command_outputs(self.function, cached_outputs)
 
-        command = self._create_command(self.id, self.function)
+        command = self._create_command(self.id, self.function, self.state_fields)
         super().__init__(command, command_type)
 
     @property
@@ -52,11 +152,33 @@ class ServerCall[T, S](ShellCommand[T, S], metaclass=RemembersHowItWasConstructe
         return function.__name__ if hasattr(function, "__name__") else str(function)
 
     @staticmethod
-    def _create_command(endpoint_id: str, function: ServerCallFunction) -> str:
+    def _create_command(
+        endpoint_id: str, function: ServerCallFunction, state_fields: Iterable[StateField] = STATE_FIELDS
+    ) -> str:
+        state_fields = tuple(state_fields)
+        command_start = f'"${MAKE_SERVER_CALL_ENV_VAR_NAME}" "${SOCKET_ADDRESS_ENV_VAR}" {shlex.quote(endpoint_id)}'
+        if (template_key := _command_template_key(function)) is None:
+            return f"{command_start} {ServerCall._create_command_template(function, state_fields)}"
+        key = (template_key, state_fields)
+        with _command_templates_lock:
+            if (template := _command_templates.get(key)) is not None:
+                _command_templates.move_to_end(key)
+                return f"{command_start} {template}"
+        template = ServerCall._create_command_template(function, state_fields)
+        with _command_templates_lock:
+            _command_templates[key] = template
+            if len(_command_templates) > COMMAND_TEMPLATE_CACHE_SIZE:
+                _command_templates.popitem(last=False)
+        return f"{command_start} {template}"
+
+    @staticmethod
+    def _create_command_template(function: ServerCallFunction, state_fields: Iterable[StateField]) -> str:
         parameters = ServerCall._parse_function_parameters(function)
+        state_arguments = [STATE_FIELD_ARGUMENTS[field] for field in state_fields]
         command = [
-            f'"${MAKE_SERVER_CALL_ENV_VAR_NAME}" "${SOCKET_NUMBER_ENV_VAR}" {shlex.quote(endpoint_id)}',
-            '{q} {n} $FZF_SELECT_COUNT "{+n}"',  # making use of fzf placeholders and env vars
+            # codes of sent state fields followed by their values
+            "".join(code for code, _ in state_arguments) or "-",
+            *(argument for _, argument in state_arguments),
         ]
         for parameter in parameters:
             if isinstance(parameter.default, CommandOutput):
@@ -72,12 +194,45 @@ class ServerCall[T, S](ShellCommand[T, S], metaclass=RemembersHowItWasConstructe
 
     @staticmethod
     def _parse_function_parameters(function: ServerCallFunction) -> list[inspect.Parameter]:
+        """Parameters fzf sends values of (CachedCommandOutput ones are passed by Server)"""
         params = list(inspect.signature(function).parameters.values())[1:]  # excludes prompt_data
         if isinstance(function, functools.partial):
             if function.args:
                 raise ValueError("Partial functions should only have passed keyworded arguments")
             params = list(filter(lambda p: p.name not in function.keywords, params))
-        return params
+        return [p for p in params if not isinstance(p.default, CachedCommandOutput)]
+
+    @staticmethod
+    def _get_cached_command_outputs(function: ServerCallFunction) -> dict[str, CachedCommandOutput]:
+        # server calls are created on the fly (e.g. by Transforms) so plain functions skip inspect.signature
+        if isinstance(unwrapped := inspect.unwrap(function), FunctionType) and not any(
+            isinstance(default, CachedCommandOutput)
+            for default in (*(unwrapped.__defaults__ or ()), *(unwrapped.__kwdefaults__ or {}).values())
+        ):
+            return {}
+        return {
+            p.name: p.default
+            for p in inspect.signature(function).parameters.values()
+            if isinstance(p.default, CachedCommandOutput)
+        }
+
+    def _check_memoized_fields(self, memoize: Memoize) -> None:
+        if unsent_fields := set(memoize.state_fields).difference(self.state_fields):
+            raise ValueError(
+                f"{self.name}: Memoized server call isn't sent state fields it's keyed on: {unsent_fields}"
+            )
+
+    def retire(self) -> None:
+        """Endpoints created from the server call by Transforms are removed (e.g. it's of an outdated Preview)"""
+        self.retired = True
+        ServerCall.last_retirement = next(ServerCall._retirements)  # type: ignore
+
+    def exclude_state_fields(self, *state_fields: StateField) -> None:
+        """Stops fzf from sending the fields with the call (e.g. when the prompt gets them another way)"""
+        if not set(state_fields).intersection(self.state_fields):
+            return
+        self.state_fields = tuple(f for f in self.state_fields if f not in state_fields)
+        self.action_value = self._create_command(self.id, self.function, self.state_fields)
 
     def __str__(self) -> str:
         return f"[SC]{self.command_type}({self.id})"
@@ -86,6 +241,129 @@ class ServerCall[T, S](ShellCommand[T, S], metaclass=RemembersHowItWasConstructe
         return getattr(self, "_new_copy")()
 
 
+def _command_template_key(function: ServerCallFunction) -> Hashable | None:
+    """What parameters of a function (and so its command template) depend on, None if it can't be cached
+
+    Functions sharing code and placeholder defaults share the key (e.g. closures created for each instance).
+    """
+    if isinstance(function, functools.partial):
+        if function.args or (key := _command_template_key(function.func)) is None:
+            return None
+        return ("partial", key, tuple(sorted(function.keywords)))
+    if "__signature__" in getattr(function, "__dict__", {}):
+        return None
+    if (wrapped := getattr(function, "__wrapped__", None)) is not None:
+        return None if (key := _command_template_key(wrapped)) is None else ("wrapped", key)
+    if isinstance(function, MethodType):
+        return None if (key := _command_template_key(function.__func__)) is None else ("bound", key)
+    if isinstance(function, FunctionType):
+        defaults = [*(function.__defaults__ or ()), *(function.__kwdefaults__ or {}).values()]
+        return (
+            function.__code__,
+            tuple(
+                (type(default), str(default))
+                if isinstance(default, (CommandOutput, VarOutput, FzfPlaceholder))
+                else None
+                for default in defaults
+            ),
+        )
+    return None
+
+
+class FusedServerCall[T, S](ServerCall[T, S]):
+    """Consecutive execute-silent server calls of a binding resolved in order within one request
+
+    fzf spawns one request client for all of them instead of one per call. Functions keep their own parameters
+    (ones with the same name have to share the default).
+    """
+
+    def __init__(self, *server_calls: ServerCall[T, S]) -> None:
+        self.server_calls = server_calls
+        parameters = {
+            call.id: [p.name for p in self._parse_function_parameters(call.function)] for call in server_calls
+        }
+
+        def run_fused(prompt_data: PromptData[T, S], **kwargs):
+            errors: list[Exception] = []
+            for call in server_calls:
+                try:
+                    call.function(prompt_data, **{name: kwargs[name] for name in parameters[call.id]})
+                except Exception as err:
+                    errors.append(err)
+            if errors:
+                raise errors[0]  # the rest still ran as they would have without fusion
+
+        setattr(
+            run_fused,
+            "__signature__",
+            inspect.Signature(
+                [
+                    inspect.Parameter("prompt_data", inspect.Parameter.POSITIONAL_OR_KEYWORD),
+                    *self._merge_parameters(server_calls).values(),
+                ]
+            ),
+        )
+        super().__init__(
+            run_fused,
+            "->".join(call.name for call in server_calls),
+            command_type="execute-silent",
+            serial=any(call.serial for call in server_calls),
+            state_fields=[f for f in STATE_FIELDS if any(f in call.state_fields for call in server_calls)],
+            deadline=math.inf if any(call.deadline == math.inf for call in server_calls) else None,
+            priority=min((call.priority for call in server_calls), key=PRIORITIES.index),
+        )
+        self.cached_command_outputs = tuple(output for call in server_calls for output in call.cached_command_outputs)
+
+    @staticmethod
+    def can_fuse(action: Any) -> bool:
+        """Calls whose response fzf ignores and which the Server resolves like any other call"""
+        return (
+            isinstance(action, ServerCall)
+            and action.command_type == "execute-silent"
+            and not action.supersedable
+            and not action.cache_late_response
+            and action.deadline in (None, math.inf)
+            and not inspect.iscoroutinefunction(action.function)
+        )
+
+    @classmethod
+    def can_fuse_with(cls, server_calls: Iterable[ServerCall], server_call: ServerCall) -> bool:
+        merged = cls._merge_parameters(server_calls)
+        return all(
+            cls._is_same_default(merged[p.name].default, p.default)
+            for p in cls._parse_function_parameters(server_call.function)
+            if p.name in merged
+        )
+
+    @staticmethod
+    def _is_same_default(default: Any, other: Any) -> bool:
+        """Of the same type and value (e.g. CommandOutput and VarOutput of the same text aren't), cached command
+        outputs have to be the same object as they keep their own outputs
+        """
+        if isinstance(default, CachedCommandOutput) or isinstance(other, CachedCommandOutput):
+            return default is other
+        return (type(default), default) == (type(other), other)
+
+    @classmethod
+    def _merge_parameters(cls, server_calls: Iterable[ServerCall]) -> dict[str, inspect.Parameter]:
+        merged: dict[str, inspect.Parameter] = {}
+        for call in server_calls:
+            for parameter in cls._parse_function_parameters(call.function):
+                merged.setdefault(parameter.name, parameter.replace(kind=inspect.Parameter.KEYWORD_ONLY))
+        return merged
+
+    @override
+    def action_string(self) -> str:
+        # actions the last call adds after itself (e.g. accept of PromptEndingAction)
+        last_call = self.server_calls[-1]
+        return (
+            f"{super().action_string()}{last_call.action_string().removeprefix(ShellCommand.action_string(last_call))}"
+        )
+
+    def __str__(self) -> str:
+        return f"[FSC]({'->'.join(str(call) for call in self.server_calls)})"
+
+
 type PostProcessor[T, S] = Callable[[PromptData[T, S]], Any]
 
 
@@ -103,9 +381,13 @@ class PromptEndingAction[T, S](ServerCall, LoggedComponent):
         self.end_status: EndStatus = end_status
         self.post_processor = post_processor
         self.allow_empty = allow_empty
-        super().__init__(self._finish_prompt, command_type="execute-silent")
+        # prompt shouldn't be accepted by fzf before it's finished
+        super().__init__(
+            self._finish_prompt, command_type="execute-silent", serial=True, deadline=math.inf, priority="interactive"
+        )
 
     def _finish_prompt(self, prompt_data: PromptData[T, S]):
+        prompt_data.final_action = self
         prompt_data.set_stage("finished")
         self.logger.trace("Finishing prompt", trace_point="finishing_prompt")
 
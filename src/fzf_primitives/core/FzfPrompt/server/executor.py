@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from concurrent.futures import Future
+from threading import Condition, Thread
+from typing import Any, Callable
+
+from .request import PRIORITIES, Priority
+
+
+class PriorityExecutor:
+    """Thread pool starting queued work by priority class (in order of submission within a class)
+
+    Work that is already running isn't preempted. Threads are started when needed (up to max_workers) and are daemon
+    threads so that an idle executor kept for reuse doesn't block exit.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str) -> None:
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue: list[tuple[int, int, Future, Callable, tuple]] = []
+        self._order = itertools.count()
+        self._condition = Condition()
+        self._threads: list[Thread] = []
+        self._idle_workers = 0
+        self._shutdown = False
+
+    def submit(self, fn: Callable, /, *args: Any, priority: Priority = "normal") -> Future:
+        future: Future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit work after shutdown")
+            heapq.heappush(self._queue, (PRIORITIES.index(priority), next(self._order), future, fn, args))
+            if self._idle_workers == 0 and len(self._threads) < self.max_workers:
+                thread = Thread(target=self._work, name=f"{self.thread_name_prefix}_{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            else:
+                self._condition.notify()
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Work queued before shutdown is still done"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                self._idle_workers += 1
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                self._idle_workers -= 1
+                if not self._queue:
+                    return
+                _, _, future, fn, args = heapq.heappop(self._queue)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as err:
+                future.set_exception(err)
@@ -2,52 +2,145 @@
 
 
 import json
+import os
 import socket
 import sys
-from typing import TypedDict
+from typing import BinaryIO, TypedDict
 
+# Frame: version (1 byte) | payload kind (1 byte) | payload length (8 bytes, big-endian) | payload
+PROTOCOL_VERSION = 2  # version 1 had only 4-byte length prefix
+TEXT, BYTES = 0, 1  # payload kinds (text is UTF-8 encoded)
+STREAM = 2  # UTF-8 text of unknown length (0 in header) produced in chunks, it ends when server closes connection
+HEADER_SIZE = 10
+CHUNK_SIZE = 1 << 20
+NAMESPACE_ENV_VAR = "FZF_PRIMITIVES_SERVER_NAMESPACE"  # set for fzf when prompt's server is shared
 
-class PromptStateDict(TypedDict):
+
+class PromptStateDict(TypedDict, total=False):  # only fields the server call requires are sent
     query: str
     current_index: int | None
     selected_count: int
     target_indices: list[int]
 
 
-def make_server_call(port: int, endpoint_id: str, prompt_state: PromptStateDict, /, kwargs):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client:
-        client.connect(("localhost", port))
+def make_header(kind: int, length: int) -> bytes:
+    return bytes((PROTOCOL_VERSION, kind)) + length.to_bytes(8)
+
+
+def parse_header(header: bytes) -> tuple[int, int, int]:
+    """Returns version, payload kind and payload length"""
+    if len(header) != HEADER_SIZE:
+        raise ConnectionError(f"Incomplete frame header: {header!r}")
+    return header[0], header[1], int.from_bytes(header[2:])
+
+
+def make_server_call(
+    address: int | str, endpoint_id: str, prompt_state: PromptStateDict, /, kwargs, namespace: str | None = None
+) -> str | bytes:
+    """address: port number (TCP on localhost) or path to Unix domain socket
+    namespace: of prompt's server when the server is shared by prompts
+    """
+    with _send_request(address, endpoint_id, prompt_state, kwargs, namespace) as client:
+        kind, length = _receive_response_header(client)
+        if kind == STREAM:
+            chunks = []
+            while chunk := client.recv(CHUNK_SIZE):
+                chunks.append(chunk)
+            return b"".join(chunks).decode("utf-8")
+        response = bytearray(length)
+        view = memoryview(response)
+        received = 0
+        while received < length:
+            if not (n := client.recv_into(view[received:])):
+                raise ConnectionError(f"Connection closed after {received} of {length} bytes")
+            received += n
+        return response.decode("utf-8") if kind == TEXT else bytes(response)
+
+
+def stream_server_call(
+    address: int | str,
+    endpoint_id: str,
+    prompt_state: PromptStateDict,
+    /,
+    kwargs,
+    output: BinaryIO,
+    namespace: str | None = None,
+) -> int:
+    """Writes response to output in chunks as it arrives (response is never held whole in memory)
+
+    Returns number of bytes written
+    """
+    with _send_request(address, endpoint_id, prompt_state, kwargs, namespace) as client:
+        kind, length = _receive_response_header(client)
+        if kind == STREAM:
+            buffer = memoryview(bytearray(CHUNK_SIZE))
+            written = 0
+            while n := client.recv_into(buffer):
+                output.write(buffer[:n])
+                output.flush()  # so that fzf shows it right away
+                written += n
+            return written
+        buffer = memoryview(bytearray(min(length, CHUNK_SIZE)))
+        remaining = length
+        while remaining:
+            if not (n := client.recv_into(buffer[: min(remaining, CHUNK_SIZE)])):
+                raise ConnectionError(f"Connection closed after {length - remaining} of {length} bytes")
+            output.write(buffer[:n])
+            remaining -= n
+        return length
+
+
+def _send_request(
+    address: int | str, endpoint_id: str, prompt_state: PromptStateDict, kwargs, namespace: str | None = None
+) -> socket.socket:
+    if isinstance(address, int) or address.isdigit():
+        family, socket_address = socket.AF_INET, ("localhost", int(address))
+    else:
+        family, socket_address = socket.AF_UNIX, address
+    client = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_address)
         try:
             data = {"endpoint_id": endpoint_id, "prompt_state": prompt_state, "kwargs": kwargs}
-            payload = json.dumps(data).encode("utf-8")
+            if namespace:
+                data["namespace"] = namespace
+            payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
         except Exception as err:
             payload = f"{sys.argv}\n{err}".encode("utf-8")
+        client.sendall(make_header(TEXT, len(payload)) + payload)
+    except BaseException:
+        client.close()
+        raise
+    return client
 
-        client.send(len(payload).to_bytes(4))
-        client.sendall(payload)
 
-        response_length = int.from_bytes(client.recv(4))
-        return client.recv(response_length, socket.MSG_WAITALL).decode("utf-8")
+def _receive_response_header(client: socket.socket) -> tuple[int, int]:
+    version, kind, length = parse_header(client.recv(HEADER_SIZE, socket.MSG_WAITALL))
+    if version != PROTOCOL_VERSION:
+        raise ConnectionError(f"Server speaks protocol version {version} (expected {PROTOCOL_VERSION})")
+    return kind, length
 
 
 def parse_args():
-    port = int(sys.argv[1])
+    address = sys.argv[1]
     endpoint_id = sys.argv[2]
-    query = sys.argv[3]  # {q} fzf placeholder
-    n_placeholder = sys.argv[4]  # {n} fzf placeholder
-    fzf_select_count = int(sys.argv[5])  # FZF_SELECT_COUNT fzf env var
-    nplus_placeholder_indices = [int(x) for x in sys.argv[6].split() if x.isdigit()]  # {+n} fzf placeholder
-    prompt_state: PromptStateDict = {
-        "query": query,
-        "current_index": int(n_placeholder) if n_placeholder.isdigit() else None,  # empty string if no shown entries
-        "selected_count": fzf_select_count,
-        "target_indices": nplus_placeholder_indices,  # selected indices or current index if nothing selected
-    }
-    kwargs = dict(zip(sys.argv[7::2], sys.argv[8::2]))
-    return port, endpoint_id, prompt_state, kwargs
+    state_field_codes = sys.argv[3].strip("-")  # which state fields follow (e.g. 'qnst' for all of them)
+    prompt_state: PromptStateDict = {}
+    for code, value in zip(state_field_codes, sys.argv[4:]):
+        if code == "q":  # {q} fzf placeholder
+            prompt_state["query"] = value
+        elif code == "n":  # {n} fzf placeholder (empty string if no shown entries)
+            prompt_state["current_index"] = int(value) if value.isdigit() else None
+        elif code == "s":  # FZF_SELECT_COUNT fzf env var
+            prompt_state["selected_count"] = int(value) if value.isdigit() else 0
+        elif code == "t":  # {+n} fzf placeholder (selected indices or current index if nothing selected)
+            prompt_state["target_indices"] = [int(x) for x in value.split() if x.isdigit()]
+    kwargs_start = 4 + len(state_field_codes)
+    kwargs = dict(zip(sys.argv[kwargs_start::2], sys.argv[kwargs_start + 1 :: 2]))
+    return address, endpoint_id, prompt_state, kwargs
 
 
 if __name__ == "__main__":
-    port, endpoint_id, prompt_state, kwargs = parse_args()
-    if response := make_server_call(port, endpoint_id, prompt_state, kwargs):
-        sys.stdout.write(response)
+    address, endpoint_id, prompt_state, kwargs = parse_args()
+    stream_server_call(address, endpoint_id, prompt_state, kwargs, sys.stdout.buffer, os.getenv(NAMESPACE_ENV_VAR))
+    sys.stdout.buffer.flush()
@@ -0,0 +1,98 @@
+#!/usr/bin/env bash
+# Shell-native request client speaking the same protocol as make_server_call.py (version 2 framing)
+# (spares fzf a Python interpreter startup on every server call)
+# Usage: make_server_call.sh PORT ENDPOINT_ID STATE_FIELD_CODES [STATE_FIELD_VALUE]... [KWARG_NAME KWARG_VALUE]...
+# e.g. make_server_call.sh PORT ENDPOINT_ID qnst {q} {n} $FZF_SELECT_COUNT "{+n}"
+
+# byte semantics for ${#payload} and substitutions (multibyte UTF-8 never contains '\', '"' or control characters)
+export LC_ALL=C
+
+# JSON escapes of control characters (U+0001-U+001F, NUL can't be in bash strings), made when first needed
+control_characters=() control_escapes=()
+make_control_escapes() {
+    local code octal
+    for ((code = 1; code < 32; code++)); do
+        printf -v octal '%03o' "$code"
+        printf -v 'control_characters[code]' "\\$octal"
+        printf -v 'control_escapes[code]' '\\u%04x' "$code"
+    done
+    control_escapes[8]='\b' control_escapes[9]='\t' control_escapes[10]='\n' control_escapes[12]='\f' control_escapes[13]='\r'
+}
+
+json_string() {
+    local s=${1//\\/\\\\}
+    s=${s//\"/\\\"}
+    if [[ $s == *[$'\x01'-$'\x1f']* ]]; then
+        ((${#control_escapes[@]})) || make_control_escapes
+        local code
+        for code in "${!control_escapes[@]}"; do
+            s=${s//"${control_characters[code]}"/"${control_escapes[code]}"}
+        done
+    fi
+    REPLY="\"$s\""
+}
+
+port=$1
+endpoint_id=$2
+state_field_codes=${3//-/} # which state fields follow (e.g. 'qnst' for all of them)
+shift 3
+
+json_string "$endpoint_id"
+payload="{\"endpoint_id\": $REPLY, \"prompt_state\": {"
+separator=""
+for ((i = 0; i < ${#state_field_codes}; i++)); do
+    value=$1
+    shift
+    case ${state_field_codes:i:1} in
+    q) # {q} fzf placeholder
+        json_string "$value"
+        payload+="$separator\"query\": $REPLY"
+        ;;
+    n) # {n} fzf placeholder (empty string if no shown entries)
+        [[ $value =~ ^[0-9]+$ ]] || value=null
+        payload+="$separator\"current_index\": $value"
+        ;;
+    s) # FZF_SELECT_COUNT fzf env var
+        [[ $value =~ ^[0-9]+$ ]] || value=0
+        payload+="$separator\"selected_count\": $value"
+        ;;
+    t) # {+n} fzf placeholder
+        target_indices=()
+        for index in $value; do
+            [[ $index =~ ^[0-9]+$ ]] && target_indices+=("$index")
+        done
+        IFS=,
+        payload+="$separator\"target_indices\": [${target_indices[*]}]"
+        unset IFS
+        ;;
+    esac
+    separator=", "
+done
+payload+="}, \"kwargs\": {"
+separator=""
+while (($# >= 2)); do
+    json_string "$1"
+    payload+="$separator$REPLY: "
+    json_string "$2"
+    payload+="$REPLY"
+    separator=", "
+    shift 2
+done
+payload+="}"
+if [[ -n ${FZF_PRIMITIVES_SERVER_NAMESPACE-} ]]; then # set for fzf when prompt's server is shared
+    json_string "$FZF_PRIMITIVES_SERVER_NAMESPACE"
+    payload+=", \"namespace\": $REPLY"
+fi
+payload+="}"
+
+exec 3<>"/dev/tcp/127.0.0.1/$port" || exit 1
+# Frame header: protocol version 2, text payload kind, 8-byte big-endian payload length
+length=${#payload}
+header='\x02\x00'
+for ((shift_by = 56; shift_by >= 0; shift_by -= 8)); do
+    printf -v header '%s\\x%02x' "$header" $((length >> shift_by & 255))
+done
+printf "$header%s" "$payload" >&3
+# Response is framed the same way and server closes connection after sending it
+tail -c +11 <&3
+exec 3<&-
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import io
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from ..prompt_data import PromptData
+from .request import STATE_FIELDS, StateField
+
+DEFAULT_MAX_SIZE = 128
+
+
+class Memoize:
+    """Responses of a server call function are reused for calls made with the same values of the state fields and
+    the same arguments of the function (e.g. FZF_PREVIEW_COLUMNS)
+
+    The function should be pure in them. Cached responses are kept per prompt and dropped when they're the least
+    recently used beyond max_size, older than ttl seconds or invalidated (Server.invalidate_response_caches, e.g.
+    after entries are reloaded). Streamed responses (iterators) aren't cached.
+    """
+
+    def __init__(self, *state_fields: StateField, max_size: int = DEFAULT_MAX_SIZE, ttl: float | None = None):
+        if unknown_fields := set(state_fields).difference(STATE_FIELDS):
+            raise ValueError(f"Unknown state fields: {unknown_fields} (known: {STATE_FIELDS})")
+        if max_size < 1:
+            raise ValueError("max_size has to be at least 1")
+        self.state_fields: tuple[StateField, ...] = tuple(f for f in STATE_FIELDS if f in state_fields)
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def key(self, prompt_data: PromptData, kwargs: dict[str, Any]) -> Hashable:
+        return (
+            *(_hashable(self._get_field(prompt_data, field)) for field in self.state_fields),
+            *sorted(kwargs.items()),
+        )
+
+    @staticmethod
+    def _get_field(prompt_data: PromptData, field: StateField) -> Any:
+        if field == "target_indices":
+            return prompt_data.target_indices  # also when they're kept by selection mirror
+        return getattr(prompt_data.state, field)
+
+    def __str__(self) -> str:
+        return f"[Memoize]({','.join(self.state_fields)})"
+
+
+class ResponseCache:
+    """Bounded LRU cache of responses that expire after ttl seconds (if set)"""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float | None = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._responses: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()  # requests to the same endpoint are resolved concurrently
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # least recently used responses dropped beyond max_size
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> tuple[Any] | None:
+        """Response wrapped in a tuple (so that None can be cached) or None on a miss"""
+        with self._lock:
+            if (cached := self._responses.get(key)) is None:
+                self.misses += 1
+                return None
+            stored_at, response = cached
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._responses[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._responses.move_to_end(key)
+            self.hits += 1
+            return (response,)
+
+    def put(self, key: Hashable, response: Any) -> None:
+        with self._lock:
+            self._responses[key] = (time.monotonic(), response)
+            self._responses.move_to_end(key)
+            if len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._responses.clear()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+
+def memoized[F: Callable](function: F, memoize: Memoize) -> F:
+    """Server call function with responses cached in prompt's Server (see Memoize)"""
+
+    def get_cache(prompt_data: PromptData) -> ResponseCache:
+        return prompt_data.server.get_response_cache(memoizing_function, memoize)
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def memoizing_function_async(prompt_data: PromptData, **kwargs):
+            cache, key = get_cache(prompt_data), memoize.key(prompt_data, kwargs)
+            if cached := cache.get(key):
+                return cached[0]
+            response = await function(prompt_data, **kwargs)
+            if _cacheable(response):
+                cache.put(key, response)
+            return response
+
+        memoizing_function: Callable = memoizing_function_async
+    else:
+
+        @functools.wraps(function)
+        def memoizing_function_sync(prompt_data: PromptData, **kwargs):
+            cache, key = get_cache(prompt_data), memoize.key(prompt_data, kwargs)
+            if cached := cache.get(key):
+                return cached[0]
+            response = function(prompt_data, **kwargs)
+            if _cacheable(response):
+                cache.put(key, response)
+            return response
+
+        memoizing_function = memoizing_function_sync
+    return memoizing_function  # type: ignore
+
+
+def _cacheable(response: Any) -> bool:
+    """Streamed responses can only be sent once"""
+    return not isinstance(response, (Iterator, io.IOBase))
+
+
+def _hashable(value: Any) -> Hashable:
+    return tuple(value) if isinstance(value, Iterable) and not isinstance(value, str) else value
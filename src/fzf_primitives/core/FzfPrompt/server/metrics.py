@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import bisect
+import json
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from ..options import Trigger
+    from .request import ServerEndpoint
+from .request import PRIORITIES, Priority
+
+# upper bounds of latency histogram buckets in seconds (0.1 ms to ~100 s, each ~19 % wider than the previous one)
+LATENCY_BUCKET_BOUNDS = [0.0001 * 2 ** (i / 4) for i in range(81)]
+
+
+class EndpointMetrics:
+    """Counters and latency histogram of requests to one endpoint (latency includes waiting in queue)"""
+
+    def __init__(self, endpoint_id: str, trigger: Trigger) -> None:
+        self.endpoint_id = endpoint_id
+        self.trigger: Trigger = trigger
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0  # answered with fallback response after deadline
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKET_BOUNDS) + 1)  # last bucket is for anything slower
+        self._folded_into: EndpointMetrics | None = None  # records requests finished after the endpoint was removed
+        self._lock = Lock()
+
+    def record(
+        self, latency: float, request_bytes: int, response_bytes: int, *, error: bool = False, timeout: bool = False
+    ) -> None:
+        bucket = bisect.bisect_left(LATENCY_BUCKET_BOUNDS, latency)
+        with self._lock:
+            if (folded_into := self._folded_into) is None:
+                self.requests += 1
+                self.errors += error
+                self.timeouts += timeout
+                self.request_bytes += request_bytes
+                self.response_bytes += response_bytes
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+                self.latency_histogram[bucket] += 1
+                return
+        folded_into.record(latency, request_bytes, response_bytes, error=error, timeout=timeout)
+
+    def fold_into(self, metrics: EndpointMetrics) -> None:
+        """Adds the counts to the metrics (and records there from now on)"""
+        with self._lock:
+            self._folded_into = metrics
+            with metrics._lock:
+                metrics.requests += self.requests
+                metrics.errors += self.errors
+                metrics.timeouts += self.timeouts
+                metrics.request_bytes += self.request_bytes
+                metrics.response_bytes += self.response_bytes
+                metrics.latency_total += self.latency_total
+                metrics.latency_max = max(metrics.latency_max, self.latency_max)
+                for bucket, count in enumerate(self.latency_histogram):
+                    metrics.latency_histogram[bucket] += count
+
+    def percentile(self, percent: float) -> float | None:
+        """Upper bound of the histogram bucket the percentile falls into (at most the slowest latency)"""
+        with self._lock:
+            return _histogram_percentile(self.latency_histogram, self.requests, self.latency_max, percent)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Latencies are in milliseconds"""
+        return {
+            "endpoint_id": self.endpoint_id,
+            "trigger": self.trigger,
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "latency_mean": _ms(self.latency_total / self.requests if self.requests else None),
+            "latency_p50": _ms(self.percentile(50)),
+            "latency_p95": _ms(self.percentile(95)),
+            "latency_p99": _ms(self.percentile(99)),
+            "latency_max": _ms(self.latency_max),
+        }
+
+
+class QueueWaitMetrics:
+    """How long requests of one priority class waited to be resolved since they were received"""
+
+    def __init__(self, priority: Priority) -> None:
+        self.priority: Priority = priority
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_histogram = [0] * (len(LATENCY_BUCKET_BOUNDS) + 1)
+        self._lock = Lock()
+
+    def record(self, wait: float) -> None:
+        bucket = bisect.bisect_left(LATENCY_BUCKET_BOUNDS, wait)
+        with self._lock:
+            self.requests += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.wait_histogram[bucket] += 1
+
+    def percentile(self, percent: float) -> float | None:
+        with self._lock:
+            return _histogram_percentile(self.wait_histogram, self.requests, self.wait_max, percent)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Waits are in milliseconds"""
+        return {
+            "priority": self.priority,
+            "requests": self.requests,
+            "wait_mean": _ms(self.wait_total / self.requests if self.requests else None),
+            "wait_p50": _ms(self.percentile(50)),
+            "wait_p95": _ms(self.percentile(95)),
+            "wait_p99": _ms(self.percentile(99)),
+            "wait_max": _ms(self.wait_max),
+        }
+
+
+class ServerMetrics:
+    """Always-on registry of EndpointMetrics keyed by endpoint id and trigger
+
+    Metrics of removed endpoints (e.g. created by Transforms) are folded into ones of their scope and trigger so that
+    the registry doesn't grow with endpoints over a long session.
+    """
+
+    def __init__(self) -> None:
+        self.endpoints: dict[tuple[str, Trigger], EndpointMetrics] = {}
+        self.queue_waits: dict[Priority, QueueWaitMetrics] = {p: QueueWaitMetrics(p) for p in PRIORITIES}
+        self._lock = Lock()
+
+    def get(self, endpoint_id: str, trigger: Trigger) -> EndpointMetrics:
+        if not (metrics := self.endpoints.get((endpoint_id, trigger))):
+            with self._lock:
+                metrics = self.endpoints.setdefault((endpoint_id, trigger), EndpointMetrics(endpoint_id, trigger))
+        return metrics
+
+    def get_for(self, endpoint: ServerEndpoint) -> EndpointMetrics:
+        """Metrics to record a finished request in (those of removed endpoints if it was removed meanwhile)"""
+        metrics = self.get(endpoint.id, endpoint.trigger)
+        if endpoint.removed:
+            self.fold(endpoint)
+        return metrics
+
+    def fold(self, endpoint: ServerEndpoint) -> None:
+        """Metrics of the removed endpoint are added to those of removed endpoints of the same scope and trigger"""
+        removed_id = f"<removed {endpoint.scope} endpoints>"
+        with self._lock:
+            metrics = self.endpoints.pop((endpoint.id, endpoint.trigger), None)
+            if metrics is None:
+                return
+            removed_metrics = self.endpoints.get((removed_id, endpoint.trigger))
+            if removed_metrics is None:
+                removed_metrics = self.endpoints[(removed_id, endpoint.trigger)] = EndpointMetrics(
+                    removed_id, endpoint.trigger
+                )
+        metrics.fold_into(removed_metrics)
+
+    def to_dict(self) -> list[dict[str, Any]]:
+        """Slowest endpoints (by total time spent) first"""
+        with self._lock:
+            metrics = list(self.endpoints.values())
+        return [m.to_dict() for m in sorted(metrics, key=lambda m: m.latency_total, reverse=True)]
+
+    def record_queue_wait(self, priority: Priority, wait: float) -> None:
+        self.queue_waits[priority].record(wait)
+
+    def queue_waits_to_dict(self) -> list[dict[str, Any]]:
+        """Highest priority first"""
+        return [self.queue_waits[priority].to_dict() for priority in PRIORITIES]
+
+    def to_json(self) -> str:
+        """Metrics of endpoints and queue waits of priority classes"""
+        return json.dumps(
+            {"endpoints": self.to_dict(), "queue_waits": self.queue_waits_to_dict()}, indent=2, ensure_ascii=False
+        )
+
+    def dump(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.to_json(), encoding="utf-8")
+
+
+def _histogram_percentile(histogram: list[int], count: int, maximum: float, percent: float) -> float | None:
+    if not count:
+        return None
+    rank = percent / 100 * count
+    seen = 0
+    for bucket, bucket_count in enumerate(histogram):
+        seen += bucket_count
+        if seen >= rank and bucket_count:
+            break
+    if bucket >= len(LATENCY_BUCKET_BOUNDS):
+        return maximum
+    return min(LATENCY_BUCKET_BOUNDS[bucket], maximum)
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Callable
+import functools
+import inspect
+import subprocess
+import time
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Hashable, Self
 
 
 # TODO: Add it to utils
@@ -21,6 +26,95 @@ class CommandOutput(str):
     """
 
 
+class CachedCommandOutput(CommandOutput):
+    """CommandOutput evaluated by Server at most once per ttl seconds instead of by fzf's shell with every server call
+
+    The command runs in the process of the prompt (its environment and working directory). Output older than ttl is
+    still passed to the parameter while it's evaluated again in the background (only the first call waits for it).
+
+    key: Output is cached per value it returns (e.g. lambda: os.getcwd()), it's called with every server call
+    """
+
+    ttl: float
+    key: Callable[[], Hashable] | None
+    _outputs: dict[Hashable, _EvaluatedOutput]
+    _lock: Lock
+
+    def __new__(cls, command: str, ttl: float, key: Callable[[], Hashable] | None = None) -> Self:
+        instance = super().__new__(cls, command)
+        instance.ttl = ttl
+        instance.key = key
+        instance._outputs = {}
+        instance._lock = Lock()
+        return instance
+
+    def get(self) -> str:
+        """Cached output (evaluated again in the background once it's older than ttl)"""
+        output = self._get_output()
+        output.evaluated.wait()
+        return output.value
+
+    def warm_up(self) -> None:
+        """Starts evaluating the command in the background unless its output is cached"""
+        self._get_output()
+
+    def invalidate(self) -> None:
+        """Outputs are evaluated again when they're needed next"""
+        with self._lock:
+            self._outputs.clear()
+
+    def _get_output(self) -> _EvaluatedOutput:
+        key = self.key() if self.key is not None else None
+        with self._lock:
+            if (output := self._outputs.get(key)) is None:
+                output = self._outputs[key] = _EvaluatedOutput()
+            elif output.evaluating or time.monotonic() - output.evaluated_at <= self.ttl:
+                return output
+            output.evaluating = True
+        Thread(target=self._evaluate, args=(output,), name="CachedCommandOutput", daemon=True).start()
+        return output
+
+    def _evaluate(self, output: _EvaluatedOutput) -> None:
+        """Like "$(command 2>&1)" in fzf's shell"""
+        try:
+            value = subprocess.run(str(self), shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            value = value.stdout.rstrip("\n")
+        except Exception as err:
+            value = str(err)
+        with self._lock:
+            output.value, output.evaluated_at, output.evaluating = value, time.monotonic(), False
+        output.evaluated.set()
+
+
+class _EvaluatedOutput:
+    def __init__(self) -> None:
+        self.value = ""
+        self.evaluated_at = 0.0  # time.monotonic()
+        self.evaluating = False
+        self.evaluated = Event()  # set once the first evaluation finishes
+
+
+def with_cached_command_outputs[F: Callable](function: F, outputs: dict[str, CachedCommandOutput]) -> F:
+    """Server call function getting cached outputs of its CachedCommandOutput parameters (fzf doesn't send them)"""
+
+    def get_outputs() -> dict[str, str]:
+        return {name: output.get() for name, output in outputs.items()}
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def with_outputs_async(prompt_data, **kwargs):
+            return await function(prompt_data, **kwargs, **get_outputs())
+
+        return with_outputs_async  # type: ignore
+
+    @functools.wraps(function)
+    def with_outputs(prompt_data, **kwargs):
+        return function(prompt_data, **kwargs, **get_outputs())
+
+    return with_outputs  # type: ignore
+
+
 class VarOutput(str):
     """A special type of value that when used as default value in ServerCallFunction parameters
     will be read from a shell variable and the value will be passed as str to the parameter.
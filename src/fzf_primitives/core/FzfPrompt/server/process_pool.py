@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import inspect
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, ClassVar
+
+if TYPE_CHECKING:
+    from ..options import Trigger
+    from ..prompt_data import PromptData
+from ....config import Config
+from ...monitoring import Logger
+from .request import PromptState, StateFieldNotSent
+
+
+class PromptSnapshot[T, S]:
+    """Picklable part of PromptData that server call functions running in ProcessPool get instead of it
+
+    Only entries that are current or targeted are included. obj is None if it can't be pickled.
+    """
+
+    def __init__(self, state: PromptState, trigger: Trigger, entries: dict[int, T], obj: S) -> None:
+        self.state = state
+        self.trigger: Trigger = trigger
+        self._entries = entries
+        self.obj = obj
+
+    @classmethod
+    def take(cls, prompt_data: PromptData[T, S]) -> PromptSnapshot[T, S]:
+        fields = dict(prompt_data.state.__dict__)
+        if "target_indices" not in fields and prompt_data.selection_mirror is not None:
+            with contextlib.suppress(StateFieldNotSent):
+                fields["target_indices"] = prompt_data.target_indices
+        indices = set(fields.get("target_indices", ()))
+        if (current_index := fields.get("current_index")) is not None:
+            indices.add(current_index)
+        entries = {i: prompt_data.entries[i] for i in indices}
+        return cls(PromptState(**fields), prompt_data.trigger, entries, prompt_data.obj)
+
+    @property
+    def query(self) -> str:
+        return self.state.query
+
+    @property
+    def current_index(self) -> int | None:
+        return self.state.current_index
+
+    @property
+    def current(self) -> T | None:
+        return None if self.state.current_index is None else self._entries[self.state.current_index]
+
+    @property
+    def selected_indices(self) -> list[int]:
+        return [] if self.state.selected_count == 0 else list(self.state.target_indices)
+
+    @property
+    def selections(self) -> list[T]:
+        return [self._entries[i] for i in self.selected_indices]
+
+    @property
+    def target_indices(self) -> list[int]:
+        return list(self.state.target_indices)
+
+    @property
+    def targets(self) -> list[T]:
+        return [self._entries[i] for i in self.state.target_indices]
+
+    def dumps(self) -> bytes:
+        """Pickled without obj if it can't be pickled"""
+        try:
+            return pickle.dumps(self)
+        except Exception as err:
+            Logger.get_logger().debug(
+                f"Snapshot taken without obj that can't be pickled: {err}", trace_point="obj_not_picklable"
+            )
+            return pickle.dumps(PromptSnapshot(self.state, self.trigger, self._entries, None))
+
+
+class ProcessPool:
+    """Process-wide pool of worker processes kept warm between server calls (and prompts)
+
+    Workers are started with 'forkserver' (or 'spawn') method as forking a process running server threads isn't safe,
+    so functions run in them have to be importable (defined at module level) and their arguments and responses
+    picklable.
+    """
+
+    _executor: ClassVar[ProcessPoolExecutor | None] = None
+    _max_workers: ClassVar[int] = 0
+    _warmed_up: ClassVar[bool] = False
+    _lock: ClassVar[Lock] = Lock()
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        """Created on first use (or when a worker died and broke the previous one)"""
+        with cls._lock:
+            if cls._executor is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                cls._max_workers = Config.process_pool_max_workers or os.cpu_count() or 1
+                cls._executor = ProcessPoolExecutor(cls._max_workers, mp_context=multiprocessing.get_context(method))
+                cls._warmed_up = False
+            return cls._executor
+
+    @classmethod
+    def submit(cls, fn: Callable, /, *args: Any) -> Future:
+        """Broken pool (a worker died) is replaced by a new one for the next calls"""
+        executor = cls.get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            cls.discard(executor)
+            executor = cls.get_executor()
+            future = executor.submit(fn, *args)
+        future.add_done_callback(
+            lambda f: (
+                cls.discard(executor) if not f.cancelled() and isinstance(f.exception(), BrokenProcessPool) else None
+            )
+        )
+        return future
+
+    @classmethod
+    def warm_up(cls) -> None:
+        """Starts all workers in the background so that the first calls don't wait for them (only once)"""
+        executor = cls.get_executor()
+        with cls._lock:
+            if cls._warmed_up:
+                return
+            cls._warmed_up = True
+        for _ in range(cls._max_workers):
+            executor.submit(_do_nothing)
+
+    @classmethod
+    def discard(cls, executor: ProcessPoolExecutor) -> None:
+        with cls._lock:
+            if cls._executor is executor:
+                cls._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+def run_in_process_pool[R](function: Callable[..., R]) -> Callable[..., Any]:
+    """Turns server call function taking PromptSnapshot into an async one taking PromptData that awaits it running in
+    ProcessPool (the server thread and the event loop stay free meanwhile)
+    """
+    if inspect.iscoroutinefunction(function):
+        raise ValueError(f"Async function '{function}' can't run in process pool")
+    try:
+        pickle.dumps(function)
+    except Exception as err:
+        raise ValueError(f"Function '{function}' can't run in process pool (define it at module level)") from err
+
+    @functools.wraps(function)
+    async def run_in_process(prompt_data: PromptData, **kwargs) -> R:
+        future = ProcessPool.submit(_run_with_snapshot, function, PromptSnapshot.take(prompt_data).dumps(), kwargs)
+        return await asyncio.wrap_future(future)
+
+    return run_in_process
+
+
+def _run_with_snapshot[R](function: Callable[..., R], snapshot: bytes, kwargs: dict) -> R:
+    return function(pickle.loads(snapshot), **kwargs)
+
+
+def _do_nothing() -> None: ...
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import time
+from pathlib import Path
+from threading import Lock
+from typing import IO, TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    from ..options import Trigger
+    from ..prompt_data import PromptData
+    from .request import Request, ServerEndpoint
+from ...monitoring import LoggedComponent
+from .make_server_call import make_server_call
+from .metrics import ServerMetrics
+
+
+class RecordedRequest:
+    def __init__(self, time: float, endpoint_id: str, trigger: Trigger, prompt_state: dict, kwargs: dict) -> None:
+        self.time = time  # seconds since recording started
+        self.endpoint_id = endpoint_id
+        self.trigger: Trigger = trigger
+        self.prompt_state = prompt_state  # only fields that were sent
+        self.kwargs = kwargs
+
+    @property
+    def endpoint_name(self) -> str:
+        """Endpoint id without the part that differs between runs"""
+        return self.endpoint_id.rpartition("#")[0] or self.endpoint_id
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "time": round(self.time, 6),
+            "endpoint_id": self.endpoint_id,
+            "trigger": self.trigger,
+            "prompt_state": self.prompt_state,
+            "kwargs": self.kwargs,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> RecordedRequest:
+        return cls(data["time"], data["endpoint_id"], data["trigger"], data["prompt_state"], data["kwargs"])
+
+
+class RequestRecorder:
+    """Writes requests received by Server to a JSON Lines file (gzip compressed if its name ends with .gz)"""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: IO[str] = _open(self.path, "w")
+        self._started_at = time.perf_counter()
+        self._lock = Lock()
+
+    def record(self, request: Request, endpoint: ServerEndpoint) -> None:
+        recorded_request = RecordedRequest(
+            request.received_at - self._started_at,
+            endpoint.id,
+            endpoint.trigger,
+            request.prompt_state.__dict__,
+            request.kwargs,
+        )
+        line = json.dumps(recorded_request.to_json(), separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(f"{line}\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path: str | Path) -> list[RecordedRequest]:
+    with _open(Path(path), "r") as file:
+        return [RecordedRequest.from_json(json.loads(line)) for line in file if line.strip()]
+
+
+class ReplayReport:
+    def __init__(self, metrics: ServerMetrics, requests: int, errors: int, duration: float) -> None:
+        self.metrics = metrics  # per-endpoint latencies of the replaying Server
+        self.requests = requests
+        self.errors = errors  # requests to endpoints that didn't exist (others are counted in metrics)
+        self.duration = duration  # seconds
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second"""
+        return self.requests / self.duration if self.duration else math.inf
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "duration": round(self.duration, 6),
+            "throughput": round(self.throughput, 3),
+            "endpoints": self.metrics.to_dict(),
+        }
+
+
+class RequestReplayer(LoggedComponent):
+    """Makes recorded requests to Server of a prompt built like the recorded one (no fzf is run)
+
+    Requests are made one after another as fzf makes them. Recorded endpoint ids are matched with ones of the Server
+    by name and trigger (in order of registration when more endpoints share them) as ids differ between runs.
+    Endpoints created while replaying (e.g. by Transforms) are matched when they're first requested.
+    """
+
+    def __init__(self, prompt_data: PromptData, *, speed: float | None = 1.0) -> None:
+        """speed: Recorded intervals between requests are divided by it (None or math.inf drops the timing)"""
+        super().__init__()
+        self.prompt_data = prompt_data
+        self.speed = speed
+        self._endpoint_ids: dict[str, str] = {}  # recorded id -> id in the replaying Server
+
+    def replay(self, recorded_requests: Iterable[RecordedRequest]) -> ReplayReport:
+        server = self.prompt_data.server
+        server.open()
+        requests = errors = 0
+        started_at = time.perf_counter()
+        try:
+            for recorded_request in recorded_requests:
+                self._wait_until(started_at, recorded_request.time)
+                requests += 1
+                if (endpoint_id := self._match_endpoint(recorded_request)) is None:
+                    errors += 1
+                    self.logger.warning(
+                        f"No endpoint to replay '{recorded_request.endpoint_id}' with",
+                        trace_point="replayed_endpoint_missing",
+                    )
+                    continue
+                make_server_call(
+                    server.address,
+                    endpoint_id,
+                    recorded_request.prompt_state,
+                    recorded_request.kwargs,
+                    server.namespace,
+                )
+        finally:
+            duration = time.perf_counter() - started_at
+            server.close()
+        return ReplayReport(server.metrics, requests, errors, duration)
+
+    def _wait_until(self, started_at: float, recorded_time: float) -> None:
+        if self.speed is None or self.speed == math.inf:
+            return
+        if (delay := started_at + recorded_time / self.speed - time.perf_counter()) > 0:
+            time.sleep(delay)
+
+    def _match_endpoint(self, recorded_request: RecordedRequest) -> str | None:
+        if (endpoint_id := self._endpoint_ids.get(recorded_request.endpoint_id)) is not None:
+            return endpoint_id
+        matched_ids = set(self._endpoint_ids.values())
+        for endpoint in list(self.prompt_data.server.endpoints.values()):
+            if (
+                endpoint.id not in matched_ids
+                and endpoint.trigger == recorded_request.trigger
+                and endpoint.id.rpartition("#")[0] == recorded_request.endpoint_name
+            ):
+                self._endpoint_ids[recorded_request.endpoint_id] = endpoint.id
+                return endpoint.id
+        return None
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
@@ -1,48 +1,168 @@
 from __future__ import annotations
 
+import inspect
+import io
 import json
-from typing import TYPE_CHECKING, Any, Self
+import time
+from threading import Event, Lock
+from typing import TYPE_CHECKING, Any, Iterator, Literal, Self
 
 if TYPE_CHECKING:
     from ..options import Trigger
     from ..prompt_data import PromptData
     from .actions import ServerCallFunction
 
+# queued requests of a higher priority class are resolved first
+type Priority = Literal["interactive", "normal", "background"]
+PRIORITIES: tuple[Priority, ...] = ("interactive", "normal", "background")
+# what an endpoint lives as long as: the prompt, its Transform (until it's evicted from its endpoint cache) or the
+# version of its Preview (until the preview is updated)
+type EndpointScope = Literal["prompt", "transform", "preview"]
+ENDPOINT_SCOPES: tuple[EndpointScope, ...] = ("prompt", "transform", "preview")
+
 
 class ServerEndpoint:
-    def __init__(self, function: ServerCallFunction, id: str, trigger: Trigger) -> None:
+    def __init__(
+        self,
+        function: ServerCallFunction,
+        id: str,
+        trigger: Trigger,
+        *,
+        serial: bool = False,
+        supersedable: bool = False,
+        superseded_response: str = "",
+        deadline: float | None = None,
+        fallback_response: Any = "",
+        cache_late_response: bool = False,
+        priority: Priority = "normal",
+        owner: Any = None,
+        scope: EndpointScope = "prompt",
+    ) -> None:
         self.function = function
         self.id = id
         self.trigger: Trigger = trigger
+        self.serial = serial  # resolved in order of arrival even when Server resolves requests concurrently
+        self.is_async = inspect.iscoroutinefunction(function)  # awaited on the event loop of Server
+        self.supersedable = supersedable  # only the latest request matters
+        self.superseded_response = superseded_response
+        self.dropped_requests = 0  # superseded while queued (answered with superseded_response without running)
+        self.abandoned_requests = 0  # superseded while running (see PromptData.request_superseded)
+        self.deadline = deadline  # seconds since arrival of request (None means Server.default_deadline)
+        self.fallback_response = fallback_response
+        self.cache_late_response = cache_late_response
+        self.timed_out_requests = 0  # answered with fallback_response
+        # response that arrived after the deadline, used for the next request with the same cache key
+        self.late_response: tuple[str, Any] | None = None
+        self.priority: Priority = priority
+        self.owner = owner  # what registered the endpoint (e.g. Transform), its endpoints can be removed together
+        self.scope: EndpointScope = scope
+        self.removed = False  # from Server (its metrics are folded into those of removed endpoints)
+        self.lock = Lock()  # guards counters and late response (requests to the endpoint are resolved concurrently)
 
     def run(self, prompt_data: PromptData, request: Request) -> Any:
-        prompt_data.set_state(request.prompt_state, self.trigger)
-        return self.function(prompt_data, **request.kwargs)
+        """Iterators returned by function are resolved lazily (chunk by chunk while Server sends them)"""
+        with prompt_data.using_state(request.prompt_state, self.trigger, request.superseded):
+            response = self.function(prompt_data, **request.kwargs)
+        if isinstance(response, Iterator) and not isinstance(response, io.IOBase):
+            return self._iterate_using_state(prompt_data, request, response)
+        return response
+
+    async def run_async(self, prompt_data: PromptData, request: Request) -> Any:
+        with prompt_data.using_state(request.prompt_state, self.trigger, request.superseded):
+            response = await self.function(prompt_data, **request.kwargs)
+        if isinstance(response, Iterator) and not isinstance(response, io.IOBase):
+            return self._iterate_using_state(prompt_data, request, response)
+        return response
+
+    def _iterate_using_state(self, prompt_data: PromptData, request: Request, chunks: Iterator) -> Iterator:
+        """Generator body of the function runs only when asked for the next chunk so it needs request state then"""
+        try:
+            while True:
+                with prompt_data.using_state(request.prompt_state, self.trigger, request.superseded):
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        return
+                yield chunk
+        finally:
+            if close := getattr(chunks, "close", None):
+                close()  # e.g. when client disconnected
 
 
 class Request:
-    def __init__(self, endpoint_id: str, prompt_state: PromptState, kwargs: dict):
+    def __init__(self, endpoint_id: str, prompt_state: PromptState, kwargs: dict, namespace: str | None = None):
         self.endpoint_id = endpoint_id
         self.prompt_state = prompt_state
         self.kwargs = kwargs
+        self.namespace = namespace  # of prompt's Server when requests are accepted by SharedServer
+        self.received_at = time.perf_counter()
+        self.size = 0  # in bytes as received by Server
+        self.superseded = Event()
+        self._claimed = Lock()
+
+    def claim(self) -> bool:
+        """Whoever claims the request first responds to it (False if it's already claimed)"""
+        return self._claimed.acquire(blocking=False)
+
+    @property
+    def cache_key(self) -> str:
+        """The same for requests made in the same prompt state with the same arguments"""
+        return json.dumps([self.prompt_state.__dict__, self.kwargs], sort_keys=True)
 
     @classmethod
     def from_json(cls, data: dict) -> Self:
-        return cls(data["endpoint_id"], PromptState.from_json(data["prompt_state"]), data["kwargs"])
+        return cls(
+            data["endpoint_id"], PromptState.from_json(data["prompt_state"]), data["kwargs"], data.get("namespace")
+        )
+
+
+type StateField = Literal["query", "current_index", "selected_count", "target_indices"]
+STATE_FIELDS: tuple[StateField, ...] = ("query", "current_index", "selected_count", "target_indices")
+_NOT_SENT: Any = object()
 
 
 class PromptState:
+    """Immutable snapshot of fzf state at the time of a server call (only fields that were sent with it)"""
+
+    query: str
+    current_index: int | None
+    selected_count: int
+    target_indices: list[int]
+
     def __init__(
         self,
-        query: str,
-        current_index: int | None,
-        selected_count: int,
-        target_indices: list[int],  # expanded {+n} fzf placeholder
+        query: str = _NOT_SENT,
+        current_index: int | None = _NOT_SENT,
+        selected_count: int = _NOT_SENT,
+        target_indices: list[int] = _NOT_SENT,  # expanded {+n} fzf placeholder
     ):
-        self.query = query
-        self.current_index = current_index
-        self.selected_count = selected_count
-        self.target_indices = target_indices
+        fields = dict(
+            query=query, current_index=current_index, selected_count=selected_count, target_indices=target_indices
+        )
+        self.__dict__.update({name: value for name, value in fields.items() if value is not _NOT_SENT})
+
+    @property
+    def fields(self) -> tuple[StateField, ...]:
+        return tuple(field for field in STATE_FIELDS if field in self.__dict__)
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for fields that weren't sent
+        if name in STATE_FIELDS:
+            raise StateFieldNotSent(
+                f"'{name}' wasn't sent with the server call (sent: {', '.join(self.fields) or 'nothing'}). "
+                "Declare it with ServerCall(state_fields=...) or @requires_state(...)"
+            )
+        raise AttributeError(f"{self.__class__.__name__} has no attribute '{name}'")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def updated_with(self, other: PromptState) -> PromptState:
+        """Fields of other take precedence, missing ones are kept"""
+        return PromptState(**(self.__dict__ | other.__dict__))
 
     @classmethod
     def from_json(cls, data: dict) -> Self:
@@ -50,3 +170,7 @@ class PromptState:
 
     def __str__(self) -> str:
         return json.dumps(self.__dict__, indent=4)
+
+
+class StateFieldNotSent(AttributeError):
+    pass
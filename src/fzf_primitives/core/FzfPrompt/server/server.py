@@ -1,114 +1,889 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import itertools
 import json
+import math
+import os
+import selectors
+import shutil
 import socket
+import tempfile
+import time
 import traceback
-from threading import Event, Thread
-from typing import TYPE_CHECKING
+import weakref
+from concurrent.futures import CancelledError, Future, wait
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Coroutine, Iterator, Literal
 
 if TYPE_CHECKING:
     from ..action_menu import Binding
     from ..options import Trigger
     from ..prompt_data import PromptData
+from ....config import Config
 from ...monitoring import LoggedComponent
 from . import make_server_call
+from .executor import PriorityExecutor
+from .make_server_call import BYTES, HEADER_SIZE, PROTOCOL_VERSION, STREAM, TEXT, make_header, parse_header
+from .memoization import Memoize, ResponseCache
+from .metrics import ServerMetrics
+from .process_pool import ProcessPool
+from .recording import RequestRecorder
 from .actions import (
     MAKE_SERVER_CALL_ENV_VAR_NAME,
+    SERVER_NAMESPACE_ENV_VAR,
+    SOCKET_ADDRESS_ENV_VAR,
     SOCKET_NUMBER_ENV_VAR,
     ServerCall,
 )
-from .request import Request, ServerEndpoint
+from .request import ENDPOINT_SCOPES, EndpointScope, Priority, Request, ServerEndpoint
 
+type RequestClient = Literal["python", "shell"]
+REQUEST_CLIENTS: dict[RequestClient, Path] = {
+    "python": Path(make_server_call.__file__),
+    # no interpreter startup per request (needs bash with /dev/tcp support)
+    "shell": Path(make_server_call.__file__).with_suffix(".sh"),
+}
+type ServerTransport = Literal["unix", "tcp"]
 
-class Server[T, S](Thread, LoggedComponent):
-    def __init__(self, prompt_data: PromptData[T, S]) -> None:
+
+class Listener(Thread, LoggedComponent):
+    """Accepts requests on a Unix domain socket (or TCP on localhost) until should_close is set
+
+    Requests made in a namespace are routed to the Server registered under it (the Server hosted by the listener).
+    The listener keeps running until the hosted Servers are unregistered.
+    """
+
+    def __init__(self, name: str, transport: ServerTransport, *, daemon: bool | None = None) -> None:
         LoggedComponent.__init__(self)
-        super().__init__(name="Server")
-        self.prompt_data = prompt_data
+        Thread.__init__(self, name=name, daemon=daemon)
         self.setup_finished = Event()
-        self.should_close = Event()
-        self.endpoints: dict[str, ServerEndpoint] = {}
-        self.port: int
+        self.should_close = ShutdownEvent()
+        self.transport: ServerTransport = transport
+        self.address: str  # port number for TCP, socket path for Unix domain socket
+        self.port: int | None = None
+        self.servers: dict[str, Server] = {}  # hosted by namespace
+        self._namespace_numbers = itertools.count()
+        self._idle_serial_executors: list[PriorityExecutor] = []
+        self._lock = Lock()
 
     # TODO: Use automator to end running prompt and propagate errors
     def run(self):
+        socket_dir: str | None = None
         try:
-            # TODO: Use socket.AF_UNIX
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
-                server_socket.bind(("localhost", 0))
+            if self._get_transport() == "unix":
+                socket_dir = tempfile.mkdtemp(prefix="fzf-primitives-")
+            with self._create_server_socket(socket_dir) as server_socket:
                 socket_specs = server_socket.getsockname()
-                self.port = socket_specs[1]
-                self.prompt_data.fzf_env[SOCKET_NUMBER_ENV_VAR] = str(self.port)
-                self.prompt_data.fzf_env[MAKE_SERVER_CALL_ENV_VAR_NAME] = make_server_call.__file__
+                if server_socket.family == socket.AF_INET:
+                    self.port = socket_specs[1]
+                    self.address = str(self.port)
+                else:
+                    self.address = socket_specs
 
                 server_socket.listen()
-                self.logger.info(f"Server listening on {socket_specs}...", trace_point="server_listening")
+                self.logger.info(f"{self.name} listening on {socket_specs}...", trace_point="server_listening")
 
+                self._on_listening()
                 self.setup_finished.set()
-                server_socket.settimeout(0.05)
-                while True:
-                    try:
-                        client_socket, addr = server_socket.accept()
-                    except TimeoutError:
-                        if self.should_close.is_set():
-                            self.logger.info("Server closing", trace_point="server_closing")
-                            break
-                        continue
-                    self._handle_request(client_socket, self.prompt_data)
+                try:
+                    self._serve(server_socket)
+                finally:
+                    self._on_closing()
         except Exception as e:
             self.logger.exception(str(e), trace_point="error_in_server")
             raise
         finally:
+            if socket_dir is not None:
+                shutil.rmtree(socket_dir, ignore_errors=True)
             self.setup_finished.set()
 
-    def _handle_request(self, client_socket: socket.socket, prompt_data: PromptData[T, S]):
-        payload_length = int.from_bytes(client_socket.recv(4))
-        payload = client_socket.recv(payload_length, socket.MSG_WAITALL).decode("utf-8")
+    def _get_transport(self) -> ServerTransport:
+        return self.transport
 
-        response = ""
+    def _on_listening(self) -> None: ...
+
+    def _on_closing(self) -> None: ...
+
+    def _serve(self, server_socket: socket.socket):
+        """Blocks until a request arrives or should_close is set (no polling while idle)"""
+        with selectors.DefaultSelector() as selector, self.should_close.open_wakeup_socket() as wakeup_socket:
+            selector.register(server_socket, selectors.EVENT_READ)
+            selector.register(wakeup_socket, selectors.EVENT_READ)
+            try:
+                while not self.should_close.is_set() or self._hosts_servers():
+                    for key, _ in selector.select():
+                        if key.fileobj is server_socket:
+                            client_socket, addr = server_socket.accept()
+                            self._handle_request(client_socket)
+                        else:
+                            wakeup_socket.recv(1024)  # drained so that it blocks again (e.g. while hosting servers)
+            finally:
+                self.should_close.close_wakeup_socket()
+        self.logger.info(f"{self.name} closing", trace_point="server_closing")
+
+    def _create_server_socket(self, socket_dir: str | None) -> socket.socket:
+        """Unix domain socket inside socket_dir if given, falls back to TCP on localhost"""
+        if socket_dir is not None:
+            server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                server_socket.bind(str(Path(socket_dir, "server.sock")))
+                return server_socket
+            except OSError as e:
+                server_socket.close()
+                self.logger.warning(
+                    f"Falling back to TCP, binding Unix domain socket failed: {e}", trace_point="unix_socket_failed"
+                )
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.bind(("localhost", 0))
+        return server_socket
+
+    def register(self, server: Server) -> str:
+        """Returns namespace requests to the server are made in"""
+        with self._lock:
+            namespace = str(next(self._namespace_numbers))
+            self.servers[namespace] = server
+        self.logger.debug(f"Registering server namespace {namespace}", trace_point="registering_server_namespace")
+        return namespace
+
+    def unregister(self, namespace: str) -> None:
+        with self._lock:
+            self.servers.pop(namespace, None)
+        if self.should_close.is_set():
+            self.should_close.set()  # wakes up the listener waiting for hosted servers
+
+    def _hosts_servers(self) -> bool:
+        with self._lock:
+            return bool(self.servers)
+
+    def take_serial_executor(self) -> PriorityExecutor:
+        with self._lock:
+            if self._idle_serial_executors:
+                return self._idle_serial_executors.pop()
+        return PriorityExecutor(1, thread_name_prefix="Server-serial")
+
+    def return_serial_executor(self, executor: PriorityExecutor) -> None:
+        """Becomes idle once requests queued in it are resolved"""
+        executor.submit(lambda: None).result()
+        with self._lock:
+            self._idle_serial_executors.append(executor)
+
+    def _handle_request(self, client_socket: socket.socket) -> None:
+        payload = ""
+        try:
+            request, payload = self._read_request(client_socket)
+            server = self._get_server(request.namespace)
+        except Exception as err:
+            self._respond(client_socket, self._get_error_response(err, payload))
+            return
+        server._dispatch_request(client_socket, request, payload)  # noqa: SLF001
+
+    def _get_server(self, namespace: str | None) -> Server:
+        with self._lock:
+            return self.servers[namespace or ""]
+
+    def _shut_down_idle_executors(self) -> None:
+        with self._lock:
+            for executor in self._idle_serial_executors:
+                executor.shutdown()
+            self._idle_serial_executors.clear()
+
+    def _read_request(self, client_socket: socket.socket) -> tuple[Request, str]:
+        """Returns request and its payload"""
+        version, _, payload_length = parse_header(client_socket.recv(HEADER_SIZE, socket.MSG_WAITALL))
+        if version != PROTOCOL_VERSION:
+            raise ConnectionError(f"Request client speaks protocol version {version} (expected {PROTOCOL_VERSION})")
+        payload = client_socket.recv(payload_length, socket.MSG_WAITALL).decode("utf-8")
         try:
             request = Request.from_json(json.loads(payload))
+        except Exception as err:
+            raise InvalidRequest(payload) from err
+        request.size = HEADER_SIZE + payload_length
+        return request, payload
+
+    def _get_error_response(self, err: BaseException, payload: str) -> str:
+        if isinstance(err, InvalidRequest):
+            payload = str(err)
+        trb = traceback.format_exc()
+        error_message = f"{trb}\nPayload contents:\n{payload}"
+        self.logger.error("{}", error_message, trace_point="error_handling_request")
+        return error_message
+
+    def _respond(self, client_socket: socket.socket, response: Any) -> int:
+        """Bytes-like objects and binary files are sent as bytes (files with sendfile), chunks of iterators as they're
+        produced and anything else as text
+
+        Returns number of bytes sent
+        """
+        sent = 0
+        try:
+            if isinstance(response, Iterator) and not isinstance(response, io.IOBase):
+                sent = self._stream(client_socket, response)
+            elif isinstance(response, io.BufferedIOBase):
+                with response:
+                    start = response.tell()
+                    length = response.seek(0, os.SEEK_END) - start
+                    response.seek(start)
+                    client_socket.sendall(make_header(BYTES, length))
+                    sent = HEADER_SIZE + client_socket.sendfile(response)
+            else:
+                if isinstance(response, (bytes, bytearray, memoryview)):
+                    kind, payload = BYTES, memoryview(response)
+                else:
+                    kind, payload = TEXT, memoryview(str(response).encode("utf-8"))
+                client_socket.sendall(make_header(kind, payload.nbytes))
+                client_socket.sendall(payload)
+                sent = HEADER_SIZE + payload.nbytes
+        except Exception as e:
+            self.logger.exception(f"Error sending response: {e}", trace_point="error_sending_response")
+        finally:
+            client_socket.close()
+        return sent
+
+    def _stream(self, client_socket: socket.socket, chunks: Iterator) -> int:
+        """Stops early when client disconnects (e.g. fzf killed preview of entry that's no longer focused)"""
+        client_socket.sendall(make_header(STREAM, 0))
+        sent = HEADER_SIZE
+        try:
+            for chunk in chunks:
+                if not isinstance(chunk, (bytes, bytearray, memoryview)):
+                    chunk = str(chunk).encode("utf-8")
+                client_socket.sendall(chunk)
+                sent += len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            self.logger.debug("Client disconnected during streaming", trace_point="client_disconnected_from_stream")
+        except Exception as err:
+            client_socket.sendall(self._get_error_response(err, "").encode("utf-8"))
+        finally:
+            if close := getattr(chunks, "close", None):
+                close()
+        return sent
+
+
+class Server[T, S](Listener):
+    def __init__(self, prompt_data: PromptData[T, S]) -> None:
+        super().__init__("Server", Config.server_transport)
+        self.prompt_data = prompt_data
+        self.endpoints: dict[str, ServerEndpoint] = {}
+        self._endpoints_lock = Lock()  # endpoints are added and removed while requests are resolved
+        self.endpoints_added = 0
+        self.endpoints_removed = 0
+        self._leak_reported = False
+        # More than 1 worker resolves non-serial endpoints concurrently (serial ones keep their arrival order)
+        self.max_workers: int = Config.server_max_workers
+        # serial endpoints of all priorities (priority only reorders queued requests, running one isn't preempted)
+        self._serial_executor: PriorityExecutor
+        self._concurrent_executor: PriorityExecutor | None = None
+        # seconds after which server calls without their own deadline are answered with their fallback response
+        self.default_deadline: float | None = Config.server_call_deadline
+        # requests are accepted by process-wide SharedServer (instead of this thread) and routed here by namespace
+        self.shared: bool = Config.shared_server
+        # of the prompt whose server call runs this prompt (nested prompt is hosted by its listener)
+        self.parent: Server | None = None
+        self.namespace: str | None = None
+        self._host: Listener | None = None  # accepting requests instead of this thread
+        # unresolved latest requests of supersedable endpoints
+        self._latest_requests: dict[str, tuple[Request, socket.socket]] = {}
+        self._latest_requests_lock = Lock()
+        # being resolved on the event loop (cancelled when the server closes)
+        self._async_requests: set[Future] = set()
+        self._async_requests_lock = Lock()
+        self.metrics = ServerMetrics()
+        # of memoized server call functions (kept as long as the functions are)
+        self._response_caches: weakref.WeakKeyDictionary[Callable, ResponseCache] = weakref.WeakKeyDictionary()
+        self._response_caches_lock = Lock()
+        self.recorder: RequestRecorder | None = None  # for replaying the requests later (see RequestReplayer)
+
+    def open(self):
+        """Starts accepting requests and waits until they can be made
+
+        Nested prompt is hosted by the listener of its parent and shared one by SharedServer (no thread is started).
+        """
+        if (host := self._get_host()) is None:
+            self.start()
+            self.setup_finished.wait()
+            return
+        self._host = host
+        self.address, self.port = host.address, host.port
+        self._serial_executor = host.take_serial_executor()
+        self._create_concurrent_executor()
+        self.namespace = host.register(self)
+        self._set_fzf_env()
+        self.setup_finished.set()
+
+    def close(self):
+        """Stops accepting requests and waits until the ones being resolved are answered (and until prompts nested in
+        them end)
+        """
+        self.should_close.set()
+        if self._host is None:
+            self.join()
+            return
+        self._cancel_async_requests()
+        if self.namespace is not None:
+            self._host.unregister(self.namespace)
+        self._host.return_serial_executor(self._serial_executor)
+        if self._concurrent_executor is not None:
+            self._concurrent_executor.shutdown()
+
+    @property
+    def listener(self) -> Listener:
+        """Accepts requests to this server (the server itself unless it's hosted)"""
+        return self._host or self
+
+    def _get_host(self) -> Listener | None:
+        """Listener of the parent if it can be reached with the request client (falls back to own or shared one)"""
+        if self.parent is not None and (host := self.parent.listener).is_alive():
+            if not host.should_close.is_set() and (self._get_transport() == "unix" or host.port is not None):
+                return host
+        if self.shared:
+            return SharedServer.get(self._get_transport())
+        return None
+
+    def _get_transport(self) -> ServerTransport:
+        if self.prompt_data.request_client == "shell" and self.transport == "unix":
+            return "tcp"  # bash can only open TCP connections through /dev/tcp
+        return self.transport
+
+    def _on_listening(self) -> None:
+        self._set_fzf_env()
+        self._serial_executor = PriorityExecutor(1, thread_name_prefix="Server-serial")
+        self._create_concurrent_executor()
+
+    def _on_closing(self) -> None:
+        self._cancel_async_requests()
+        self._serial_executor.shutdown()
+        if self._concurrent_executor is not None:
+            self._concurrent_executor.shutdown()
+        self._shut_down_idle_executors()
+
+    def _get_server(self, namespace: str | None) -> Server:
+        return self if namespace is None else super()._get_server(namespace)
+
+    def _set_fzf_env(self) -> None:
+        if self.port is not None:
+            self.prompt_data.fzf_env[SOCKET_NUMBER_ENV_VAR] = str(self.port)
+        else:
+            self.prompt_data.fzf_env.pop(SOCKET_NUMBER_ENV_VAR, None)  # scripts read it as a port number
+        self.prompt_data.fzf_env[SOCKET_ADDRESS_ENV_VAR] = self.address
+        self.prompt_data.fzf_env[MAKE_SERVER_CALL_ENV_VAR_NAME] = str(REQUEST_CLIENTS[self.prompt_data.request_client])
+        if self.namespace is not None:
+            self.prompt_data.fzf_env[SERVER_NAMESPACE_ENV_VAR] = self.namespace
+        else:
+            self.prompt_data.fzf_env.pop(SERVER_NAMESPACE_ENV_VAR, None)  # e.g. inherited from fzf of outer prompt
+
+    def _create_concurrent_executor(self) -> None:
+        if self.max_workers > 1:
+            self._concurrent_executor = PriorityExecutor(self.max_workers, thread_name_prefix="Server-concurrent")
+
+    def _dispatch_request(self, client_socket: socket.socket, request: Request, payload: str):
+        """Dispatches request for resolution (arrival order is the order in which fzf made the calls)
+
+        Queued requests are resolved by priority of their endpoints and then by arrival.
+        """
+        try:
             endpoint = self.endpoints[request.endpoint_id]
-            self.logger.debug(
-                f"Resolving {endpoint.trigger}:'{request.endpoint_id}' ({len(self.endpoints)} endpoints registered)",
-                trace_point="resolving_server_call",
-                trigger=endpoint.trigger,
-            )
-            response = endpoint.run(prompt_data, request) or response
         except Exception as err:
-            trb = traceback.format_exc()
-            error_message = f"{trb}\nPayload contents:\n{payload}"
-            self.logger.error("{}", error_message, trace_point="error_handling_request")
-            response = error_message
-            if isinstance(err, KeyError):
-                response = f"{trb}\n{list(self.endpoints.keys())}"
-                self.logger.error(
-                    f"Available server calls:\n{list(self.endpoints.keys())}", trace_point="missing_server_call"
-                )
+            self._respond(client_socket, self._get_error_response(err, payload))
+            return
+        if self.recorder is not None:
+            self.recorder.record(request, endpoint)
+        # latest state is shared, running endpoint gets its own snapshot
+        self.prompt_data.set_state(request.prompt_state, endpoint.trigger)
+        if endpoint.supersedable:
+            self._supersede_previous_request(endpoint, request, client_socket)
+        if endpoint.is_async and not endpoint.serial:
+            self._submit_async(self._resolve_request_async(client_socket, endpoint, request, payload))
+        else:
+            self._get_executor(endpoint).submit(
+                self._resolve_request, client_socket, endpoint, request, payload, priority=endpoint.priority
+            )
+
+    def _get_executor(self, endpoint: ServerEndpoint) -> PriorityExecutor:
+        if endpoint.serial or self._concurrent_executor is None:
+            return self._serial_executor
+        return self._concurrent_executor
+
+    def _supersede_previous_request(self, endpoint: ServerEndpoint, request: Request, client_socket: socket.socket):
+        """Queued previous request is answered right away, running one is only notified"""
+        with self._latest_requests_lock:
+            previous = self._latest_requests.get(endpoint.id)
+            self._latest_requests[endpoint.id] = (request, client_socket)
+        if previous is None:
+            return
+        previous_request, previous_client_socket = previous
+        previous_request.superseded.set()
+        if previous_request.claim():
+            with endpoint.lock:
+                endpoint.dropped_requests += 1
+            self.logger.trace(
+                f"Dropping superseded request to '{endpoint.id}'", trace_point="dropping_superseded_request"
+            )
+            self._respond(previous_client_socket, endpoint.superseded_response)
+        else:
+            with endpoint.lock:
+                endpoint.abandoned_requests += 1
+
+    @property
+    def dropped_requests(self) -> int:
+        """Number of superseded requests answered without being resolved"""
+        return sum(endpoint.dropped_requests for endpoint in self._get_endpoints())
+
+    @property
+    def abandoned_requests(self) -> int:
+        """Number of requests superseded while being resolved"""
+        return sum(endpoint.abandoned_requests for endpoint in self._get_endpoints())
+
+    @property
+    def timed_out_requests(self) -> int:
+        """Number of requests answered with fallback response after their deadline passed"""
+        return sum(endpoint.timed_out_requests for endpoint in self._get_endpoints())
+
+    def get_response_cache(self, function: Callable, memoize: Memoize) -> ResponseCache:
+        """Responses of the memoized function in this prompt (created on first use)"""
+        with self._response_caches_lock:
+            if (cache := self._response_caches.get(function)) is None:
+                cache = self._response_caches[function] = ResponseCache(memoize.max_size, memoize.ttl)
+            return cache
+
+    def invalidate_response_caches(self) -> None:
+        """Drops responses of all memoized server calls (e.g. when they'd be different for the same prompt state)"""
+        with self._response_caches_lock:
+            caches = list(self._response_caches.values())
+        for cache in caches:
+            cache.invalidate()
+        self.logger.debug(f"Invalidated {len(caches)} response caches", trace_point="response_caches_invalidated")
+
+    @property
+    def response_cache_hits(self) -> int:
+        """Number of memoized server calls answered with a cached response"""
+        with self._response_caches_lock:
+            return sum(cache.hits for cache in self._response_caches.values())
+
+    @property
+    def response_cache_misses(self) -> int:
+        with self._response_caches_lock:
+            return sum(cache.misses for cache in self._response_caches.values())
+
+    def _get_endpoints(self) -> list[ServerEndpoint]:
+        with self._endpoints_lock:
+            return list(self.endpoints.values())
+
+    def _resolve_request(
+        self, client_socket: socket.socket, endpoint: ServerEndpoint, request: Request, payload: str
+    ) -> None:
+        if not request.claim():
+            return  # superseded and already answered
+        self.metrics.record_queue_wait(endpoint.priority, time.perf_counter() - request.received_at)
+        response = ""
+        error = False
+        abandoned: Future | None = None
+        try:
+            self._log_resolving(endpoint, request)
+            deadline = self._get_deadline(endpoint)
+            if endpoint.is_async:  # serial one (occupies executor so that the next one waits for it)
+                response, abandoned = self._submit_async(self._run_async(endpoint, request, deadline)).result()
+            elif deadline is None:
+                response = endpoint.run(self.prompt_data, request)
+            else:
+                response, abandoned = self._run_with_deadline(endpoint, request, deadline)
+            response = response or ""
+        except CancelledError:
+            self.logger.debug(f"'{endpoint.id}' cancelled", trace_point="server_call_cancelled")
+        except BaseException as err:  # e.g. SystemExit raised by nested prompt
+            response = self._get_error_response(err, payload)
+            error = True
         finally:
-            response_bytes = str(response).encode("utf-8")
-            try:
-                client_socket.send(len(response_bytes).to_bytes(4))
-                client_socket.sendall(response_bytes)
-            except Exception as e:
-                self.logger.exception(f"Error sending response: {e}", trace_point="error_sending_response")
-            finally:
-                client_socket.close()
+            self._finish_request(
+                client_socket, endpoint, request, response, error=error, timed_out=abandoned is not None
+            )
+        if abandoned is not None and endpoint.serial:
+            wait([abandoned])  # next serial call doesn't start until the one past its deadline finishes
 
-    def add_endpoints(self, binding: Binding[T, S], trigger: Trigger):
-        for action in binding.actions:
-            if isinstance(action, ServerCall):
-                self.add_endpoint(action, trigger)
+    async def _resolve_request_async(
+        self, client_socket: socket.socket, endpoint: ServerEndpoint, request: Request, payload: str
+    ) -> None:
+        """Awaited on the event loop instead of occupying an executor so that many requests can be in flight"""
+        if not request.claim():
+            return  # superseded and already answered
+        self.metrics.record_queue_wait(endpoint.priority, time.perf_counter() - request.received_at)
+        response = ""
+        error = timed_out = False
+        try:
+            self._log_resolving(endpoint, request)
+            response, abandoned = await self._run_async(endpoint, request, self._get_deadline(endpoint))
+            response = response or ""
+            timed_out = abandoned is not None
+        except asyncio.CancelledError:
+            self.logger.debug(f"'{endpoint.id}' cancelled", trace_point="server_call_cancelled")
+            self._forget_latest_request(endpoint, request)
+            client_socket.close()
+            raise
+        except BaseException as err:
+            response = self._get_error_response(err, payload)
+            error = True
+        # sending (or streaming) response mustn't block the event loop
+        await asyncio.to_thread(
+            self._finish_request, client_socket, endpoint, request, response, error=error, timed_out=timed_out
+        )
+
+    def _log_resolving(self, endpoint: ServerEndpoint, request: Request):
+        self.logger.debug(
+            f"Resolving {endpoint.trigger}:'{request.endpoint_id}' ({len(self.endpoints)} endpoints registered)",
+            trace_point="resolving_server_call",
+            trigger=endpoint.trigger,
+        )
+
+    def _get_deadline(self, endpoint: ServerEndpoint) -> float | None:
+        deadline = endpoint.deadline if endpoint.deadline is not None else self.default_deadline
+        return None if deadline == math.inf else deadline
+
+    def _finish_request(
+        self,
+        client_socket: socket.socket,
+        endpoint: ServerEndpoint,
+        request: Request,
+        response: Any,
+        *,
+        error: bool,
+        timed_out: bool,
+    ):
+        self._forget_latest_request(endpoint, request)
+        response_size = self._respond(client_socket, response)
+        self.metrics.get_for(endpoint).record(
+            time.perf_counter() - request.received_at, request.size, response_size, error=error, timeout=timed_out
+        )
+
+    def _forget_latest_request(self, endpoint: ServerEndpoint, request: Request):
+        if endpoint.supersedable:
+            with self._latest_requests_lock:
+                if self._latest_requests.get(endpoint.id, (None,))[0] is request:
+                    del self._latest_requests[endpoint.id]
 
-    def add_endpoint(self, action: ServerCall[T, S], trigger: Trigger):
-        if action.id in self.endpoints:
-            raise ReusedServerCall(
-                f"ServerCall ({action.name}) already resolved as endpoint. Please use unique ServerCall instances."
+    def _submit_async(self, coroutine: Coroutine) -> Future:
+        future = asyncio.run_coroutine_threadsafe(coroutine, EventLoopThread.get_loop())
+        with self._async_requests_lock:
+            self._async_requests.add(future)
+        future.add_done_callback(self._forget_async_request)
+        return future
+
+    def _forget_async_request(self, future: Future):
+        with self._async_requests_lock:
+            self._async_requests.discard(future)
+
+    def _cancel_async_requests(self):
+        with self._async_requests_lock:
+            async_requests = list(self._async_requests)
+        for future in async_requests:
+            future.cancel()
+
+    def _run_with_deadline(
+        self, endpoint: ServerEndpoint, request: Request, deadline: float
+    ) -> tuple[Any, Future | None]:
+        """Function runs in DeadlinePool so that it can be left running when the deadline passes (it can't be
+        interrupted) without blocking other requests or exit
+
+        Returns response and, if the deadline passed, the call left running (done once it finishes or if it didn't
+        start)
+        """
+        if late_response := self._take_late_response(endpoint, request):
+            return late_response[0], None
+        future = DeadlinePool.get().submit(endpoint.run, self.prompt_data, request, priority=endpoint.priority)
+        try:
+            return future.result(max(0.0, deadline - (time.perf_counter() - request.received_at))), None
+        except TimeoutError:
+            self._record_timeout(endpoint, deadline)
+            future.cancel()  # still queued behind functions that hang
+            future.add_done_callback(lambda f: self._handle_late_response(endpoint, request, f))
+            return endpoint.fallback_response, future
+
+    async def _run_async(
+        self, endpoint: ServerEndpoint, request: Request, deadline: float | None
+    ) -> tuple[Any, Future | None]:
+        """Deadline is enforced with asyncio.timeout (function is cancelled unless its late response is cached)
+
+        Returns response and, if the deadline passed, the call left running (done once it finishes or is cancelled)
+        """
+        if deadline is None:
+            return await endpoint.run_async(self.prompt_data, request), None
+        if late_response := self._take_late_response(endpoint, request):
+            return late_response[0], None
+        task = asyncio.ensure_future(endpoint.run_async(self.prompt_data, request))
+        try:
+            async with asyncio.timeout(max(0.0, deadline - (time.perf_counter() - request.received_at))) as timeout:
+                return await (asyncio.shield(task) if endpoint.cache_late_response else task), None
+        except TimeoutError:
+            if not timeout.expired():
+                raise  # raised by the function itself
+            self._record_timeout(endpoint, deadline)
+            if endpoint.cache_late_response:
+                task.add_done_callback(lambda t: self._handle_late_response(endpoint, request, t))
+            abandoned: Future = Future()
+            task.add_done_callback(lambda t: abandoned.set_result(None))
+            return endpoint.fallback_response, abandoned
+
+    def _take_late_response(self, endpoint: ServerEndpoint, request: Request) -> tuple[Any] | None:
+        """Late response is only used by the next request and only if it was made in the same state"""
+        if not endpoint.cache_late_response:
+            return None
+        with endpoint.lock:
+            late_response, endpoint.late_response = endpoint.late_response, None
+        if late_response is None:
+            return None
+        if late_response[0] != request.cache_key:
+            return None
+        self.logger.trace(f"Using late response of '{endpoint.id}'", trace_point="using_late_response")
+        return (late_response[1],)
+
+    def _record_timeout(self, endpoint: ServerEndpoint, deadline: float):
+        with endpoint.lock:
+            endpoint.timed_out_requests += 1
+        self.logger.warning(
+            f"'{endpoint.id}' didn't respond within its deadline ({deadline} s)",
+            trace_point="server_call_deadline_exceeded",
+            trigger=endpoint.trigger,
+        )
+
+    def _handle_late_response(self, endpoint: ServerEndpoint, request: Request, future: Future | asyncio.Future):
+        """Only complete responses (not files or iterators) can be cached"""
+        if future.cancelled():
+            return
+        if (err := future.exception()) is not None:
+            self.logger.error(f"Late error of '{endpoint.id}': {err!r}", trace_point="late_server_call_error")
+            self._propagate_nested_prompt_error(err)
+            return
+        response = future.result()
+        if endpoint.cache_late_response and not isinstance(response, (io.IOBase, Iterator)):
+            with endpoint.lock:
+                endpoint.late_response = (request.cache_key, response)
+            self.logger.trace(f"Caching late response of '{endpoint.id}'", trace_point="caching_late_response")
+        elif isinstance(response, io.IOBase):
+            response.close()
+
+    def _get_error_response(self, err: BaseException, payload: str) -> str:
+        self._propagate_nested_prompt_error(err)
+        error_message = super()._get_error_response(err, payload)
+        if isinstance(err, KeyError):
+            self.logger.error(
+                f"Available server calls:\n{list(self.endpoints.keys())}", trace_point="missing_server_call"
             )
-        endpoint = ServerEndpoint(action.function, action.id, trigger)
+            return f"{traceback.format_exc()}\n{list(self.endpoints.keys())}"
+        return error_message
+
+    def _propagate_nested_prompt_error(self, err: BaseException):
+        """Exception raised by prompt nested in a server call ends this prompt too unless the function handled it"""
+        if err is self.prompt_data.nested_prompt_error:
+            self.prompt_data.propagate_exception(err)
+
+    def add_endpoints(
+        self,
+        binding: Binding[T, S],
+        trigger: Trigger,
+        *,
+        priority: Priority | None = None,
+        owner: Any = None,
+        scope: EndpointScope | None = None,
+    ):
+        for action in binding.resolved_actions:
+            if isinstance(action, ServerCall):
+                self.add_endpoint(action, trigger, priority=priority, owner=owner, scope=scope)
+
+    def add_endpoint(
+        self,
+        action: ServerCall[T, S],
+        trigger: Trigger,
+        *,
+        priority: Priority | None = None,
+        owner: Any = None,
+        scope: EndpointScope | None = None,
+    ):
+        """priority: Overrides priority of the server call (e.g. when it's repeated in the background)
+        owner: What added the endpoint (all its endpoints can be removed with remove_endpoints)
+        scope: Overrides scope of the server call
+        """
+        if self.prompt_data.selection_mirror is not None:
+            action.exclude_state_fields("target_indices")
+        if action.process_pool:
+            ProcessPool.warm_up()  # workers start while fzf does
+        for cached_output in action.cached_command_outputs:
+            cached_output.warm_up()  # evaluated while fzf starts
+        endpoint = ServerEndpoint(
+            action.function,
+            action.id,
+            trigger,
+            serial=action.serial,
+            supersedable=action.supersedable,
+            superseded_response=action.superseded_response,
+            deadline=action.deadline,
+            fallback_response=action.fallback_response,
+            cache_late_response=action.cache_late_response,
+            priority=priority or action.priority,
+            owner=owner,
+            scope=scope or action.scope,
+        )
+        with self._endpoints_lock:
+            if endpoint.id in self.endpoints:
+                raise ReusedServerCall(
+                    f"ServerCall ({action.name}) already resolved as endpoint. Please use unique ServerCall instances."
+                )
+            self.endpoints[endpoint.id] = endpoint
+            self.endpoints_added += 1
+            leaking = len(self.endpoints) > Config.endpoint_leak_threshold and not self._leak_reported
+            self._leak_reported |= leaking
         self.logger.debug(f"🤙 Adding server endpoint: {endpoint.id}", trace_point="adding_server_endpoint")
-        self.endpoints[endpoint.id] = endpoint
+        if leaking:
+            self.logger.warning(
+                f"Prompt has over {Config.endpoint_leak_threshold} server endpoints, they're probably leaking",
+                trace_point="endpoint_leak_suspected",
+                endpoint_counts=self.endpoint_counts(),
+            )
+
+    def remove_endpoint(self, endpoint_id: str) -> ServerEndpoint | None:
+        with self._endpoints_lock:
+            if endpoint := self.endpoints.pop(endpoint_id, None):
+                self.endpoints_removed += 1
+        if endpoint:
+            self._on_endpoint_removed(endpoint)
+        return endpoint
+
+    def remove_endpoints(self, owner: Any) -> int:
+        """Removes all endpoints added by the owner and returns their number"""
+        with self._endpoints_lock:
+            endpoints = [endpoint for endpoint in self.endpoints.values() if endpoint.owner is owner]
+            for endpoint in endpoints:
+                del self.endpoints[endpoint.id]
+            self.endpoints_removed += len(endpoints)
+        for endpoint in endpoints:
+            self._on_endpoint_removed(endpoint)
+        return len(endpoints)
+
+    def _on_endpoint_removed(self, endpoint: ServerEndpoint) -> None:
+        endpoint.removed = True
+        self.metrics.fold(endpoint)
+
+    def endpoint_counts(self) -> dict[EndpointScope, int]:
+        """Numbers of live endpoints by their scope"""
+        counts = dict.fromkeys(ENDPOINT_SCOPES, 0)
+        for endpoint in self._get_endpoints():
+            counts[endpoint.scope] += 1
+        return counts
+
+
+class SharedServer(Listener):
+    """Process-wide listener routing requests to Servers of running prompts by their namespace
+
+    Started when first needed and kept running (daemon thread) so that back-to-back prompts don't repeat the setup.
+    Each Server resolves requests using its own executors (prompt nested in a server call has to be able to make its
+    own server calls) but idle serial executors are reused.
+    """
+
+    _instances: ClassVar[dict[ServerTransport, SharedServer]] = {}
+    _instances_lock: ClassVar[Lock] = Lock()
+
+    def __init__(self, transport: ServerTransport) -> None:
+        super().__init__("SharedServer", transport, daemon=True)
+
+    @classmethod
+    def get(cls, transport: ServerTransport) -> SharedServer:
+        """Started on first use"""
+        with cls._instances_lock:
+            shared_server = cls._instances.get(transport)
+            if shared_server is None or not shared_server.is_alive():
+                shared_server = cls._instances[transport] = cls(transport)
+                shared_server.start()
+        shared_server.setup_finished.wait()
+        return shared_server
+
+    def _on_closing(self) -> None:
+        self._shut_down_idle_executors()
+
+
+class EventLoopThread(Thread, LoggedComponent):
+    """Runs the asyncio event loop async server call functions are awaited on
+
+    Started on first use and shared by all Servers (a function mustn't block it, e.g. it runs a nested prompt with
+    Prompt.run_async).
+    """
+
+    _instance: ClassVar[EventLoopThread | None] = None
+    _instance_lock: ClassVar[Lock] = Lock()
+
+    def __init__(self) -> None:
+        LoggedComponent.__init__(self)
+        Thread.__init__(self, name="Server-event-loop", daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self.loop_running = Event()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._instance_lock:
+            if cls._instance is None or not cls._instance.is_alive():
+                cls._instance = cls()
+                cls._instance.start()
+            instance = cls._instance
+        instance.loop_running.wait()
+        return instance.loop
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self.loop_running.set)
+        self.loop.run_forever()
+
+
+class DeadlinePool:
+    """Bounded pool of daemon threads running server call functions that have a deadline (shared by all Servers)
+
+    A function still running after its deadline keeps its thread, so at most Config.server_deadline_workers of them
+    are left running at once and later calls wait in the queue (answered with their fallback response meanwhile).
+    """
+
+    _executor: ClassVar[PriorityExecutor | None] = None
+    _lock: ClassVar[Lock] = Lock()
+
+    @classmethod
+    def get(cls) -> PriorityExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = PriorityExecutor(Config.server_deadline_workers, thread_name_prefix="Server-deadline")
+            return cls._executor
+
+
+class ShutdownEvent(Event):
+    """Event whose .set() also wakes up the Server waiting for requests"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = Lock()
+        self._wakeup_sender: socket.socket | None = None
+
+    def open_wakeup_socket(self) -> socket.socket:
+        """Returns receiving end that becomes readable when the event is set"""
+        receiver, sender = socket.socketpair()
+        with self._lock:
+            self._wakeup_sender = sender
+        return receiver
+
+    def close_wakeup_socket(self) -> None:
+        with self._lock:
+            if self._wakeup_sender is not None:
+                self._wakeup_sender.close()
+                self._wakeup_sender = None
+
+    def set(self) -> None:
+        super().set()
+        with self._lock:
+            if self._wakeup_sender is not None:
+                try:
+                    self._wakeup_sender.send(b"\0")
+                except OSError:
+                    pass  # receiving end already closed or wakeup already pending
 
 
 class ReusedServerCall(Exception):
     pass
+
+
+class InvalidRequest(Exception):
+    """Payload of request that couldn't be parsed"""
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .options import Trigger
+    from .prompt_data import PromptData
+from ..monitoring import LoggedComponent
+from .action_menu.parametrized_actions import ShellCommand
+from .server import PromptEndingAction, PromptState, ServerCall
+
+ENDING_MARKER = "fzf-primitives-ending"  # first field of the output (fzf's own accept prints selected lines instead)
+
+
+class ServerlessEnding[T, S](ShellCommand[T, S]):
+    """Stands in for a PromptEndingAction when the prompt runs without Server
+
+    fzf is replaced (become) with printf writing the prompt state to stdout (NUL separated): ending marker and
+    number, query, current index, selected count and target indices.
+    """
+
+    def __init__(self, number: int, prompt_ending_action: PromptEndingAction[T, S]) -> None:
+        self.number = number
+        self.prompt_ending_action = prompt_ending_action
+        super().__init__(
+            f"printf '%s\\0' {ENDING_MARKER}-{number} {{q}} {{n}} \"$FZF_SELECT_COUNT\" {{+n}}", command_type="become"
+        )
+
+    def __str__(self) -> str:
+        return str(self.prompt_ending_action)
+
+
+class ServerlessEndings[T, S](LoggedComponent):
+    """Prompt ending actions of a prompt running without Server by their number (printed by ServerlessEnding)"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._endings: list[tuple[Trigger, PromptEndingAction[T, S]]] = []
+
+    def bind(self, prompt_data: PromptData[T, S]) -> None:
+        """Replaces prompt ending action of every binding with ServerlessEnding"""
+        for trigger, binding in prompt_data.action_menu.bindings.items():
+            if binding.final_action:
+                self._endings.append((trigger, binding.final_action))
+                binding.actions[-1] = ServerlessEnding(len(self._endings) - 1, binding.final_action)
+
+    def apply_output(self, prompt_data: PromptData[T, S], output: str) -> None:
+        """Sets state, trigger and final action of the prompt from fzf output
+
+        If no ending printed it (fzf ended some other way), the state is empty and the prompt isn't finished.
+        """
+        marker, _, number = (fields := output.split("\0"))[0].rpartition("-")
+        if marker != ENDING_MARKER or not number.isdigit() or len(fields) < 5:
+            prompt_data.set_state(PromptState("", None, 0, []), "start")
+            return
+        trigger, prompt_data.final_action = self._endings[int(number)]
+        query, current_index, selected_count, *target_indices = fields[1:]
+        state = PromptState(
+            query,
+            int(current_index) if current_index else None,
+            int(selected_count or 0),
+            [int(i) for i in target_indices if i],
+        )
+        prompt_data.set_state(state, trigger)
+        prompt_data.set_stage("finished")
+        self.logger.debug(f"Prompt ended by {prompt_data.final_action}", trace_point="serverless_prompt_ended")
+
+
+def get_server_requirement(prompt_data: PromptData) -> str | None:
+    """Why the prompt needs Server, None if it can run without it (only ends with PromptEndingActions)"""
+    if os.name == "nt":
+        return "ending the prompt without Server relies on POSIX shell"
+    if prompt_data.should_run_automator:
+        return "automator makes server calls"
+    if prompt_data.selection_mirror is not None:
+        return "selection mirror is synced by server calls"
+    if prompt_data.previewer.previews and isinstance(
+        prompt_data.previewer.current_preview.change_preview_output, ServerCall
+    ):
+        return "main preview is a server call"
+    for trigger, binding in prompt_data.action_menu.bindings.items():
+        for action in binding.actions:
+            if isinstance(action, PromptEndingAction) and action is binding.final_action and action.allow_empty:
+                continue
+            if isinstance(action, ServerCall):
+                return f"'{trigger}' binding has server call {action}"
+    return None
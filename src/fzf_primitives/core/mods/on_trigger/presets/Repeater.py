@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import time
-from threading import Thread
+import weakref
+from threading import Lock, Thread
 from typing import Callable
 
 from ....FzfPrompt import Action, Binding, PromptData
+from ....FzfPrompt.server import Server
 from ....FzfPrompt.action_menu import ParametrizedAction
 from ....monitoring import LoggedComponent
 
@@ -18,21 +20,26 @@ class Repeater[T, S]:
         repeat_when: Callable[[PromptData[T, S]], bool] = lambda pd: True,
     ) -> None:
         self.actions = actions
-        self._endpoints_added = False
+        self._servers: weakref.WeakSet[Server] = weakref.WeakSet()  # that have endpoints of the actions (per prompt)
         self.repeat_interval = repeat_interval
         self.repeat_when = repeat_when
         self.thread: AutomatingThread[T, S] | None = None
+        self._lock = Lock()  # toggling calls can be resolved concurrently
 
     def __call__(self, prompt_data: PromptData, FZF_PORT: str):
-        if not self._endpoints_added:
-            prompt_data.server.add_endpoints(Binding("", *self.actions), prompt_data.trigger)
-            self._endpoints_added = True
-        if not self.thread:
-            self.thread = self.create_automating_thread(prompt_data, int(FZF_PORT))
-            self.thread.start()
-        else:
-            self.thread.should_stop = True
-            self.thread = None
+        with self._lock:
+            if prompt_data.server not in self._servers:
+                # repeated calls mustn't hold up the ones a user waits on
+                prompt_data.server.add_endpoints(
+                    Binding("", *self.actions), prompt_data.trigger, priority="background", owner=self
+                )
+                self._servers.add(prompt_data.server)
+            if not self.thread:
+                self.thread = self.create_automating_thread(prompt_data, int(FZF_PORT))
+                self.thread.start()
+            else:
+                self.thread.should_stop = True
+                self.thread = None
 
     def create_automating_thread(self, prompt_data: PromptData[T, S], port: int):
         return AutomatingThread(
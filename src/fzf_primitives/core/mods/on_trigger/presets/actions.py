@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-from typing import Callable, Literal
+import inspect
+from typing import Awaitable, Callable, Literal
 
 from ....FzfPrompt.server import FzfPlaceholder, VarOutput
 from ....FzfPrompt import Action, PreviewFunction, PromptData, ServerCall, Transform
 from ....FzfPrompt.action_menu import DeselectAt, MovePointer, SelectAt, ToggleAt
 from ....monitoring import LoggedComponent
 
-type EntriesGetter[T, S] = Callable[[PromptData[T, S]], list[T]]
+type EntriesGetter[T, S] = Callable[[PromptData[T, S]], list[T] | Awaitable[list[T]]]
 type SelectionAction = Literal["select", "deselect", "toggle"]
 
 
@@ -57,14 +58,27 @@ class ReloadEntries[T, S](ServerCall[T, S], LoggedComponent):
 
         def reload_entries(prompt_data: PromptData[T, S]):
             try:
-                entries = entries_getter(prompt_data)
-                prompt_data.entries = entries
+                prompt_data.replace_entries(entries_getter(prompt_data))  # type: ignore
+                prompt_data.server.invalidate_response_caches()  # memoized by indices of the previous entries
                 return prompt_data.fzf_input()
             except Exception as e:
                 self.logger.error(f"Error in reload_entries: {e}", trace_point="error_in_reload_entries")
                 return None
 
-        super().__init__(reload_entries, command_type="reload-sync" if sync else "reload")
+        async def reload_entries_async(prompt_data: PromptData[T, S]):
+            try:
+                prompt_data.replace_entries(await entries_getter(prompt_data))  # type: ignore
+                prompt_data.server.invalidate_response_caches()
+                return prompt_data.fzf_input()
+            except Exception as e:
+                self.logger.error(f"Error in reload_entries: {e}", trace_point="error_in_reload_entries")
+                return None
+
+        super().__init__(
+            reload_entries_async if inspect.iscoroutinefunction(entries_getter) else reload_entries,
+            command_type="reload-sync" if sync else "reload",
+            serial=True,
+        )
 
     def __str__(self) -> str:
         return f"[RC]({self._get_function_name(self.function)})"
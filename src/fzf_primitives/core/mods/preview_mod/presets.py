@@ -127,6 +127,10 @@ def get_fzf_json(prompt_data: PromptData, FZF_PORT: str):
     return json.dumps(requests.get(f"http://127.0.0.1:{FZF_PORT}").json(), indent=2)
 
 
+def get_server_metrics(prompt_data: PromptData):
+    return prompt_data.metrics.to_json()
+
+
 def get_fzf_env_vars(
     prompt_data: PromptData,
     FZF_LINES,
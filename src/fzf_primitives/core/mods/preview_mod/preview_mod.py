@@ -16,14 +16,19 @@ from ...FzfPrompt import (
     PromptData,
     ServerCall,
 )
+from ...FzfPrompt.server import Memoize
 from ...FzfPrompt.action_menu.transform import Transform
 from ...FzfPrompt.options import Event, Hotkey, RelativeWindowSize, Trigger, WindowPosition
 from ...FzfPrompt.previewer.Preview import (
     DEFAULT_BEFORE_CHANGE_DO,
+    DEFAULT_DEADLINE,
     DEFAULT_LABEL,
     DEFAULT_LINE_WRAP,
+    DEFAULT_MEMOIZE,
     DEFAULT_OUTPUT_GENERATOR,
+    DEFAULT_PROCESS_POOL,
     DEFAULT_STORE_OUTPUT,
+    DEFAULT_SUPERSEDABLE,
     DEFAULT_WINDOW_POSITION,
     DEFAULT_WINDOW_SIZE,
     PreviewStyleMutationArgs,
@@ -37,6 +42,7 @@ from .presets import (
     get_fzf_env_vars,
     get_fzf_json,
     get_fzf_placeholders,
+    get_server_metrics,
     preview_basic,
 )
 
@@ -78,6 +84,10 @@ class PreviewMod[T, S](LoggedComponent):
         line_wrap: bool = DEFAULT_LINE_WRAP,
         before_change_do: PreviewChangePreProcessor[T, S] = DEFAULT_BEFORE_CHANGE_DO,
         store_output: bool = DEFAULT_STORE_OUTPUT,
+        deadline: float | None = DEFAULT_DEADLINE,
+        process_pool: bool = DEFAULT_PROCESS_POOL,
+        memoize: Memoize | None = DEFAULT_MEMOIZE,
+        supersedable: bool = DEFAULT_SUPERSEDABLE,
     ):
         self._preview = Preview[T, S](
             name,
@@ -88,6 +98,10 @@ class PreviewMod[T, S](LoggedComponent):
             line_wrap=line_wrap,
             before_change_do=before_change_do,
             store_output=store_output,
+            deadline=deadline,
+            process_pool=process_pool,
+            memoize=memoize,
+            supersedable=supersedable,
         )
         self._additional_mods.append(specific_preview_mod := SpecificPreviewMod(self._preview))
         return specific_preview_mod
@@ -101,6 +115,10 @@ class PreviewMod[T, S](LoggedComponent):
         """Preset for viewing fzf JSON"""
         return self.custom("fzf json", output_generator=get_fzf_json, label="fzf JSON")
 
+    def server_metrics(self) -> SpecificPreviewMod[T, S]:
+        """Preset for viewing request statistics of server calls (slowest first)"""
+        return self.custom("server metrics", output_generator=get_server_metrics, label="Server metrics")
+
     def fzf_env_vars(self) -> SpecificPreviewMod[T, S]:
         """Preset for viewing fzf env vars"""
         return self.custom("fzf env vars", output_generator=get_fzf_env_vars, label="fzf env vars")
@@ -190,10 +208,12 @@ class SpecificPreviewOnTrigger[T, S](OnTriggerBase[T, S]):
                 Transform(
                     lambda pd: (
                         ServerCall[T, S](
-                            lambda pd: self._preview.update(**mutator(pd))
-                            if pd.previewer.current_preview.id == self._preview.id
-                            or not mutate_only_when_already_focused
-                            else None,
+                            lambda pd: (
+                                self._preview.update(**mutator(pd))
+                                if pd.previewer.current_preview.id == self._preview.id
+                                or not mutate_only_when_already_focused
+                                else None
+                            ),
                             command_type="execute-silent",
                         ),
                         *(
@@ -1,10 +1,16 @@
+import asyncio
 from pathlib import Path
 from typing import Callable, Iterable
 
 from ..config import Config
 from .FzfPrompt import Binding, PromptData, Result, ServerCall, execute_fzf
 from .FzfPrompt.decorators import single_use_method
+from .FzfPrompt.prompt_data import get_resolving_prompt_data
+from .FzfPrompt.selection_mirror import SelectionMirror, bind_selection_mirror
+from .FzfPrompt.serverless import ServerlessEndings, get_server_requirement
+from .FzfPrompt.server import RecordedRequest, ReplayReport, RequestClient, RequestRecorder, RequestReplayer
 from .mods import Mod
+from .monitoring import Logger
 
 
 class Prompt[T, S]:
@@ -18,11 +24,31 @@ class Prompt[T, S]:
         *,
         entries_stream: Iterable[T] | None = None,
         use_basic_hotkeys: bool | None = None,
+        request_client: RequestClient | None = None,
+        server_call_deadline: float | None = None,
+        shared_server: bool | None = None,
+        mirror_selections: bool | None = None,
+        serverless: bool | None = None,
     ):
-        """If entries_stream is provided, reloading actions (reload and reload-sync) are disabled"""
+        """If entries_stream is provided, reloading actions (reload and reload-sync) are disabled
+
+        request_client: Program fzf runs to make server calls ('shell' avoids Python interpreter startup per call)
+        server_call_deadline: Seconds after which server calls without their own deadline get their fallback response
+        shared_server: Register endpoints with process-wide server instead of starting one (faster back-to-back prompts)
+        mirror_selections: Keep selections in Python so that server calls don't carry them (many selected entries)
+        serverless: Run without server if the prompt only has prompt ending server calls (faster startup, opt-in)
+        """
         self._entries_stream = entries_stream
+        self._serverless = serverless if serverless is not None else Config.serverless_prompts
         self._converter = converter
         self._prompt_data = PromptData(entries=entries, converter=converter, obj=obj)
+        self._prompt_data.request_client = request_client or Config.request_client
+        if server_call_deadline is not None:
+            self._prompt_data.server.default_deadline = server_call_deadline
+        if shared_server is not None:
+            self.shared_server = shared_server
+        if mirror_selections if mirror_selections is not None else Config.mirror_selections:
+            self._prompt_data.selection_mirror = SelectionMirror()
         self._mod = Mod()
         if use_basic_hotkeys is None:
             use_basic_hotkeys = Config.use_basic_hotkeys
@@ -42,17 +68,64 @@ class Prompt[T, S]:
     def obj(self) -> S:
         return self._prompt_data.obj
 
+    @property
+    def shared_server(self) -> bool:
+        return self._prompt_data.server.shared
+
+    @shared_server.setter
+    def shared_server(self, value: bool):
+        self._prompt_data.server.shared = value
+
+    @property
+    def selection_mirror(self) -> SelectionMirror | None:
+        return self._prompt_data.selection_mirror
+
+    @property
+    def serverless(self) -> bool:
+        """Whether the prompt runs without Server (known once it's run)"""
+        return self._prompt_data.serverless_endings is not None
+
     @property
     def current_preview(self):
         return self._prompt_data.get_current_preview()
 
     @single_use_method
     def run(self, executable_path: str | Path | None = None) -> Result[T, S]:
+        """Runs without Server when serverless and the prompt has no server calls other than prompt ending actions
+        (see Config.serverless_prompts)
+
+        Prompt run from a server call of another prompt (nested prompt) is hosted by the other prompt's server. If the
+        server call function doesn't handle an exception raised here, the other prompt ends and raises it too.
+        """
+        if (parent := get_resolving_prompt_data()) is not None:
+            self._prompt_data.server.parent = parent.server
+        try:
+            self._run_initial_setup(serverless=self._serverless)
+            return execute_fzf(self._prompt_data, executable_path=executable_path, entries_stream=self._entries_stream)
+        except BaseException as err:
+            if parent is not None:
+                parent.nested_prompt_error = err
+            raise
+
+    async def run_async(self, executable_path: str | Path | None = None) -> Result[T, S]:
+        """Runs in a separate thread (e.g. nested prompt run from async server call mustn't block the event loop)"""
+        return await asyncio.to_thread(self.run, executable_path)
+
+    def record_requests(self, path: str | Path):
+        """Server calls made during the run are written to path (JSON Lines, gzip compressed if it ends with .gz)"""
+        self._prompt_data.server.recorder = RequestRecorder(path)
+
+    @single_use_method
+    def replay(self, recorded_requests: Iterable[RecordedRequest], *, speed: float | None = 1.0) -> ReplayReport:
+        """Makes recorded server calls instead of running fzf (the prompt has to be built like the recorded one)
+
+        speed: Recorded intervals between calls are divided by it (None drops the timing)
+        """
         self._run_initial_setup()
-        return execute_fzf(self._prompt_data, executable_path=executable_path, entries_stream=self._entries_stream)
+        return RequestReplayer(self._prompt_data, speed=speed).replay(recorded_requests)
 
     @single_use_method
-    def _run_initial_setup(self):
+    def _run_initial_setup(self, *, serverless: bool = False):
         self.mod.apply(self._prompt_data)
         if self._entries_stream is not None:
             # Ensure that the preview is refreshed with new lines
@@ -64,7 +137,19 @@ class Prompt[T, S]:
         if self._prompt_data.should_run_automator:
             self._prompt_data.automator.prepare()
             self._prompt_data.automator.start()
+        if serverless and (server_requirement := get_server_requirement(self._prompt_data)) is None:
+            self._prompt_data.serverless_endings = ServerlessEndings()
+            self._prompt_data.serverless_endings.bind(self._prompt_data)
+        else:
+            if serverless:
+                Logger.get_logger().debug(
+                    f"Prompt runs with server: {server_requirement}", trace_point="prompt_needs_server"
+                )
+            self._set_up_server()
+        self._prompt_data.options += self._prompt_data.action_menu.resolve_options()
+        self._stage = "ready to run"
 
+    def _set_up_server(self):
         def on_startup_success(prompt_data: PromptData, FZF_PORT: str):
             self._prompt_data.set_stage("running")
             if FZF_PORT.isdigit():
@@ -75,7 +160,9 @@ class Prompt[T, S]:
             Binding("On startup success", ServerCall(on_startup_success, command_type="execute-silent")),
             on_conflict="prepend",
         )
+        if self._prompt_data.selection_mirror is not None:
+            bind_selection_mirror(self._prompt_data.action_menu)
+        if Config.fuse_server_calls:
+            self._prompt_data.action_menu.fuse_server_calls()
         for trigger, binding in self._prompt_data.action_menu.bindings.items():
             self._prompt_data.server.add_endpoints(binding, trigger)
-        self._prompt_data.options += self._prompt_data.action_menu.resolve_options()
-        self._stage = "ready to run"
@@ -14,9 +14,16 @@ def run_in_loop[T, S](
     prompt_builder: PromptBuilder[T, S],
     result_processor: ResultProcessor[T, S] = lambda x: None,
     quit_hotkey: Hotkey = "ctrl-q",
+    *,
+    shared_server: bool | None = None,
 ):
+    """shared_server: Prompts reuse process-wide server instead of starting one on every iteration (overrides what
+    the prompt builder or Config.shared_server set)
+    """
     while True:
         prompt = prompt_builder()
+        if shared_server is not None:
+            prompt.shared_server = shared_server
         prompt.mod.on_hotkey(quit_hotkey).quit()
         result = prompt.run()
         if result.end_status == "abort":
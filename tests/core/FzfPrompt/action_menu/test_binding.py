@@ -1,7 +1,20 @@
 import pytest
 
+from fzf_primitives import Prompt, PromptData
 from fzf_primitives.actions import ShellCommand
+from fzf_primitives.config import Config
 from fzf_primitives.core.FzfPrompt.action_menu.binding import Binding
+from fzf_primitives.core.FzfPrompt.server import (
+    MAKE_SERVER_CALL_ENV_VAR_NAME,
+    CommandOutput,
+    FusedServerCall,
+    PromptEndingAction,
+    ServerCall,
+    VarOutput,
+)
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
 
 BINDING1 = Binding("Some binding", ShellCommand("echo -n first && read"))
 BINDING2 = Binding("Some other binding", ShellCommand("echo -n second && read"))
@@ -111,3 +124,70 @@ def get_binding_cycling():
 
 if __name__ == "__main__":
     print(get_binding_cycling())
+
+
+def test_fusing_consecutive_silent_server_calls():
+    called: list[str] = []
+    first = ServerCall(lambda pd: called.append("first"), command_type="execute-silent")
+    second = ServerCall(lambda pd, FZF_PORT: called.append(f"second {FZF_PORT}"), command_type="execute-silent")
+    third = ServerCall(lambda pd: called.append("third"), command_type="execute-silent")
+    ending = PromptEndingAction("accept")
+    echo = ShellCommand("echo")
+    binding = Binding("fusable", first, second, echo, "clear-query", third, ending)
+
+    assert binding.fuse_server_calls() == 2
+    fused, *unchanged, fused_ending = binding.resolved_actions
+    assert isinstance(fused, FusedServerCall) and fused.server_calls == (first, second)
+    assert isinstance(fused_ending, FusedServerCall) and fused_ending.server_calls == (third, ending)
+    assert unchanged == [echo, "clear-query"]
+    assert binding.actions == [first, second, echo, "clear-query", third, ending], "Actions are kept"
+    action_string = binding.action_string()
+    assert action_string.count(MAKE_SERVER_CALL_ENV_VAR_NAME) == 2
+    assert "+execute(echo)+clear-query+" in action_string and action_string.endswith("+accept")
+
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.add_endpoints(binding, "ctrl-f")
+    assert set(prompt_data.server.endpoints) == {fused.id, fused_ending.id}
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    try:
+        make_server_call(prompt_data.server.address, fused.id, PROMPT_STATE, {"FZF_PORT": "1234"})
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert called == ["first", "second 1234"]
+
+
+def test_server_calls_that_cannot_be_fused():
+    preview_call = ServerCall(lambda pd: "preview", command_type="execute-silent", supersedable=True)
+    output_call = ServerCall(lambda pd: None, command_type="execute")
+    binding = Binding("not fusable", preview_call, output_call, ServerCall(lambda pd: None))
+    assert binding.fuse_server_calls() == 0
+    assert binding.resolved_actions == binding.actions
+
+
+def test_server_calls_with_different_defaults_of_the_same_text_are_not_fused():
+    def run_command(prompt_data: PromptData, value: str = CommandOutput("FZF_QUERY")): ...
+
+    def read_var(prompt_data: PromptData, value: str = VarOutput("FZF_QUERY")): ...
+
+    def run_same_command(prompt_data: PromptData, value: str = CommandOutput("FZF_QUERY")): ...
+
+    silent_calls = [ServerCall(f, command_type="execute-silent") for f in (run_command, read_var, run_same_command)]
+    assert not FusedServerCall.can_fuse_with(silent_calls[:1], silent_calls[1])
+    assert FusedServerCall.can_fuse_with(silent_calls[:1], silent_calls[2])
+    assert Binding("different defaults", *silent_calls[:2]).fuse_server_calls() == 0
+
+
+def test_fused_start_binding():
+    called: list[int | None] = []
+    prompt = Prompt([1, 2, 3])
+    prompt.mod.on_event("start").run_function("record", lambda pd: called.append(pd.current), silent=True)
+    prompt.mod.automate(Config.default_accept_hotkey)
+    result = prompt.run()
+    assert called == [1]
+    assert result.end_status == "accept"
+    assert any(
+        isinstance(action, FusedServerCall)
+        for action in prompt._prompt_data.action_menu.bindings["start"].resolved_actions
+    )
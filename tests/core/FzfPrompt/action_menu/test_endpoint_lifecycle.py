@@ -0,0 +1,97 @@
+import threading
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.core.FzfPrompt import Binding, PromptEndingAction, ServerCall, Transform
+from fzf_primitives.core.FzfPrompt.action_menu.transform import ENDPOINT_CACHE_SIZE
+from fzf_primitives.core.FzfPrompt.previewer import Preview
+from fzf_primitives.core.FzfPrompt.server import PromptState
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+from fzf_primitives.core.mods.on_trigger.presets.Repeater import Repeater
+
+INVOCATIONS = 3_000  # soak run with memory measured is tools/benchmarks/endpoint_lifecycle.py
+REQUEST_EVERY = 10  # invocation (requests go to endpoints that get evicted later)
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def test_registries_stay_bounded_over_transform_invocations():
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.action_menu.add("ctrl-a", Binding("accept", PromptEndingAction("accept")))
+    transform = Transform(
+        lambda pd: [
+            lambda pd: None,
+            ServerCall(lambda pd: None, command_type="execute-silent"),
+            PromptEndingAction("accept"),
+        ]
+    )
+    action_count = prompt_data.action_menu.action_count
+    requests = 0
+
+    def invoke(invocations: int) -> None:
+        nonlocal requests
+        for i in range(invocations):
+            transform.function(prompt_data)
+            if i % REQUEST_EVERY == 0:
+                endpoint_id = next(reversed(prompt_data.server.endpoints))  # of the returned ServerCall
+                make_server_call(prompt_data.server.address, endpoint_id, PROMPT_STATE, {})
+                requests += 1
+
+    def registry_sizes() -> dict[str, int]:
+        return {
+            "endpoints": len(prompt_data.server.endpoints),
+            "endpoint cache": len(transform._endpoint_caches[prompt_data.server]),  # noqa: SLF001
+            "metrics": len(prompt_data.metrics.endpoints),
+            "bindings": len(prompt_data.action_menu.bindings),
+        }
+
+    prompt_data.server.open()
+    try:
+        with prompt_data.using_state(PromptState(), "ctrl-a"):
+            invoke(ENDPOINT_CACHE_SIZE * 2)  # fills the endpoint cache
+            filled_sizes = registry_sizes()
+            invoke(INVOCATIONS)
+    finally:
+        prompt_data.server.close()
+
+    assert registry_sizes() == filled_sizes
+    assert filled_sizes["endpoint cache"] == ENDPOINT_CACHE_SIZE
+    assert len(prompt_data.metrics.endpoints) <= ENDPOINT_CACHE_SIZE + 1, (
+        "Metrics of removed endpoints should be folded"
+    )
+    assert sum(metrics.requests for metrics in prompt_data.metrics.endpoints.values()) == requests
+    assert len(prompt_data.server.endpoints) == ENDPOINT_CACHE_SIZE
+    assert prompt_data.server.endpoint_counts() == {"prompt": 0, "transform": ENDPOINT_CACHE_SIZE, "preview": 0}
+    assert prompt_data.action_menu.action_count == action_count, "Returned prompt ending actions mustn't be bound"
+
+
+def test_endpoints_of_outdated_preview_are_removed():
+    prompt_data = PromptData([1, 2, 3])
+    preview = Preview("test", output_generator=lambda pd: "output")
+    with prompt_data.using_state(PromptState(), "ctrl-p"):
+        preview.transform_preview.function(prompt_data)
+        assert prompt_data.server.endpoint_counts()["preview"] == 2
+        preview.update(output_generator=lambda pd: "updated output")
+        preview.transform_preview.function(prompt_data)
+    assert prompt_data.server.endpoint_counts()["preview"] == 2
+    assert prompt_data.server.endpoints_removed == 2
+
+
+def test_prompt_ends_with_returned_prompt_ending_action():
+    prompt = Prompt([1, 2, 3])
+    ending_action = PromptEndingAction("abort", lambda pd: setattr(pd, "obj", "post-processed"))
+    prompt.mod.on_hotkey("ctrl-a").run("end", Transform(lambda pd: [ending_action]))
+    prompt.mod.automate("ctrl-a")
+    result = prompt.run()
+    assert (result.end_status, result.obj) == ("abort", "post-processed")
+
+
+def test_repeater_adds_endpoints_in_every_prompt():
+    class IdleRepeater(Repeater):
+        def create_automating_thread(self, prompt_data, port):
+            return threading.Thread(target=lambda: None)
+
+    repeater = IdleRepeater(ServerCall(lambda pd: None, command_type="execute-silent"))
+    for prompt_data in (PromptData([1]), PromptData([2])):
+        prompt_data.set_state(PromptState(), "ctrl-r")
+        repeater(prompt_data, "1")
+        assert len(prompt_data.server.endpoints) == 1
+        assert prompt_data.server.remove_endpoints(repeater) == 1
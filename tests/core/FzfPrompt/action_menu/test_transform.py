@@ -2,6 +2,7 @@ from fzf_primitives import LoggingSetup, Prompt, PromptData
 from fzf_primitives.config import Config
 from fzf_primitives.core.FzfPrompt import Action, Transform
 from fzf_primitives.core.FzfPrompt.previewer import Preview
+from fzf_primitives.core.FzfPrompt.server import PromptState
 from fzf_primitives.core.monitoring import INTERNAL_LOG_DIR
 
 logging_setup = LoggingSetup(INTERNAL_LOG_DIR / "test_transform")
@@ -77,5 +78,34 @@ def test_transform_with_functions_in_actions_builder():
     assert result.selections == [1, 2, 3]
 
 
+def test_repeated_transform_reuses_endpoints():
+    def action_function(prompt_data: PromptData): ...
+
+    prompt_data = PromptData([1, 2, 3])
+    transform = Transform(lambda pd: [*TEST_PREVIEW.preview_change_binding.actions, action_function])
+    with prompt_data.using_state(PromptState("", 0, 0, [0]), "ctrl-n"):
+        action_strings = {transform.function(prompt_data) for _ in range(3)}
+        assert len(action_strings) == 1, "Same endpoints should be used for the same returned actions"
+        endpoints_count = len(prompt_data.server.endpoints)
+        transform.function(prompt_data)
+    assert len(prompt_data.server.endpoints) == endpoints_count
+    with prompt_data.using_state(PromptState("", 0, 0, [0]), "ctrl-m"):
+        assert transform.function(prompt_data) not in action_strings, "Endpoints are registered per trigger"
+
+
+def test_transform_run_in_more_prompts_registers_endpoints_in_each():
+    def action_function(prompt_data: PromptData): ...
+
+    transform = Transform(lambda pd: [action_function])
+    first, second = PromptData([1, 2, 3]), PromptData([1, 2, 3])
+    for prompt_data in (first, second, first):
+        with prompt_data.using_state(PromptState("", 0, 0, [0]), "ctrl-n"):
+            action_string = transform.function(prompt_data)
+        endpoint_id = next(iter(prompt_data.server.endpoints))
+        assert endpoint_id in action_string, "Action string should call the endpoint of the prompt's own server"
+    assert len(first.server.endpoints) == len(second.server.endpoints) == 1
+    assert first.server.endpoints.keys() != second.server.endpoints.keys()
+
+
 if __name__ == "__main__":
     get_prompt_with_transform_with_additional_parameters_in_actions_builder().run()
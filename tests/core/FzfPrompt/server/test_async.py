@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt.server import ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def run_server_with(*server_calls: ServerCall) -> PromptData:
+    prompt_data = PromptData([1, 2, 3])
+    for server_call in server_calls:
+        prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    return prompt_data
+
+
+def test_async_calls_are_awaited_concurrently():
+    async def slow_echo(prompt_data: PromptData, word: str):
+        await asyncio.sleep(0.3)
+        return f"{prompt_data.query} {word}"
+
+    server_call = ServerCall(slow_echo)
+    prompt_data = run_server_with(server_call)
+    address = prompt_data.server.address
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(10) as executor:
+            responses = list(
+                executor.map(
+                    lambda i: make_server_call(address, server_call.id, PROMPT_STATE | {"query": "async"}, {"word": i}),
+                    map(str, range(10)),
+                )
+            )
+        assert time.perf_counter() - start < 2, "Async calls should wait for each other only on the event loop"
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert responses == [f"async {i}" for i in range(10)]
+
+
+def test_async_call_is_cancelled_after_deadline():
+    cancelled = threading.Event()
+
+    async def hanging(prompt_data: PromptData):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "late"
+
+    server_call = ServerCall(hanging, deadline=0.1, fallback_response="Loading…")
+    prompt_data = run_server_with(server_call)
+    try:
+        assert make_server_call(prompt_data.server.address, server_call.id, PROMPT_STATE, {}) == "Loading…"
+        assert cancelled.wait(5)
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert prompt_data.metrics.get(server_call.id, "focus").timeouts == 1
+
+
+def test_async_calls_are_cancelled_when_prompt_ends():
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    async def hanging(prompt_data: PromptData):
+        started.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    server_call = ServerCall(hanging)
+    prompt_data = run_server_with(server_call)
+    with ThreadPoolExecutor() as executor:
+        executor.submit(make_server_call, prompt_data.server.address, server_call.id, PROMPT_STATE, {})
+        assert started.wait(5)
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert cancelled.wait(5)
+
+
+def test_async_preview():
+    async def preview(prompt_data: PromptData):
+        await asyncio.sleep(0.01)
+        return f"async preview of {prompt_data.current}"
+
+    prompt = Prompt([1, 2, 3])
+    prompt.mod.preview().custom("async", preview)
+    prompt.mod.automate(Config.default_accept_hotkey)
+    prompt.run()
+    assert prompt.current_preview == "async preview of 1"
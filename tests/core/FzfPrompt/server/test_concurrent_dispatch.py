@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+
+def make_prompt_state(query: str) -> dict:
+    return {"query": query, "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def test_concurrent_dispatch_with_request_state_snapshots():
+    slow_call_started = threading.Event()
+    release_slow_call = threading.Event()
+
+    def slow(prompt_data: PromptData):
+        slow_call_started.set()
+        release_slow_call.wait(5)
+        return prompt_data.query
+
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.max_workers = 4
+    slow_call = ServerCall(slow)
+    fast_call = ServerCall(lambda pd: pd.query)
+    prompt_data.server.add_endpoint(slow_call, "focus")
+    prompt_data.server.add_endpoint(fast_call, "change")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    address = prompt_data.server.address
+    try:
+        with ThreadPoolExecutor() as executor:
+            slow_response = executor.submit(make_server_call, address, slow_call.id, make_prompt_state("slow"), {})
+            assert slow_call_started.wait(5)
+            assert make_server_call(address, fast_call.id, make_prompt_state("fast"), {}) == "fast"
+            assert not slow_response.done(), "Slow call should still be running"
+            assert prompt_data.query == "fast", "Latest state should be state of the last request"
+            release_slow_call.set()
+            assert slow_response.result(5) == "slow", "Slow call should see state of its own request"
+    finally:
+        release_slow_call.set()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+def test_serial_endpoints_keep_order_of_arrival():
+    resolved: list[str] = []
+
+    def record(prompt_data: PromptData):
+        time.sleep(0.05 if prompt_data.query == "first" else 0)
+        resolved.append(prompt_data.query)
+
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.max_workers = 4
+    serial_call = ServerCall(record, serial=True)
+    prompt_data.server.add_endpoint(serial_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    address = prompt_data.server.address
+    try:
+        with ThreadPoolExecutor() as executor:
+            first = executor.submit(make_server_call, address, serial_call.id, make_prompt_state("first"), {})
+            time.sleep(0.01)
+            second = executor.submit(make_server_call, address, serial_call.id, make_prompt_state("second"), {})
+            first.result(5), second.result(5)
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert resolved == ["first", "second"]
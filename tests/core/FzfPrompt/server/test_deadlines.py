@@ -0,0 +1,139 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fzf_primitives import PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt.server import ServerCall
+from fzf_primitives.core.FzfPrompt.server.server import DeadlinePool
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def run_server_with(*server_calls: ServerCall, default_deadline: float | None = None) -> PromptData:
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.default_deadline = default_deadline
+    for server_call in server_calls:
+        prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    return prompt_data
+
+
+def test_fallback_response_after_deadline():
+    release = threading.Event()
+    hanging_call = ServerCall(lambda pd: release.wait(5) and "late", deadline=0.1, fallback_response="Loading…")
+    fast_call = ServerCall(lambda pd: "fast")
+    prompt_data = run_server_with(hanging_call, fast_call)
+    address = prompt_data.server.address
+    try:
+        start = time.perf_counter()
+        assert make_server_call(address, hanging_call.id, PROMPT_STATE, {}) == "Loading…"
+        assert time.perf_counter() - start < 1
+        assert make_server_call(address, fast_call.id, PROMPT_STATE, {}) == "fast", "Server shouldn't stay blocked"
+    finally:
+        release.set()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert prompt_data.server.timed_out_requests == 1
+    assert prompt_data.metrics.get(hanging_call.id, "focus").timeouts == 1
+
+
+def test_late_response_is_cached_for_the_same_state():
+    calls: list[int] = []
+    finished = threading.Event()
+
+    def slow_preview(prompt_data: PromptData):
+        calls.append(prompt_data.current_index)
+        time.sleep(0.3)
+        finished.set()
+        return f"preview of {prompt_data.current_index}"
+
+    server_call = ServerCall(slow_preview, deadline=0.05, fallback_response="Loading…", cache_late_response=True)
+    prompt_data = run_server_with(server_call)
+    address = prompt_data.server.address
+    try:
+        assert make_server_call(address, server_call.id, PROMPT_STATE, {}) == "Loading…"
+        assert finished.wait(5)
+        time.sleep(0.05)  # late response is cached by the thread that finished
+        assert make_server_call(address, server_call.id, PROMPT_STATE, {}) == "preview of 0"
+        assert calls == [0], "Cached late response should be used instead of calling the function again"
+        other_state = PROMPT_STATE | {"current_index": 1}
+        assert make_server_call(address, server_call.id, other_state, {}) == "Loading…"
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+def test_prompt_wide_deadline():
+    def slow(prompt_data: PromptData):
+        time.sleep(0.3)
+        return "done"
+
+    with_default_deadline = ServerCall(slow, fallback_response="bell")
+    opted_out = ServerCall(slow, deadline=math.inf)
+    prompt_data = run_server_with(with_default_deadline, opted_out, default_deadline=0.05)
+    address = prompt_data.server.address
+    try:
+        assert make_server_call(address, with_default_deadline.id, PROMPT_STATE, {}) == "bell"
+        assert make_server_call(address, opted_out.id, PROMPT_STATE, {}) == "done"
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+def test_functions_left_running_past_deadline_are_bounded(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(Config, "server_deadline_workers", 2)
+    monkeypatch.setattr(DeadlinePool, "_executor", None)
+    release = threading.Event()
+    started = []
+
+    def hang(prompt_data: PromptData):
+        started.append(prompt_data.query)
+        release.wait(5)
+
+    hanging_call = ServerCall(hang, deadline=0.05, fallback_response="bell")
+    prompt_data = run_server_with(hanging_call)
+    address = prompt_data.server.address
+    try:
+        for query in "abcde":
+            assert make_server_call(address, hanging_call.id, PROMPT_STATE | {"query": query}, {}) == "bell"
+        assert len(DeadlinePool.get()._threads) == 2  # noqa: SLF001
+        assert started == ["a", "b"], "Calls queued until after their deadline shouldn't run"
+    finally:
+        release.set()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert prompt_data.server.timed_out_requests == 5
+
+
+def test_serial_call_waits_for_previous_one_past_its_deadline():
+    running = []
+    overlapped = threading.Event()
+
+    def slow(prompt_data: PromptData):
+        if running:
+            overlapped.set()
+        running.append(prompt_data.query)
+        time.sleep(0.3)
+        running.remove(prompt_data.query)
+        return prompt_data.query
+
+    serial_call = ServerCall(slow, serial=True, deadline=0.05, fallback_response="bell")
+    prompt_data = run_server_with(serial_call)
+    address = prompt_data.server.address
+    try:
+        with ThreadPoolExecutor() as executor:
+            first = executor.submit(make_server_call, address, serial_call.id, PROMPT_STATE | {"query": "a"}, {})
+            assert first.result(5) == "bell", "Fallback response isn't held up by waiting for the function"
+            second = executor.submit(make_server_call, address, serial_call.id, PROMPT_STATE | {"query": "b"}, {})
+            second.result(5)
+        time.sleep(0.4)
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert not overlapped.is_set(), "Serial calls shouldn't run at the same time"
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from fzf_primitives import Preview, PromptData
+from fzf_primitives.actions import ReloadEntries
+from fzf_primitives.core.FzfPrompt import Transform
+from fzf_primitives.core.FzfPrompt.server import Memoize, PromptState, Request, ServerCall
+
+
+def resolve(prompt_data: PromptData, server_call: ServerCall, state: PromptState, **kwargs: str):
+    endpoint = prompt_data.server.endpoints[server_call.id]
+    return endpoint.run(prompt_data, Request(server_call.id, state, kwargs))
+
+
+def counting_calls(calls: list):
+    def describe_current(prompt_data: PromptData, FZF_PREVIEW_COLUMNS: str = "") -> str:
+        calls.append(prompt_data.current_index)
+        return f"{prompt_data.current} {FZF_PREVIEW_COLUMNS}"
+
+    return describe_current
+
+
+def test_response_is_reused_for_the_same_state_fields_and_arguments():
+    calls = []
+    prompt_data = PromptData(["a", "b", "c"])
+    server_call = ServerCall(counting_calls(calls), memoize=Memoize("current_index"))
+    prompt_data.server.add_endpoint(server_call, "focus")
+
+    responses = [
+        resolve(prompt_data, server_call, PromptState("q", index, 0, [index]), FZF_PREVIEW_COLUMNS=columns)
+        for index, columns in ((0, "80"), (1, "80"), (0, "80"), (1, "80"), (0, "100"))
+    ]
+    assert responses == ["a 80", "b 80", "a 80", "b 80", "a 100"]
+    assert calls == [0, 1, 0]
+    assert (prompt_data.server.response_cache_hits, prompt_data.server.response_cache_misses) == (2, 3)
+
+
+def test_least_recently_used_and_expired_responses_are_dropped():
+    calls = []
+    prompt_data = PromptData(["a", "b", "c"])
+    server_call = ServerCall(counting_calls(calls), memoize=Memoize("current_index", max_size=2, ttl=0.2))
+    prompt_data.server.add_endpoint(server_call, "focus")
+
+    for index in (0, 1, 0, 2, 0, 1):
+        resolve(prompt_data, server_call, PromptState("q", index, 0, [index]))
+    assert calls == [0, 1, 2, 1], "Entry 1 should have been evicted by entry 2"
+    time.sleep(0.3)
+    resolve(prompt_data, server_call, PromptState("q", 1, 0, [1]))
+    assert calls == [0, 1, 2, 1, 1]
+
+
+def test_reloading_entries_invalidates_responses():
+    calls = []
+    prompt_data = PromptData(["a", "b", "c"])
+    server_call = ServerCall(counting_calls(calls), memoize=Memoize("current_index"))
+    reload_entries = ReloadEntries(lambda pd: ["x", "y", "z"])
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.add_endpoint(reload_entries, "ctrl-r")
+
+    assert resolve(prompt_data, server_call, PromptState("q", 0, 0, [0])) == "a "
+    resolve(prompt_data, reload_entries, PromptState("q", 0, 0, [0]))
+    assert resolve(prompt_data, server_call, PromptState("q", 0, 0, [0])) == "x "
+    assert calls == [0, 0]
+
+
+def test_transform_reuses_built_actions():
+    built_for = []
+
+    def build_actions(prompt_data: PromptData):
+        built_for.append(prompt_data.query)
+        return [ServerCall(lambda pd: None, command_type="execute-silent")]
+
+    prompt_data = PromptData(["a", "b", "c"])
+    transform = Transform(build_actions, memoize=Memoize("query"))
+    prompt_data.server.add_endpoint(transform, "change")
+    transform_strings = [
+        resolve(prompt_data, transform, PromptState(query, 0, 0, [0])) for query in ("a", "b", "a", "b")
+    ]
+    assert built_for == ["a", "b"]
+    assert transform_strings[:2] == transform_strings[2:]
+    assert len(prompt_data.server.endpoints) == 3
+
+
+def test_memoized_preview_keeps_storing_output():
+    calls = []
+    preview = Preview("memoized", output_generator=counting_calls(calls), memoize=Memoize("current_index"))
+    prompt_data = PromptData(["a", "b", "c"])
+    server_call = preview.change_preview_output
+    prompt_data.server.add_endpoint(server_call, "focus")
+
+    for index in (0, 1, 0):
+        resolve(prompt_data, server_call, PromptState("q", index, 0, [index]))
+    assert calls == [0, 1]
+    assert preview.output == "a "
+
+
+def test_memoized_state_fields_have_to_be_sent():
+    with pytest.raises(ValueError):
+        ServerCall(lambda pd: None, state_fields=["query"], memoize=Memoize("current_index"))
+    with pytest.raises(ValueError):
+        Memoize("unknown")  # type: ignore
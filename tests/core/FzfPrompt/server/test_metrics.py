@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt.server import EndpointMetrics, ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def test_latency_percentiles():
+    metrics = EndpointMetrics("endpoint", "focus")
+    for _ in range(90):
+        metrics.record(0.001, 100, 10)
+    for _ in range(10):
+        metrics.record(0.5, 100, 10)
+    assert metrics.percentile(50) == pytest.approx(0.001, rel=0.2)
+    assert metrics.percentile(95) == pytest.approx(0.5, rel=0.2)
+    assert metrics.percentile(99) == pytest.approx(0.5, rel=0.2)
+    assert metrics.to_dict()["latency_max"] == 500
+    assert EndpointMetrics("endpoint", "focus").percentile(50) is None
+
+
+def test_recording_server_calls():
+    def fail(prompt_data: PromptData):
+        raise RuntimeError("Expected error")
+
+    prompt_data = PromptData([1, 2, 3])
+    echo_call = ServerCall(lambda pd: "response")
+    failing_call = ServerCall(fail)
+    prompt_data.server.add_endpoint(echo_call, "focus")
+    prompt_data.server.add_endpoint(failing_call, "ctrl-f")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    try:
+        for _ in range(3):
+            make_server_call(prompt_data.server.address, echo_call.id, PROMPT_STATE, {})
+        make_server_call(prompt_data.server.address, failing_call.id, PROMPT_STATE, {})
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    echo_metrics = prompt_data.metrics.get(echo_call.id, "focus")
+    assert (echo_metrics.requests, echo_metrics.errors) == (3, 0)
+    assert echo_metrics.response_bytes == 3 * (10 + len("response"))
+    assert echo_metrics.request_bytes > 0
+    failing_metrics = prompt_data.metrics.get(failing_call.id, "ctrl-f")
+    assert (failing_metrics.requests, failing_metrics.errors) == (1, 1)
+
+
+def test_dump_includes_queue_waits(tmp_path: Path):
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.add_endpoint(ServerCall(lambda pd: None, priority="background"), "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    try:
+        make_server_call(prompt_data.server.address, next(iter(prompt_data.server.endpoints)), PROMPT_STATE, {})
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    prompt_data.metrics.dump(dump := tmp_path / "metrics.json")
+    dumped = json.loads(dump.read_text())
+    assert [m["requests"] for m in dumped["endpoints"]] == [1]
+    queue_waits = {m["priority"]: m for m in dumped["queue_waits"]}
+    assert (queue_waits["background"]["requests"], queue_waits["normal"]["requests"]) == (1, 0)
+    assert queue_waits["background"]["wait_max"] is not None
+
+
+def test_metrics_in_result_and_dump(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(Config, "metrics_dir", tmp_path)
+    prompt = Prompt([1, 2, 3])
+    prompt.mod.preview().server_metrics()
+    prompt.mod.automate(Config.default_accept_hotkey)
+    result = prompt.run()
+    assert any(m["trigger"] == "start" for m in result.metrics.to_dict())
+    assert "requests" in prompt.current_preview
+    (dump,) = tmp_path.iterdir()
+    assert json.loads(dump.read_text())["endpoints"] == result.metrics.to_dict()
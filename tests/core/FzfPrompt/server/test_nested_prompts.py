@@ -0,0 +1,97 @@
+import selectors
+import time
+
+import pytest
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.core.FzfPrompt import ServerCall
+
+
+def make_nested_prompt(obj: list, *server_calls: ServerCall, post_processor=None) -> Prompt:
+    """Makes server calls of its own and quits once it has started"""
+    prompt = Prompt(["x", "y"], obj=obj)
+    prompt.mod.on_event("start").run(
+        "record server", ServerCall(lambda pd: pd.obj.append(pd.server)), *server_calls
+    ).end_prompt("quit", "quit", post_processor)
+    return prompt
+
+
+def run_with_nested(server_call_function, command_type="execute") -> Prompt:
+    prompt = Prompt(["a", "b"], obj=[])
+    prompt.mod.on_event("start").run("nested", ServerCall(server_call_function, command_type=command_type)).quit()
+    prompt.run()
+    return prompt
+
+
+def test_nested_prompts_are_hosted_by_outermost_server():
+    servers = []
+
+    def run_grandchild(prompt_data: PromptData):
+        make_nested_prompt(servers).run()
+
+    def run_child(prompt_data: PromptData):
+        make_nested_prompt(servers, ServerCall(run_grandchild, command_type="execute")).run()
+
+    prompt = run_with_nested(run_child)
+    server = prompt._prompt_data.server  # noqa: SLF001
+    child_server, grandchild_server = servers
+    assert child_server.listener is server and grandchild_server.listener is server
+    assert not child_server.is_alive() and not grandchild_server.is_alive(), "Nested prompts shouldn't start threads"
+    assert child_server.namespace != grandchild_server.namespace
+    assert server.servers == {}, "Namespaces should be unregistered when nested prompts end"
+
+
+def test_unhandled_exception_of_nested_prompt_ends_outer_prompt():
+    def fail(prompt_data: PromptData):
+        raise LookupError("quitting app")
+
+    with pytest.raises(LookupError, match="quitting app"):
+        run_with_nested(lambda pd: make_nested_prompt([], post_processor=fail).run(), command_type="execute-silent")
+
+
+def test_handled_exception_of_nested_prompt_doesnt_end_outer_prompt():
+    def run_child(prompt_data: PromptData):
+        try:
+            make_nested_prompt([], post_processor=lambda pd: 1 / 0).run()
+        except ZeroDivisionError:
+            prompt_data.obj.append("handled")
+
+    assert run_with_nested(run_child).obj == ["handled"]
+
+
+def test_nested_prompt_run_from_async_server_call():
+    async def run_child(prompt_data: PromptData):
+        child = Prompt(["x", "y"], obj=[])
+
+        async def record_query(child_data: PromptData):
+            child_data.obj.append(child_data.query)
+
+        child.mod.options.query("nested")
+        child.mod.on_event("start").run_function("record query", record_query).quit()
+        prompt_data.obj.extend((await child.run_async()).obj)
+
+    assert run_with_nested(run_child).obj == ["nested"]
+
+
+def test_listener_hosting_nested_server_stays_blocked_after_close(monkeypatch: pytest.MonkeyPatch):
+    select_calls = []
+
+    class CountingSelector(selectors.DefaultSelector):
+        def select(self, timeout=None):
+            select_calls.append(timeout)
+            return super().select(timeout)
+
+    monkeypatch.setattr(selectors, "DefaultSelector", CountingSelector)
+    parent, child = PromptData([1]), PromptData([1])
+    parent.server.open()
+    child.server.parent = parent.server
+    child.server.open()
+    assert child.server.listener is parent.server
+    while not select_calls:  # listener is waiting for requests
+        time.sleep(0.01)
+    parent.server.should_close.set()  # e.g. nested prompt outlived the server call of its parent
+    time.sleep(0.2)
+    assert len(select_calls) <= 3, "Listener shouldn't spin while it waits for hosted servers"
+    child.server.close()
+    parent.server.close()
+    assert not parent.server.is_alive()
@@ -1,5 +1,13 @@
+import time
+
 from fzf_primitives import Prompt
-from fzf_primitives.core.FzfPrompt.server import CommandOutput, FzfPlaceholder, VarOutput
+from fzf_primitives.core.FzfPrompt.server import (
+    CachedCommandOutput,
+    CommandOutput,
+    FzfPlaceholder,
+    ServerCall,
+    VarOutput,
+)
 
 
 def test_command_output():
@@ -12,6 +20,37 @@ def test_command_output():
     assert result.obj == "test"
 
 
+def test_cached_command_output(tmp_path):
+    counter = tmp_path / "evaluations"
+    command_output = CachedCommandOutput(f"echo x >> {counter}; wc -l < {counter}", ttl=60)
+
+    def function_with_cached_command_output(prompt_data, evaluations=command_output):
+        prompt_data.obj.append(evaluations)
+
+    server_call = ServerCall(function_with_cached_command_output, command_type="execute-silent")
+    assert str(command_output) not in server_call.action_value, "fzf shouldn't run the command"
+    prompt = Prompt(obj=[])
+    prompt.mod.on_event().START.run("three calls", server_call, *(server_call.copy() for _ in range(2))).accept()
+    assert prompt.run().obj == ["1", "1", "1"]
+
+
+def test_expired_cached_command_output_is_evaluated_in_background(tmp_path):
+    counter = tmp_path / "evaluations"
+    command_output = CachedCommandOutput(f"sleep 0.1; echo x >> {counter}; wc -l < {counter}", ttl=0.2)
+    assert command_output.get() == "1"
+    time.sleep(0.3)
+    assert command_output.get() == "1", "Expired output should be used while it's evaluated again"
+    time.sleep(0.3)
+    assert command_output.get() == "2"
+
+
+def test_cached_command_output_key():
+    keys = iter(["a", "b", "a"])
+    command_output = CachedCommandOutput("date +%N", ttl=60, key=lambda: next(keys))
+    first_a, first_b, second_a = command_output.get(), command_output.get(), command_output.get()
+    assert first_a == second_a != first_b
+
+
 def test_var_output():
     def function_with_var_output(prompt_data, action=VarOutput.preset.FZF_ACTION):
         prompt_data.obj.append(action)
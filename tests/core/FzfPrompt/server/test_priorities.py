@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import PriorityExecutor, ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def test_queued_work_is_started_by_priority():
+    executor = PriorityExecutor(1, thread_name_prefix="test")
+    release = threading.Event()
+    started: list[str] = []
+    executor.submit(release.wait, 5)
+    futures = [
+        executor.submit(started.append, priority, priority=priority)
+        for priority in ("background", "normal", "interactive", "background", "interactive")
+    ]
+    release.set()
+    for future in futures:
+        future.result(5)
+    executor.shutdown()
+    assert started == ["interactive", "interactive", "normal", "background", "background"]
+
+
+def run_server_with(*server_calls: ServerCall, max_workers: int = 1) -> PromptData:
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.max_workers = max_workers
+    for server_call in server_calls:
+        prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    return prompt_data
+
+
+def test_queued_interactive_call_goes_ahead_of_background_one():
+    release = threading.Event()
+    resolved: list[str] = []
+    blocking_call = ServerCall(lambda pd: release.wait(5) and resolved.append("blocking"), serial=True)
+    reload_call = ServerCall(lambda pd: resolved.append("reload"), serial=True, priority="background")
+    accept_call = ServerCall(lambda pd: resolved.append("accept"), serial=True, priority="interactive")
+    prompt_data = run_server_with(blocking_call, reload_call, accept_call)
+    address = prompt_data.server.address
+    try:
+        with ThreadPoolExecutor() as executor:
+            blocking = executor.submit(make_server_call, address, blocking_call.id, PROMPT_STATE, {})
+            time.sleep(0.1)
+            reloading = executor.submit(make_server_call, address, reload_call.id, PROMPT_STATE, {})
+            time.sleep(0.1)
+            accepting = executor.submit(make_server_call, address, accept_call.id, PROMPT_STATE, {})
+            time.sleep(0.1)
+            release.set()
+            for future in (blocking, reloading, accepting):
+                future.result(5)
+    finally:
+        release.set()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert resolved == ["blocking", "accept", "reload"]
+    queue_waits = {m["priority"]: m for m in prompt_data.metrics.queue_waits_to_dict()}
+    assert queue_waits["interactive"]["requests"] == queue_waits["background"]["requests"] == 1
+    assert queue_waits["normal"]["requests"] == 1
+
+
+def test_serial_calls_of_different_priorities_never_overlap():
+    running: list[str] = []
+    overlapped = threading.Event()
+
+    def replacing_entries(name: str):
+        def replace_entries(prompt_data: PromptData):
+            if running:
+                overlapped.set()
+            running.append(name)
+            time.sleep(0.01)
+            running.remove(name)
+
+        return replace_entries
+
+    reload_call = ServerCall(replacing_entries("reload"), serial=True, priority="background")
+    transform_call = ServerCall(replacing_entries("transform"), serial=True)
+    prompt_data = run_server_with(reload_call, transform_call, max_workers=4)
+    address = prompt_data.server.address
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            futures = [
+                executor.submit(make_server_call, address, server_call.id, PROMPT_STATE, {})
+                for _ in range(20)
+                for server_call in (reload_call, transform_call)
+            ]
+            for future in futures:
+                future.result(5)
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert not overlapped.is_set(), "Serial background call ran at the same time as serial normal one"
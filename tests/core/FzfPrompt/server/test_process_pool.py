@@ -0,0 +1,59 @@
+import os
+import threading
+
+import pytest
+
+from fzf_primitives import PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt import Preview
+from fzf_primitives.core.FzfPrompt.previewer.actions import PreviewServerCall
+from fzf_primitives.core.FzfPrompt.server import ProcessPool, PromptSnapshot, ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "q", "current_index": 1, "selected_count": 2, "target_indices": [0, 2]}
+
+
+def describe(snapshot: PromptSnapshot, suffix: str = "$FZF_PROMPT") -> str:
+    return f"{os.getpid()} {snapshot.query} {snapshot.current} {snapshot.selections} {snapshot.obj} {suffix}"
+
+
+@pytest.fixture(autouse=True)
+def process_pool(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(Config, "process_pool_max_workers", 1)
+    ProcessPool.shutdown()
+    yield
+    ProcessPool.shutdown()
+
+
+def call(prompt_data: PromptData, server_call: ServerCall) -> str:
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    try:
+        return make_server_call(prompt_data.server.address, server_call.id, PROMPT_STATE, {"suffix": "!"})
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+def test_function_gets_snapshot_in_warm_worker():
+    responses = [call(PromptData(["a", "b", "c"], obj=[1]), ServerCall(describe, process_pool=True)) for _ in range(2)]
+    pids = {response.split()[0] for response in responses}
+    assert len(pids) == 1 and str(os.getpid()) not in pids, "Calls should reuse the same worker process"
+    assert responses[0].partition(" ")[2] == "q b ['a', 'c'] [1] !"
+
+
+def test_unpicklable_obj_is_left_out():
+    response = call(PromptData(["a", "b", "c"], obj=threading.Lock()), ServerCall(describe, process_pool=True))
+    assert response.split()[-2:] == ["None", "!"]
+
+
+def test_preview_output_is_stored():
+    preview = Preview("in process", output_generator=describe)
+    call(PromptData(["a", "b", "c"]), PreviewServerCall(describe, preview, process_pool=True))
+    assert preview.output.endswith("q b ['a', 'c'] None !")
+
+
+def test_function_has_to_be_picklable():
+    with pytest.raises(ValueError):
+        ServerCall(lambda snapshot: None, process_pool=True)
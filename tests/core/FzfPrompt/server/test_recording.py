@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt.server import (
+    RecordedRequest,
+    RequestRecorder,
+    RequestReplayer,
+    ServerCall,
+    read_recording,
+)
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+
+def echo(prompt_data: PromptData, word: str):
+    prompt_data.obj.append((prompt_data.query, word))
+    return f"{prompt_data.query} {word}"
+
+
+def test_recorded_requests_are_replayed(tmp_path: Path):
+    recording_path = tmp_path / "requests.jsonl.gz"
+    prompt_data = PromptData([1, 2, 3], obj=[])
+    server_call = ServerCall(echo)
+    prompt_data.server.add_endpoint(server_call, "change")
+    prompt_data.server.recorder = RequestRecorder(recording_path)
+    prompt_data.server.open()
+    try:
+        for query in ("a", "ab", "abc"):
+            make_server_call(prompt_data.server.address, server_call.id, {"query": query}, {"word": "!"})
+        make_server_call(prompt_data.server.address, "missing#1", {}, {})
+    finally:
+        prompt_data.server.close()
+        prompt_data.server.recorder.close()
+    recorded_requests = read_recording(recording_path)
+    assert [r.prompt_state for r in recorded_requests] == [{"query": "a"}, {"query": "ab"}, {"query": "abc"}]
+    assert all(r.trigger == "change" and r.endpoint_name == "f:echo" for r in recorded_requests)
+
+    replaying_prompt_data = PromptData([1, 2, 3], obj=[])
+    replayed_call = ServerCall(echo)
+    replaying_prompt_data.server.add_endpoint(replayed_call, "change")
+    report = RequestReplayer(replaying_prompt_data, speed=None).replay(
+        [*recorded_requests, RecordedRequest(0, "f:other#1", "change", {}, {})]
+    )
+    assert replaying_prompt_data.obj == prompt_data.obj
+    assert (report.requests, report.errors) == (4, 1)
+    assert replaying_prompt_data.metrics.get(replayed_call.id, "change").requests == 3
+    assert report.to_dict()["throughput"] > 0
+
+
+def test_replay_timing():
+    recorded_requests = [RecordedRequest(t, "f:echo#1", "change", {"query": ""}, {"word": ""}) for t in (0, 0.3)]
+
+    def replay(speed: float | None) -> float:
+        prompt_data = PromptData(obj=[])
+        prompt_data.server.add_endpoint(ServerCall(echo), "change")
+        return RequestReplayer(prompt_data, speed=speed).replay(recorded_requests).duration
+
+    assert replay(1) >= 0.3
+    assert replay(3) < 0.3
+    assert replay(None) < 0.3
+
+
+def test_replaying_prompt(tmp_path: Path):
+    def build_prompt() -> Prompt:
+        prompt = Prompt([1, 2, 3], obj=[])
+        prompt.mod.on_event("start").run_function("record", lambda pd: pd.obj.append(pd.current), silent=True)
+        return prompt
+
+    recording_path = tmp_path / "requests.jsonl"
+    prompt = build_prompt()
+    prompt.record_requests(recording_path)
+    prompt.mod.automate(Config.default_accept_hotkey)
+    assert prompt.run().obj == [1]
+
+    replaying_prompt = build_prompt()
+    report = replaying_prompt.replay(read_recording(recording_path), speed=None)
+    assert replaying_prompt.obj == [1]
+    assert report.errors == 2, "Endpoints of automator (its transform and accept) aren't in the replaying prompt"
+    assert report.requests == len(read_recording(recording_path))
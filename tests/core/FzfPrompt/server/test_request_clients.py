@@ -0,0 +1,31 @@
+import json
+import subprocess
+
+import pytest
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import REQUEST_CLIENTS, RequestClient, ServerCall
+
+
+@pytest.mark.parametrize("request_client", ["python", "shell"])
+def test_request_clients(request_client: RequestClient):
+    def echo_request(prompt_data: PromptData, kwarg: str):
+        return json.dumps([prompt_data.query, prompt_data.current_index, prompt_data.selected_indices, kwarg])
+
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.request_client = request_client
+    server_call = ServerCall(echo_request)
+    prompt_data.server.add_endpoint(server_call, "ctrl-a")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    try:
+        query = "quotes '\"\\ and ünicode"
+        kwarg = "multi\nline\twith $dollar and \x1b[0m escape"
+        arguments = [prompt_data.server.address, server_call.id, "qnst", query, "1", "2", "0 2", "kwarg", kwarg]
+        response = subprocess.run(
+            [REQUEST_CLIENTS[request_client], *arguments], capture_output=True, text=True, check=True
+        ).stdout
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert json.loads(response) == [query, 1, [0, 2], kwarg]
@@ -1,13 +1,20 @@
 import functools
 import os
 import re
+import shlex
 from pathlib import Path
 
 import pytest
 
 from fzf_primitives import Prompt, PromptData
 from fzf_primitives.core.FzfPrompt import Binding
-from fzf_primitives.core.FzfPrompt.server import CommandOutput, ReusedServerCall, ServerCall, ServerEndpoint
+from fzf_primitives.core.FzfPrompt.server import (
+    CommandOutput,
+    FzfPlaceholder,
+    ReusedServerCall,
+    ServerCall,
+    ServerEndpoint,
+)
 from fzf_primitives.core.FzfPrompt.server.actions import PromptEndingAction
 
 CORRECT_COMMAND_PATH = Path(__file__).parent.joinpath("test_request/correct_command.txt")
@@ -54,6 +61,28 @@ def test_handling_partial_functions():
     assert [p.name for p in params] == ["p1"]
 
 
+def test_command_templates_are_shared():
+    def create_function(default: str):
+        def func(prompt_data, p1, p2=CommandOutput(default)): ...
+
+        return func
+
+    def without_id(server_call: ServerCall) -> str:
+        return server_call.command.replace(shlex.quote(server_call.id), "")
+
+    closure_commands = {without_id(ServerCall(create_function("echo 1"), "name")) for _ in range(3)}
+    assert len(closure_commands) == 1, "Closures with the same code and defaults should share the template"
+    assert without_id(ServerCall(create_function("echo 2"), "name")) not in closure_commands
+    func = create_function("echo 1")
+    assert without_id(ServerCall(functools.partial(func, p1="arg1"), "name")) == without_id(
+        ServerCall(functools.partial(func, p1="other arg1"), "name")
+    )
+    assert " p1 " not in ServerCall(functools.partial(func, p1="arg1")).command
+    assert " p2 " not in ServerCall(functools.partial(func, p2="arg2")).command
+    assert ServerCall(lambda pd, q=FzfPlaceholder("{q}"): None).command.endswith(" q {q}")
+    assert ServerCall(lambda pd, q=FzfPlaceholder("{n}"): None).command.endswith(" q {n}")
+
+
 def test_server_call():
     prompt = Prompt(obj=[])
     prompt_data = prompt._prompt_data  # noqa: SLF001
@@ -0,0 +1,49 @@
+import pytest
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt.server import RequestClient, ServerCall, SharedServer
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def open_shared_server_with(server_call: ServerCall) -> PromptData:
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.shared = True
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.open()
+    return prompt_data
+
+
+def test_requests_are_routed_by_namespace():
+    first_call, second_call = ServerCall(lambda pd: "first"), ServerCall(lambda pd: "second")
+    first, second = open_shared_server_with(first_call), open_shared_server_with(second_call)
+    try:
+        assert first.server.address == second.server.address
+        assert first.server.namespace != second.server.namespace
+        address = first.server.address
+        assert make_server_call(address, first_call.id, PROMPT_STATE, {}, first.server.namespace) == "first"
+        assert make_server_call(address, second_call.id, PROMPT_STATE, {}, second.server.namespace) == "second"
+        assert "KeyError" in make_server_call(address, first_call.id, PROMPT_STATE, {}, second.server.namespace)
+    finally:
+        first.server.close()
+        second.server.close()
+    assert "KeyError" in make_server_call(address, first_call.id, PROMPT_STATE, {}, first.server.namespace)
+
+
+@pytest.mark.parametrize("request_client", ["python", "shell"])
+def test_back_to_back_prompts_share_server(request_client: RequestClient):
+    addresses = set()
+    for i in range(3):
+        prompt = Prompt([1, 2, 3], obj=[], request_client=request_client, shared_server=True)
+        prompt.mod.on_event("start").run_function("record", lambda pd: pd.obj.append(pd.server.namespace))
+        prompt.mod.automate(Config.default_accept_hotkey)
+        result = prompt.run()
+        assert result.end_status == "accept"
+        assert prompt.obj == [prompt._prompt_data.server.namespace]  # noqa: SLF001
+        addresses.add(prompt._prompt_data.server.address)  # noqa: SLF001
+        assert not prompt._prompt_data.server.is_alive(), "Prompt shouldn't start its own server thread"  # noqa: SLF001
+    assert len(addresses) == 1
+    transport = "tcp" if request_client == "shell" else Config.server_transport
+    assert SharedServer.get(transport).servers == {}, "Namespaces should be unregistered when prompts end"
@@ -0,0 +1,34 @@
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fzf_primitives import Prompt
+from fzf_primitives.config import Config
+
+
+def make_timed_fzf(tmp_path: Path) -> tuple[Path, Path]:
+    """Executable running fzf that records the time fzf exited at"""
+    exit_time_path = tmp_path / "exit_time"
+    timed_fzf = tmp_path / "timed_fzf"
+    timed_fzf.write_text(
+        f"#!{sys.executable}\n"
+        "import subprocess, sys, time\n"
+        "exit_code = subprocess.run(['fzf', *sys.argv[1:]]).returncode\n"
+        f"open({str(exit_time_path)!r}, 'w').write(repr(time.time()))\n"
+        "sys.exit(exit_code)\n"
+    )
+    timed_fzf.chmod(0o755)
+    return timed_fzf, exit_time_path
+
+
+def test_time_from_fzf_exit_to_prompt_returning(tmp_path: Path):
+    timed_fzf, exit_time_path = make_timed_fzf(tmp_path)
+    delays = []
+    for _ in range(5):
+        prompt = Prompt([1, 2, 3])
+        prompt.mod.automate(Config.default_accept_hotkey)
+        result = prompt.run(executable_path=timed_fzf)
+        delays.append(time.time() - float(exit_time_path.read_text()))
+        assert result.end_status == "accept"
+    assert statistics.median(delays) < 0.02, f"Server shutdown is too slow: {delays}"
@@ -0,0 +1,53 @@
+import json
+import subprocess
+
+import pytest
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import (
+    REQUEST_CLIENTS,
+    PromptState,
+    RequestClient,
+    ServerCall,
+    StateFieldNotSent,
+    requires_state,
+)
+
+
+@requires_state("current_index")
+def current_only(prompt_data: PromptData):
+    try:
+        prompt_data.query
+    except StateFieldNotSent:
+        return json.dumps([prompt_data.current_index, "query not sent"])
+    return json.dumps([prompt_data.current_index, prompt_data.query])
+
+
+def test_command_includes_only_required_state():
+    command = ServerCall(current_only).command
+    assert " n {n}" in command
+    assert "{q}" not in command and "{+n}" not in command and "FZF_SELECT_COUNT" not in command
+    assert ServerCall(lambda pd: None, state_fields=()).command.endswith(" -")
+    with pytest.raises(ValueError):
+        ServerCall(lambda pd: None, state_fields=["unknown"])  # type: ignore
+
+
+@pytest.mark.parametrize("request_client", ["python", "shell"])
+def test_partial_state(request_client: RequestClient):
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.request_client = request_client
+    server_call = ServerCall(current_only)
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    prompt_data.set_state(PromptState("earlier query", 0, 0, [0]), "start")
+    try:
+        arguments = [prompt_data.server.address, server_call.id, "n", "2"]
+        response = subprocess.run(
+            [REQUEST_CLIENTS[request_client], *arguments], capture_output=True, text=True, check=True
+        ).stdout
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert json.loads(response) == [2, "query not sent"]
+    assert (prompt_data.current_index, prompt_data.query) == (2, "earlier query"), "Latest state keeps unsent fields"
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import (
+    STREAM,
+    _receive_response_header,
+    _send_request,
+    make_server_call,
+    stream_server_call,
+)
+
+PROMPT_STATE = {"query": "streamed", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+class RecordingOutput:
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+        self.first_chunk_received = threading.Event()
+
+    def write(self, data) -> None:
+        self.chunks.append(bytes(data))
+        self.first_chunk_received.set()
+
+    def flush(self) -> None: ...
+
+
+def run_server_with(*server_calls: ServerCall) -> PromptData:
+    prompt_data = PromptData([1, 2, 3])
+    for server_call in server_calls:
+        prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    return prompt_data
+
+
+def test_chunks_are_streamed_as_produced():
+    release_last_chunk = threading.Event()
+
+    def produce(prompt_data: PromptData):
+        yield f"{prompt_data.query} first\n"
+        release_last_chunk.wait(5)
+        yield f"{prompt_data.query} last\n".encode()
+
+    server_call = ServerCall(produce)
+    prompt_data = run_server_with(server_call)
+    address = prompt_data.server.address
+    output = RecordingOutput()
+    try:
+        with ThreadPoolExecutor() as executor:
+            streaming = executor.submit(stream_server_call, address, server_call.id, PROMPT_STATE, {}, output)
+            assert output.first_chunk_received.wait(5), "First chunk should arrive before the last one is produced"
+            release_last_chunk.set()
+            streaming.result(5)
+        assert b"".join(output.chunks) == b"streamed first\nstreamed last\n"
+        release_last_chunk.set()
+        assert make_server_call(address, server_call.id, PROMPT_STATE, {}) == "streamed first\nstreamed last\n"
+    finally:
+        release_last_chunk.set()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+def test_stream_stops_when_client_disconnects():
+    generator_closed = threading.Event()
+
+    def produce_forever(prompt_data: PromptData):
+        try:
+            while True:
+                yield "line\n" * 1000
+        finally:
+            generator_closed.set()
+
+    server_call = ServerCall(produce_forever)
+    prompt_data = run_server_with(server_call)
+    try:
+        with _send_request(prompt_data.server.address, server_call.id, PROMPT_STATE, {}) as client:
+            assert _receive_response_header(client) == (STREAM, 0)
+            assert client.recv(100)
+        assert generator_closed.wait(5)
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
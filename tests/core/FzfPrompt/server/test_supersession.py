@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fzf_primitives import Preview, PromptData
+from fzf_primitives.core.FzfPrompt.server import ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+
+def make_prompt_state(query: str) -> dict:
+    return {"query": query, "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def test_latest_request_wins():
+    first_call_started = threading.Event()
+    release_first_call = threading.Event()
+    noticed_supersession = threading.Event()
+
+    def preview(prompt_data: PromptData):
+        if prompt_data.query == "first":
+            first_call_started.set()
+            release_first_call.wait(5)
+            if prompt_data.request_superseded:
+                noticed_supersession.set()
+        return prompt_data.query
+
+    prompt_data = PromptData([1, 2, 3])
+    server_call = ServerCall(preview, supersedable=True, superseded_response="skipped")
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    address = prompt_data.server.address
+    endpoint = prompt_data.server.endpoints[server_call.id]
+    try:
+        with ThreadPoolExecutor() as executor:
+            first = executor.submit(make_server_call, address, server_call.id, make_prompt_state("first"), {})
+            assert first_call_started.wait(5)
+            second = executor.submit(make_server_call, address, server_call.id, make_prompt_state("second"), {})
+            while prompt_data.query != "second":  # latest state is set on arrival
+                time.sleep(0.001)
+            last = executor.submit(make_server_call, address, server_call.id, make_prompt_state("last"), {})
+            assert second.result(5) == "skipped", "Queued request should be answered right away when superseded"
+            release_first_call.set()
+            assert first.result(5) == "first"
+            assert last.result(5) == "last"
+        assert noticed_supersession.is_set(), "Running request should be notified about being superseded"
+        assert (endpoint.dropped_requests, endpoint.abandoned_requests) == (1, 1)
+        assert (prompt_data.server.dropped_requests, prompt_data.server.abandoned_requests) == (1, 1)
+    finally:
+        release_first_call.set()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+def test_preview_can_opt_out_of_supersession():
+    calls = []
+    first_call_started = threading.Event()
+    release_first_call = threading.Event()
+
+    def counting_preview(prompt_data: PromptData):
+        calls.append(prompt_data.query)
+        if prompt_data.query == "first":
+            first_call_started.set()
+            release_first_call.wait(5)
+        return prompt_data.query
+
+    preview = Preview("counting", output_generator=counting_preview, store_output=False, supersedable=False)
+    server_call = preview.change_preview_output
+    assert isinstance(server_call, ServerCall)
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    address = prompt_data.server.address
+    try:
+        with ThreadPoolExecutor() as executor:
+            first = executor.submit(make_server_call, address, server_call.id, make_prompt_state("first"), {})
+            assert first_call_started.wait(5)
+            second = executor.submit(make_server_call, address, server_call.id, make_prompt_state("second"), {})
+            while prompt_data.query != "second":
+                time.sleep(0.001)
+            last = executor.submit(make_server_call, address, server_call.id, make_prompt_state("last"), {})
+            release_first_call.set()
+            assert [first.result(5), second.result(5), last.result(5)] == ["first", "second", "last"]
+        assert calls == ["first", "second", "last"], "Every request should be resolved"
+        assert prompt_data.server.dropped_requests == 0
+    finally:
+        release_first_call.set()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
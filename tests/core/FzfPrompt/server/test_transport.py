@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import SOCKET_NUMBER_ENV_VAR, ServerCall, ServerTransport
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+
+@pytest.mark.parametrize("transport", ["tcp", "unix"])
+def test_transports(transport: ServerTransport):
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.transport = transport
+    server_call = ServerCall(lambda pd: pd.current)
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    prompt_state = {"query": "", "current_index": 1, "selected_count": 0, "target_indices": [1]}
+    try:
+        assert prompt_data.server.address.isdigit() == (transport == "tcp")
+        if transport == "tcp":
+            assert prompt_data.fzf_env[SOCKET_NUMBER_ENV_VAR] == prompt_data.server.address, "Kept for existing scripts"
+        else:
+            assert SOCKET_NUMBER_ENV_VAR not in prompt_data.fzf_env, "Scripts read it as a port number"
+        assert make_server_call(prompt_data.server.address, server_call.id, prompt_state, {}) == "2"
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+def test_unix_socket_cleanup():
+    prompt_data = PromptData()
+    prompt_data.server.transport = "unix"
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    socket_path = Path(prompt_data.server.address)
+    assert socket_path.exists()
+    prompt_data.server.should_close.set()
+    prompt_data.server.join()
+    assert not socket_path.parent.exists()
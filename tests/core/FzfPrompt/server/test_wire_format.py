@@ -0,0 +1,58 @@
+import io
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import REQUEST_CLIENTS, RequestClient, ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call, stream_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+BINARY_PAYLOAD = bytes(range(256)) * 4096
+
+
+def run_server_with(*server_calls: ServerCall, request_client: RequestClient = "python") -> PromptData:
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.request_client = request_client
+    for server_call in server_calls:
+        prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    return prompt_data
+
+
+def test_response_kinds(tmp_path: Path):
+    file_path = tmp_path / "payload"
+    file_path.write_bytes(BINARY_PAYLOAD)
+    text_call = ServerCall(lambda pd: "ünicode")
+    bytes_call = ServerCall(lambda pd: BINARY_PAYLOAD)
+    file_call = ServerCall(lambda pd: open(file_path, "rb"))
+    prompt_data = run_server_with(text_call, bytes_call, file_call)
+    address = prompt_data.server.address
+    try:
+        assert make_server_call(address, text_call.id, PROMPT_STATE, {}) == "ünicode"
+        assert make_server_call(address, bytes_call.id, PROMPT_STATE, {}) == BINARY_PAYLOAD
+        assert make_server_call(address, file_call.id, PROMPT_STATE, {}) == BINARY_PAYLOAD, "Sent with sendfile"
+        output = io.BytesIO()
+        assert stream_server_call(address, file_call.id, PROMPT_STATE, {}, output) == len(BINARY_PAYLOAD)
+        assert output.getvalue() == BINARY_PAYLOAD
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+@pytest.mark.parametrize("request_client", ["python", "shell"])
+def test_large_response_through_request_clients(request_client: RequestClient):
+    large_response = "".join(f"{i}\n" for i in range(1_000_000))
+    server_call = ServerCall(lambda pd: large_response)
+    prompt_data = run_server_with(server_call, request_client=request_client)
+    try:
+        arguments = [prompt_data.server.address, server_call.id, "qnst", "", "0", "0", "0"]
+        response = subprocess.run(
+            [REQUEST_CLIENTS[request_client], *arguments], capture_output=True, text=True, check=True
+        ).stdout
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    assert response == large_response
@@ -1,4 +1,5 @@
-from fzf_primitives import Prompt
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.core.FzfPrompt.server import PromptState
 
 ENTRIES = [
     {"name": "Alice", "age": 30, "city": "New York"},
@@ -49,5 +50,18 @@ def test_targets():
     assert targets == expected_targets, f"Expected {expected_targets}, got {targets}"
 
 
+def test_request_state_of_each_prompt():
+    outer, nested = PromptData(ENTRIES), PromptData(ENTRIES)
+    outer.set_state(PromptState("latest", 0, 0, [0]), "start")
+    nested.set_state(PromptState("latest", 0, 0, [0]), "start")
+    with outer.using_state(PromptState("outer", 1, 0, [1]), "focus"):
+        with nested.using_state(PromptState("nested", 2, 0, [2]), "change"):
+            assert (outer.query, outer.current_index, outer.trigger) == ("outer", 1, "focus")
+            assert (nested.query, nested.current_index, nested.trigger) == ("nested", 2, "change")
+        assert (nested.query, nested.trigger) == ("latest", "start")
+    assert outer.query == "latest"
+    assert outer.state.target_indices == [0], "Positional fields and list of target indices are kept"
+
+
 if __name__ == "__main__":
     test_current()
@@ -0,0 +1,87 @@
+import pytest
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt.selection_mirror import SelectionMirror, SelectionMirrorOutOfSync
+
+ENTRIES = ["Alice", "Bob", "Charlie", "Dave"]
+
+
+def run_prompt(*actions: str, mirror_selections: bool) -> tuple[Prompt, list, list[list[str]]]:
+    seen_selections: list[list[str]] = []
+
+    def record_selections(prompt_data: PromptData):
+        seen_selections.append(prompt_data.selections)
+
+    prompt = Prompt(ENTRIES, mirror_selections=mirror_selections)
+    prompt.mod.options.multi()
+    prompt.mod.on_hotkey().CTRL_Y.run_function("record selections", record_selections).accept()
+    prompt.mod.automate_actions(*actions)
+    prompt.mod.automate("ctrl-y")
+    result = prompt.run()
+    return prompt, result, seen_selections
+
+
+@pytest.mark.parametrize(
+    "actions",
+    [
+        ("select-all",),
+        ("toggle+down", "down", "toggle"),
+        ("select-all", "up", "toggle"),
+        ("select-all", "clear-selection"),
+    ],
+)
+def test_mirrored_selections_match_fzf(actions: tuple[str, ...]):
+    _, expected, expected_seen = run_prompt(*actions, mirror_selections=False)
+    prompt, result, seen = run_prompt(*actions, mirror_selections=True)
+    assert (result.selected_indices, result.target_indices) == (expected.selected_indices, expected.target_indices)
+    assert seen == expected_seen
+    assert prompt.selection_mirror is not None
+    prompt.selection_mirror.check(result.selected_indices)
+    assert '"{+n}"' not in str(prompt._prompt_data.options)  # noqa: SLF001
+
+
+def test_bound_selection_changes_are_applied_without_reading_selection():
+    def run(mirror_selections: bool) -> tuple[Prompt, list]:
+        prompt = Prompt(ENTRIES, mirror_selections=mirror_selections)
+        prompt.mod.options.multi()
+        prompt.mod.on_hotkey().CTRL_T.run("toggle down", "toggle+down")
+        prompt.mod.on_hotkey().CTRL_A.select_all()
+        prompt.mod.automate("ctrl-t", "ctrl-t", "ctrl-a", "ctrl-t")
+        prompt.mod.automate(Config.default_accept_hotkey)
+        return prompt, prompt.run()
+
+    _, expected = run(mirror_selections=False)
+    prompt, result = run(mirror_selections=True)
+    assert result.selected_indices == expected.selected_indices
+    assert (selection_mirror := prompt.selection_mirror) is not None
+    selection_mirror.check(result.selected_indices)
+    assert selection_mirror.changes == 3
+    assert selection_mirror.syncs == 2, "Selection should only be read after select-all and before the prompt ends"
+
+
+def test_applying_selection_changes():
+    selection_mirror = SelectionMirror()
+    selection_mirror.apply("toggle", 2)
+    selection_mirror.apply("select", 0)
+    selection_mirror.apply("select", 2)
+    selection_mirror.apply("toggle", 1)
+    selection_mirror.apply("deselect", 1)
+    selection_mirror.apply("toggle", None)
+    assert selection_mirror.indices == [2, 0]
+    assert selection_mirror.matches(2) and not selection_mirror.matches(3)
+    selection_mirror.apply("bulk", None)
+    assert not selection_mirror.matches(2), "Mirror can't be trusted after a bulk change until it's read whole"
+    selection_mirror.update([3, 2, 1, 0])
+    assert selection_mirror.matches(4)
+
+
+def test_check_notices_missed_changes():
+    selection_mirror = SelectionMirror()
+    selection_mirror.update([2, 0])
+    assert selection_mirror.target_indices(1) == [2, 0]
+    assert selection_mirror.target_indices(1, selected_count=0) == [1], "Count of 0 means selections were cleared"
+    selection_mirror.check([2, 0])
+    assert not selection_mirror.resync([2])
+    with pytest.raises(SelectionMirrorOutOfSync):
+        selection_mirror.check([2])
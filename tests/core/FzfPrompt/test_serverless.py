@@ -0,0 +1,57 @@
+import pytest
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.core.FzfPrompt.serverless import get_server_requirement
+
+ENTRIES = ["Alice", "Bob", "Charlie", "Dave"]
+
+
+def run_on_start(*actions: str, serverless: bool, monkeypatch: pytest.MonkeyPatch) -> tuple[Prompt, list]:
+    """fzf performs the actions and quits once it has read the entries"""
+    monkeypatch.setattr(Prompt.config, "serverless_prompts", serverless)
+    prompt = Prompt(ENTRIES, obj=[])
+    prompt.mod.options.multi().sync()
+    prompt.mod.on_event("start").run("select", *actions).end_prompt(
+        "quit", "quit", lambda pd: pd.obj.append("post-processed")
+    )
+    return prompt, prompt.run()
+
+
+@pytest.mark.parametrize("actions", [("toggle", "up", "toggle"), ("up", "up"), ("select-all",), ("put(zzz)",)])
+def test_result_matches_prompt_with_server(actions: tuple[str, ...], monkeypatch: pytest.MonkeyPatch):
+    _, expected = run_on_start(*actions, serverless=False, monkeypatch=monkeypatch)
+    prompt, result = run_on_start(*actions, serverless=True, monkeypatch=monkeypatch)
+    assert prompt.serverless
+    assert result.to_dict() == expected.to_dict()
+    assert (result.end_status, result.trigger, result.obj) == ("quit", "start", ["post-processed"])
+    assert not prompt._prompt_data.server.is_alive()  # noqa: SLF001
+
+
+def test_prompt_with_server_calls_needs_server():
+    prompt_data = PromptData(ENTRIES)
+    prompt = Prompt(ENTRIES)
+    prompt.mod.apply(prompt_data)
+    assert get_server_requirement(prompt_data) is None, "Basic hotkeys only end the prompt"
+    prompt.mod.on_hotkey("ctrl-y").run_function("print", lambda pd: print(pd.current))
+    prompt.mod.on_hotkey("ctrl-n").accept_non_empty()
+    prompt.mod.apply(prompt_data := PromptData(ENTRIES))
+    assert get_server_requirement(prompt_data)
+
+
+def test_prompts_run_with_server_by_default(monkeypatch: pytest.MonkeyPatch):
+    stages, set_stage = [], PromptData.set_stage
+    monkeypatch.setattr(PromptData, "set_stage", lambda self, stage: stages.append(stage) or set_stage(self, stage))
+    prompt = Prompt(ENTRIES)
+    prompt.mod.on_event("start").end_prompt("quit", "quit")
+    result = prompt.run()
+    assert not prompt.serverless
+    assert "running" in stages, "Startup server call should've run"
+    assert (result.end_status, result.trigger) == ("quit", "start")
+
+
+def test_prompt_opts_into_serverless_run():
+    prompt = Prompt(ENTRIES, serverless=True)
+    prompt.mod.on_event("start").end_prompt("quit", "quit")
+    result = prompt.run()
+    assert prompt.serverless
+    assert (result.end_status, result.trigger) == ("quit", "start")
@@ -0,0 +1,137 @@
+"""Shared state mutated from server threads hammered concurrently (meant to pass with and without the GIL)"""
+
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import pytest
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt import Binding, ShellCommand, Transform
+from fzf_primitives.core.FzfPrompt.action_menu.transform import ENDPOINT_CACHE_SIZE
+from fzf_primitives.core.FzfPrompt.server import PromptState, Request, ReusedServerCall, ServerCall
+from fzf_primitives.core.mods.on_trigger.presets.Repeater import Repeater
+
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    """With the GIL, threads are switched as often as possible to make races show up"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def hammer(function: Callable[[int], object], times: int) -> list:
+    barrier = threading.Barrier(THREADS)
+
+    def start_together(i: int):
+        if i < THREADS:
+            barrier.wait()
+        return function(i)
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        return list(executor.map(start_together, range(times)))
+
+
+def test_latest_state_keeps_fields_sent_concurrently():
+    fields = {"query": "q", "current_index": 1, "selected_count": 2, "target_indices": [3]}
+    for _ in range(100):
+        prompt_data = PromptData([1, 2, 3])
+        prompt_data.set_state(PromptState(), "start")
+        hammer(lambda i: prompt_data.set_state(PromptState(**dict([list(fields.items())[i % 4]])), "focus"), THREADS)
+        assert prompt_data.state.__dict__ == fields
+        assert prompt_data.trigger == "focus"
+
+
+def test_transform_registers_each_endpoint_once():
+    functions = [lambda pd: None for _ in range(ENDPOINT_CACHE_SIZE * 2)]
+    prompt_data = PromptData([1, 2, 3])
+    transform = Transform(lambda pd: [functions[int(pd.query)]])
+
+    def transform_string(i: int) -> str:
+        with prompt_data.using_state(PromptState(str(i % len(functions))), "focus"):
+            return transform.function(prompt_data)
+
+    hammer(transform_string, 2000)
+    assert len(prompt_data.server.endpoints) == ENDPOINT_CACHE_SIZE
+
+
+def test_server_call_becomes_endpoint_once():
+    prompt_data = PromptData([1, 2, 3])
+    server_call = ServerCall(lambda pd: None)
+
+    def add_endpoint(i: int) -> bool:
+        try:
+            prompt_data.server.add_endpoint(server_call, "focus")
+        except ReusedServerCall:
+            return False
+        return True
+
+    assert hammer(add_endpoint, THREADS * 4).count(True) == 1
+
+
+def test_repeater_adds_endpoints_once():
+    class IdleRepeater(Repeater):
+        def create_automating_thread(self, prompt_data, port):
+            return threading.Thread(target=lambda: None)
+
+    prompt_data = PromptData([1, 2, 3])
+    repeater = IdleRepeater(ServerCall(lambda pd: None, command_type="execute-silent"))
+    prompt_data.set_state(PromptState(), "ctrl-r")
+    hammer(lambda i: repeater(prompt_data, "1"), THREADS * 2)
+    assert len(prompt_data.server.endpoints) == 1
+    assert repeater.thread is None, "Even number of calls should toggle repeating off"
+
+
+def test_bindings_appended_concurrently_are_kept():
+    prompt_data = PromptData([1, 2, 3])
+    hammer(
+        lambda i: prompt_data.action_menu.add("ctrl-a", Binding(str(i), ShellCommand("true")), on_conflict="append"), 64
+    )
+    assert len(prompt_data.action_menu.bindings["ctrl-a"].actions) == 64
+
+
+def test_superseded_requests_are_counted():
+    prompt_data = PromptData([1, 2, 3])
+    server_call = ServerCall(lambda pd: None, supersedable=True)
+    prompt_data.server.add_endpoint(server_call, "focus")
+    endpoint = prompt_data.server.endpoints[server_call.id]
+    socket_pairs = [socket.socketpair() for _ in range(200)]
+    try:
+        hammer(
+            lambda i: prompt_data.server._supersede_previous_request(  # noqa: SLF001
+                endpoint, Request(server_call.id, PromptState(), {}), socket_pairs[i][0]
+            ),
+            len(socket_pairs),
+        )
+    finally:
+        for socket_pair in socket_pairs:
+            for sock in socket_pair:
+                sock.close()
+    assert endpoint.dropped_requests + endpoint.abandoned_requests == len(socket_pairs) - 1
+
+
+def test_piped_entries_are_not_added_to_replaced_ones():
+    for _ in range(20):
+        prompt_data = PromptData[object, None]([])
+        piped_entries = prompt_data.entries
+        reloaded_entries: list[list[object]] = [["reloaded"] for _ in range(THREADS - 1)]
+
+        def pipe_or_reload(i: int):
+            if i:
+                prompt_data.replace_entries(reloaded_entries[i - 1])
+                return
+            for entry in range(1000):
+                if not prompt_data.append_piped_entry(entry, piped_entries):
+                    break
+
+        hammer(pipe_or_reload, THREADS)
+        prompt_data.remove_piped_entry(piped_entries[-1] if piped_entries else None, piped_entries)
+        assert all(entries == ["reloaded"] for entries in reloaded_entries)
+        assert any(prompt_data.entries is entries for entries in reloaded_entries)
+        assert piped_entries == list(range(len(piped_entries)))
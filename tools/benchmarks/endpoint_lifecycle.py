@@ -0,0 +1,70 @@
+"""Memory of a prompt over a long session of a Transform returning new server calls on every invocation
+
+Every returned server call becomes an endpoint that's removed once it falls out of the endpoint cache of the
+Transform, and some of them get requests before that (their metrics are folded once they're removed). Memory traced
+after the endpoint cache fills up should stay flat.
+
+Run: uv run python tools/benchmarks/endpoint_lifecycle.py [INVOCATIONS]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt import Binding, PromptEndingAction, ServerCall, Transform
+from fzf_primitives.core.FzfPrompt.action_menu.transform import ENDPOINT_CACHE_SIZE
+from fzf_primitives.core.FzfPrompt.server import PromptState
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+REQUEST_EVERY = 100  # invocation
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+def main(invocations: int = 100_000):
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.action_menu.add("ctrl-a", Binding("accept", PromptEndingAction("accept")))
+    transform = Transform(
+        lambda pd: [
+            lambda pd: None,
+            ServerCall(lambda pd: None, command_type="execute-silent"),
+            PromptEndingAction("accept"),
+        ]
+    )
+
+    def invoke(invocations: int) -> None:
+        for i in range(invocations):
+            transform.function(prompt_data)
+            if i % REQUEST_EVERY == 0:
+                endpoint_id = next(reversed(prompt_data.server.endpoints))  # of the returned ServerCall
+                make_server_call(prompt_data.server.address, endpoint_id, PROMPT_STATE, {})
+
+    prompt_data.server.open()
+    try:
+        with prompt_data.using_state(PromptState(), "ctrl-a"):
+            invoke(ENDPOINT_CACHE_SIZE * 10)  # fills the endpoint cache
+            gc.collect()
+            tracemalloc.start()
+            traced_before, _ = tracemalloc.get_traced_memory()
+            start = time.perf_counter()
+            invoke(invocations)
+            seconds = time.perf_counter() - start
+            gc.collect()
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        prompt_data.server.close()
+
+    print(
+        f"{invocations} invocations: {seconds:6.3f} s ({seconds / invocations * 1e6:6.1f} µs per invocation), "
+        f"traced memory grew by {(traced_after - traced_before) / 1024:.1f} KiB (peak {traced_peak / 1024:.1f} KiB)"
+    )
+    print(
+        f"{len(prompt_data.server.endpoints)} endpoints registered ({prompt_data.server.endpoints_removed} removed), "
+        f"metrics of {len(prompt_data.metrics.endpoints)} endpoints kept"
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,79 @@
+"""Request clients fzf spawns per keypress with and without fusing consecutive execute-silent server calls
+
+Counts server calls in bindings of a prompt with common mods and measures what fzf spends on them (each one is a
+request client process run one after another) with the Python request client.
+
+Run: uv run python tools/benchmarks/fused_server_calls.py [ROUNDS]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.core.FzfPrompt.action_menu import Binding
+from fzf_primitives.core.FzfPrompt.server import REQUEST_CLIENTS, ServerCall
+
+
+def build_prompt() -> Prompt:
+    prompt = Prompt(list(range(10)), obj=[])
+    prompt.mod.preview("ctrl-p").basic()
+    prompt.mod.on_event("start").run_function("remember start", lambda pd: pd.obj.append("start"), silent=True)
+    prompt.mod.on_hotkey("ctrl-y").run_function(
+        "remember entry", lambda pd: pd.obj.append(pd.current), silent=True
+    ).accept()
+    prompt.mod.on_hotkey("ctrl-s").run_function("save", lambda pd: pd.obj.append(pd.query), silent=True).run_function(
+        "log", lambda pd: None, silent=True
+    ).abort()
+    return prompt
+
+
+def count_spawns(binding: Binding) -> tuple[int, int]:
+    """Server calls before and after fusion"""
+    return (
+        sum(isinstance(action, ServerCall) for action in binding.actions),
+        sum(isinstance(action, ServerCall) for action in binding.resolved_actions),
+    )
+
+
+def measure_spawns(address: str, endpoint_id: str, spawns: int, rounds: int) -> float:
+    """Median milliseconds of running the request client a number of times in a row"""
+    arguments = [str(REQUEST_CLIENTS["python"]), address, endpoint_id, "-"]
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(spawns):
+            subprocess.run(arguments, check=True, capture_output=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def main(rounds: int = 50):
+    prompt = build_prompt()
+    prompt._run_initial_setup()  # noqa: SLF001
+    bindings = prompt._prompt_data.action_menu.bindings  # noqa: SLF001
+    prompt_data = PromptData()
+    server_call = ServerCall(lambda pd: None, command_type="execute-silent", state_fields=())
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    try:
+        address = prompt_data.server.address
+        for trigger, binding in bindings.items():
+            unfused, fused = count_spawns(binding)
+            if unfused == fused:
+                continue
+            unfused_ms = measure_spawns(address, server_call.id, unfused, rounds)
+            fused_ms = measure_spawns(address, server_call.id, fused, rounds)
+            print(
+                f"{trigger:>8}: {unfused} -> {fused} request client spawns per keypress | "
+                f"{unfused_ms:6.2f} -> {fused_ms:6.2f} ms ({binding.name})"
+            )
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,75 @@
+"""Time and client memory of a 200 MB reload payload sent as text, bytes and file (sendfile)
+
+Request client streams the response to stdout (redirected to /dev/null) in chunks; its peak memory (max RSS) is
+compared with in-process make_server_call that holds the whole response.
+
+Run: uv run python tools/benchmarks/large_responses.py [MEGABYTES]
+"""
+
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import REQUEST_CLIENTS, ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+PROMPT_STATE = {"query": "", "current_index": 0, "selected_count": 0, "target_indices": [0]}
+
+
+# started from a small process so that max RSS of the client doesn't include pages of this one (inherited by fork)
+RUN_MEASURED = """
+import os, resource, subprocess, sys
+subprocess.run(sys.argv[1:], stdout=open(os.devnull, "wb"), check=True)
+print(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+"""
+
+
+def run_client(address: str, endpoint_id: str) -> tuple[float, float]:
+    """Returns seconds and max RSS (MB) of the Python request client"""
+    arguments = [str(REQUEST_CLIENTS["python"]), address, endpoint_id, "qnst", "", "0", "0", "0"]
+    start = time.perf_counter()
+    max_rss = subprocess.run(
+        [sys.executable, "-c", RUN_MEASURED, *arguments], capture_output=True, text=True, check=True
+    ).stdout
+    return time.perf_counter() - start, int(max_rss) / 1024
+
+
+def main(megabytes: int = 200):
+    line = "entry number 0000000\n"
+    entries_text = line * (megabytes * 1024 * 1024 // len(line))
+    entries_bytes = entries_text.encode()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = Path(temp_dir, "entries")
+        file_path.write_bytes(entries_bytes)
+        server_calls = {
+            "text": ServerCall(lambda pd: entries_text),
+            "bytes": ServerCall(lambda pd: entries_bytes),
+            "file": ServerCall(lambda pd: open(file_path, "rb")),
+        }
+        prompt_data = PromptData()
+        for server_call in server_calls.values():
+            prompt_data.server.add_endpoint(server_call, "ctrl-r")
+        prompt_data.server.start()
+        prompt_data.server.setup_finished.wait()
+        address = prompt_data.server.address
+        print(f"Payload: {len(entries_bytes) / 1024 / 1024:.0f} MB")
+        try:
+            for kind, server_call in server_calls.items():
+                seconds, max_rss = run_client(address, server_call.id)
+                start = time.perf_counter()
+                make_server_call(address, server_call.id, PROMPT_STATE, {})
+                in_process_seconds = time.perf_counter() - start
+                print(
+                    f"{kind:>5}: request client {seconds:6.3f} s ({len(entries_bytes) / 1024 / 1024 / seconds:7.1f} MB/s, "
+                    f"max RSS {max_rss:6.1f} MB) | in-process make_server_call {in_process_seconds:6.3f} s"
+                )
+        finally:
+            prompt_data.server.should_close.set()
+            prompt_data.server.join()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
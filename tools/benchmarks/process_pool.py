@@ -0,0 +1,84 @@
+"""CPU-bound server calls resolved in server threads and in worker processes (ServerCall(process_pool=True))
+
+Calls are made in-process (make_server_call) by concurrent clients while a ticker thread (standing in for the thread
+piping entries_stream to fzf) measures how long it waits for the GIL.
+
+Run: uv run python tools/benchmarks/process_pool.py [CALLS]
+"""
+
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fzf_primitives import PromptData
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt.server import ProcessPool, ServerCall
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+WORKERS = 4
+PROMPT_STATE = {"query": "", "current_index": 1, "selected_count": 0, "target_indices": [1]}
+
+
+def render(prompt_data) -> str:
+    """~20 ms of pure Python work (like diffing or rendering a table)"""
+    return str(sum(i * i for i in range(400_000)) + prompt_data.current)
+
+
+def measure(process_pool: bool, calls: int) -> tuple[list[float], float, float]:
+    """Returns latencies of calls, total time and the longest delay of the ticker"""
+    prompt_data = PromptData([1, 2, 3])
+    server_call = ServerCall(render, process_pool=process_pool)
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+
+    stop_ticking = threading.Event()
+    ticker_delays = []
+
+    def tick():
+        while not stop_ticking.is_set():
+            start = time.perf_counter()
+            time.sleep(0.001)
+            ticker_delays.append(time.perf_counter() - start - 0.001)
+
+    def timed_call() -> float:
+        start = time.perf_counter()
+        make_server_call(prompt_data.server.address, server_call.id, PROMPT_STATE, {})
+        return time.perf_counter() - start
+
+    for _ in range(WORKERS):
+        timed_call()  # worker processes are already starting (since add_endpoint)
+    ticker = threading.Thread(target=tick)
+    ticker.start()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(WORKERS) as clients:
+            latencies = list(clients.map(lambda _: timed_call(), range(calls)))
+    finally:
+        total = time.perf_counter() - start
+        stop_ticking.set()
+        ticker.join()
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    return latencies, total, max(ticker_delays)
+
+
+def main(calls: int = 200):
+    Config.server_max_workers = WORKERS
+    Config.process_pool_max_workers = WORKERS
+    totals = {}
+    for mode, process_pool in (("threads", False), ("processes", True)):
+        latencies, totals[mode], max_delay = measure(process_pool, calls)
+        latencies = [latency * 1000 for latency in latencies]
+        print(
+            f"{mode:>9}: total {totals[mode]:6.3f} s | median {statistics.median(latencies):7.3f} ms | "
+            f"p95 {statistics.quantiles(latencies, n=20)[-1]:7.3f} ms | longest ticker stall {max_delay * 1000:6.3f} ms"
+        )
+    print(f"Worker processes are {totals['threads'] / totals['processes']:.2f}x faster with {WORKERS} workers")
+    ProcessPool.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
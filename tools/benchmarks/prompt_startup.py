@@ -0,0 +1,52 @@
+"""Per-iteration startup of back-to-back prompts (as in BasicLoop.run_in_loop) with own and with shared server
+
+Measures opening and closing of the server alone and whole automated prompts (needs a terminal for fzf).
+
+Run: uv run python tools/benchmarks/prompt_startup.py [ITERATIONS]
+"""
+
+import statistics
+import sys
+import time
+
+from fzf_primitives import Prompt, PromptData
+from fzf_primitives.config import Config
+
+
+def measure_server_setup(iterations: int, *, shared: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        server = PromptData().server
+        server.shared = shared
+        server.open()
+        server.close()
+    return (time.perf_counter() - start) / iterations
+
+
+def measure_prompts(iterations: int, *, shared: bool) -> tuple[float, float]:
+    """Returns median time until fzf made the first server call and median time of whole iteration"""
+    startups, totals = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        prompt = Prompt([1, 2, 3], obj=[], shared_server=shared)
+        prompt.mod.on_event("start").run_function("started", lambda pd: pd.obj.append(time.perf_counter()))
+        prompt.mod.automate(Config.default_accept_hotkey)
+        prompt.run()
+        startups.append(prompt.obj[0] - start)
+        totals.append(time.perf_counter() - start)
+    return statistics.median(startups), statistics.median(totals)
+
+
+def main(iterations: int = 20):
+    Config.automator_delay = 0.05
+    for shared in (False, True):
+        server_setup = measure_server_setup(iterations * 10, shared=shared)
+        startup, total = measure_prompts(iterations, shared=shared)
+        print(
+            f"{'shared' if shared else 'own':>6} server: open+close {server_setup * 1000:6.3f} ms | "
+            f"first server call after {startup * 1000:6.1f} ms | iteration {total * 1000:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,48 @@
+"""Round-trip latency of request clients fzf runs for every server call
+
+Run: uv run python tools/benchmarks/request_clients.py [ROUNDS]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import REQUEST_CLIENTS, ServerCall
+
+
+def measure(client: str, address: str, endpoint_id: str, rounds: int) -> list[float]:
+    arguments = [str(REQUEST_CLIENTS[client]), address, endpoint_id, "qnst", "query", "0", "0", "0"]
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        subprocess.run(arguments, check=True, capture_output=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main(rounds: int = 200):
+    for client in REQUEST_CLIENTS:
+        prompt_data = PromptData(list(range(10)))
+        prompt_data.request_client = client
+        server_call = ServerCall(lambda pd: f"{pd.query} {pd.current}")
+        prompt_data.server.add_endpoint(server_call, "focus")
+        prompt_data.server.start()
+        prompt_data.server.setup_finished.wait()
+        try:
+            address = prompt_data.server.address
+            latencies = [latency * 1000 for latency in measure(client, address, server_call.id, rounds)]
+            transport = "tcp" if address.isdigit() else "unix"
+            print(
+                f"{client:>8} ({transport:>4}): mean {statistics.mean(latencies):6.2f} ms | "
+                f"median {statistics.median(latencies):6.2f} ms | "
+                f"p95 {statistics.quantiles(latencies, n=20)[-1]:6.2f} ms"
+            )
+        finally:
+            prompt_data.server.should_close.set()
+            prompt_data.server.join()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,56 @@
+"""Time the server spends per toggle keeping the selection mirror in sync with a large selection
+
+Compares reading the selection whole from the file fzf writes ('{+nf}'), which is done when the mirror can't tell
+what changed, with applying the change of a bound toggle and checking the selected count on 'multi' event. Server
+call functions are called directly (as the server would when resolving the requests) and the file is written once,
+so fzf writing it on every 'multi' event isn't included in the full read.
+
+Run: uv run python tools/benchmarks/selection_mirror.py [SELECTED] [TOGGLES]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.selection_mirror import (
+    ApplySelectionChange,
+    SelectionMirror,
+    SyncSelectionMirror,
+    check_selection_mirror,
+)
+from fzf_primitives.core.FzfPrompt.server import PromptState
+
+
+def main(selected: int = 50_000, toggles: int = 1_000):
+    prompt_data = PromptData(list(range(selected + toggles)))
+    prompt_data.selection_mirror = SelectionMirror()
+    prompt_data.selection_mirror.update(range(selected))
+    sync, toggle, check = SyncSelectionMirror(), ApplySelectionChange("toggle"), check_selection_mirror()
+    with tempfile.TemporaryDirectory() as directory:
+        indices_file = Path(directory, "selected")
+        indices_file.write_text("".join(f"{i}\n" for i in range(selected)))
+
+        start = time.perf_counter()
+        for _ in range(toggles):
+            with prompt_data.using_state(PromptState(selected_count=selected), "multi"):
+                sync.function(prompt_data, target_indices_file=str(indices_file))
+        full_read = (time.perf_counter() - start) / toggles
+
+    start = time.perf_counter()
+    for i in range(toggles):
+        with prompt_data.using_state(PromptState(current_index=selected + i), "tab"):
+            toggle.function(prompt_data)
+        with prompt_data.using_state(PromptState(selected_count=selected + i + 1), "multi"):
+            check.function(prompt_data)
+    applied = (time.perf_counter() - start) / toggles
+    assert prompt_data.selection_mirror.syncs == toggles + 1, "Applied changes shouldn't need a full read"
+
+    print(f"{selected} selected, per toggle:")
+    print(f"  full read ('{{+nf}}'):           {full_read * 1e6:9.1f} µs")
+    print(f"  applied change + count check:  {applied * 1e6:9.1f} µs")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
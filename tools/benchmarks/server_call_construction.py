@@ -0,0 +1,45 @@
+"""Time spent constructing ServerCalls and mutating a Preview (which recreates its actions)
+
+Run: uv run python tools/benchmarks/server_call_construction.py [SERVER_CALLS] [MUTATIONS]
+"""
+
+import functools
+import sys
+import time
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.previewer import Preview
+from fzf_primitives.core.FzfPrompt.server import CommandOutput, ServerCall, VarOutput
+
+
+def show_details(
+    prompt_data: PromptData, FZF_LINES: str = VarOutput("FZF_LINES"), git_status=CommandOutput("git status")
+):
+    return f"{prompt_data.current} {FZF_LINES} {git_status}"
+
+
+def measure(name: str, count: int, create):
+    start = time.perf_counter()
+    for i in range(count):
+        create(i)
+    seconds = time.perf_counter() - start
+    print(f"{name:>34}: {seconds:6.3f} s ({seconds / count * 1e6:6.1f} µs each)")
+
+
+def main(server_calls: int = 10_000, mutations: int = 1_000):
+    measure(f"{server_calls} ServerCalls of a function", server_calls, lambda i: ServerCall(show_details))
+    measure(
+        f"{server_calls} ServerCalls of a partial",
+        server_calls,
+        lambda i: ServerCall(functools.partial(show_details, git_status=str(i))),
+    )
+    preview = Preview("mutated", output_generator=show_details)
+    measure(f"{mutations} Preview mutations", mutations, lambda i: preview.update(label=f"label {i}"))
+    shell_preview = Preview("mutated shell", output_generator="echo {}")
+    measure(
+        f"{mutations} shell Preview mutations", mutations, lambda i: shell_preview.update(output_generator=f"echo {i}")
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
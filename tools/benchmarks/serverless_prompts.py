@@ -0,0 +1,49 @@
+"""Time to first paint and time to return of a plain picker run with and without server (Config.serverless_prompts)
+
+fzf writes a timestamp when it has loaded the entries ('load' event) and quits right after (needs a terminal).
+
+Run: uv run python tools/benchmarks/serverless_prompts.py [ITERATIONS]
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fzf_primitives import Prompt
+from fzf_primitives.config import Config
+from fzf_primitives.core.FzfPrompt import ShellCommand
+
+
+def measure(iterations: int, *, serverless: bool, timestamp_file: Path) -> tuple[list[float], list[float]]:
+    """Returns times until the entries were loaded and times until the prompt returned"""
+    Config.serverless_prompts = serverless
+    first_paints, returns = [], []
+    for _ in range(iterations):
+        start = time.time()
+        prompt = Prompt([f"entry {i}" for i in range(1000)])
+        prompt.mod.on_event("load").run(
+            "paint", ShellCommand(f"date +%s.%N > {timestamp_file}", "execute-silent")
+        ).quit()
+        prompt.run()
+        returns.append(time.time() - start)
+        first_paints.append(float(timestamp_file.read_text()) - start)
+        assert prompt.serverless == serverless
+    return first_paints, returns
+
+
+def main(iterations: int = 20):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        timestamp_file = Path(tmp_dir, "loaded")
+        measure(3, serverless=True, timestamp_file=timestamp_file)  # warm-up
+        for serverless in (False, True):
+            first_paints, returns = measure(iterations, serverless=serverless, timestamp_file=timestamp_file)
+            print(
+                f"{'serverless' if serverless else 'server':>10}: first paint {statistics.median(first_paints) * 1000:6.1f} ms"
+                f" | return {statistics.median(returns) * 1000:6.1f} ms (medians of {iterations})"
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
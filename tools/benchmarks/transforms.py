@@ -0,0 +1,46 @@
+"""Time spent by a Transform that returns the same server calls (and functions) on every invocation
+
+Transform function is called directly (as the server would when resolving the request) so that only the cost of
+turning returned actions into the action string is measured.
+
+Run: uv run python tools/benchmarks/transforms.py [INVOCATIONS]
+"""
+
+import sys
+import time
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt import Transform
+from fzf_primitives.core.FzfPrompt.previewer import Preview
+from fzf_primitives.core.FzfPrompt.server import PromptState
+
+
+def set_current_preview_name(prompt_data: PromptData): ...
+
+
+PREVIEWS = [
+    Preview(f"preview {i}", output_generator=lambda pd, i=i: f"preview {i}", window_size="50%") for i in range(5)
+]
+
+
+def cycle_previews(prompt_data: PromptData):
+    preview = PREVIEWS[prompt_data.current_index % len(PREVIEWS)]
+    return [*preview.preview_change_binding.actions, set_current_preview_name, "refresh-preview"]
+
+
+def main(invocations: int = 20_000):
+    prompt_data = PromptData(list(range(len(PREVIEWS))))
+    transform = Transform(cycle_previews)
+    start = time.perf_counter()
+    for i in range(invocations):
+        with prompt_data.using_state(PromptState("", i, 0, [i]), "ctrl-n"):
+            transform.function(prompt_data)
+    seconds = time.perf_counter() - start
+    print(
+        f"{invocations} transforms: {seconds:6.3f} s ({seconds / invocations * 1e6:6.1f} µs per transform), "
+        f"{len(prompt_data.server.endpoints)} endpoints registered"
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,50 @@
+"""Round-trip latency of server calls over TCP on localhost and over Unix domain socket
+
+Calls are made in-process (make_server_call) so that only the transport differs.
+
+Run: uv run python tools/benchmarks/transports.py [ROUNDS]
+"""
+
+import statistics
+import sys
+import time
+
+from fzf_primitives import PromptData
+from fzf_primitives.core.FzfPrompt.server import ServerCall, ServerTransport
+from fzf_primitives.core.FzfPrompt.server.make_server_call import make_server_call
+
+
+def measure(transport: ServerTransport, rounds: int) -> list[float]:
+    prompt_data = PromptData([1, 2, 3])
+    prompt_data.server.transport = transport
+    server_call = ServerCall(lambda pd: pd.current)
+    prompt_data.server.add_endpoint(server_call, "focus")
+    prompt_data.server.start()
+    prompt_data.server.setup_finished.wait()
+    prompt_state = {"query": "", "current_index": 1, "selected_count": 0, "target_indices": [1]}
+    latencies = []
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            make_server_call(prompt_data.server.address, server_call.id, prompt_state, {})
+            latencies.append(time.perf_counter() - start)
+    finally:
+        prompt_data.server.should_close.set()
+        prompt_data.server.join()
+    return latencies
+
+
+def main(rounds: int = 2000):
+    medians = {}
+    for transport in ("tcp", "unix"):
+        latencies = [latency * 1000 for latency in measure(transport, rounds)]
+        medians[transport] = statistics.median(latencies)
+        print(
+            f"{transport:>4}: mean {statistics.mean(latencies):6.3f} ms | median {medians[transport]:6.3f} ms | "
+            f"p95 {statistics.quantiles(latencies, n=20)[-1]:6.3f} ms"
+        )
+    print(f"Unix domain socket median is {medians['tcp'] / medians['unix']:.2f}x faster")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))